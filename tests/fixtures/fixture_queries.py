@@ -0,0 +1,25 @@
+from urllib.parse import urlsplit
+
+import pytest
+from django.urls import resolve
+
+from core.query_budget import QueryCounter, check_budget, get_budget
+
+
+@pytest.fixture
+def query_budget(settings):
+    """Запрашивает URL и проверяет, что view уложилась в свой бюджет."""
+    settings.QUERY_BUDGET_RAISE = True
+
+    def check(client, url, method='get', **kwargs):
+        match = resolve(urlsplit(url).path)
+        budget = get_budget(match.func, match.view_name)
+        assert budget is not None, (
+            f'Объявите бюджет SQL-запросов для view `{match.view_name}`'
+        )
+        with QueryCounter() as counter:
+            response = getattr(client, method)(url, **kwargs)
+        check_budget(counter, budget, url)
+        return response
+
+    return check
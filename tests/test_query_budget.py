@@ -0,0 +1,31 @@
+import pytest
+from django.core.cache import cache
+
+from posts.models import Post
+
+
+class TestQueryBudget:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_read_views_within_budget(self, user_client, query_budget, mixer, user, group):
+        post = mixer.cycle(20).blend(Post, author=user, group=group, image='')[0]
+        urls = (
+            '/',
+            f'/group/{post.group.slug}/',
+            f'/profile/{post.author.username}/',
+            f'/posts/{post.id}/',
+            f'/posts/{post.id}/comments/',
+            '/follow/',
+            '/create/',
+            f'/posts/{post.id}/edit/',
+        )
+        for url in urls:
+            cache.clear()
+            query_budget(user_client, url)
+
+    @pytest.mark.django_db(transaction=True)
+    def test_write_views_within_budget(self, user_client, query_budget, post, another_user):
+        query_budget(user_client, '/create/', method='post', data={'text': 'Новый пост'})
+        query_budget(user_client, f'/posts/{post.id}/comment/', method='post', data={'text': 'Комментарий'})
+        query_budget(user_client, f'/profile/{another_user.username}/follow/')
+        query_budget(user_client, f'/profile/{another_user.username}/unfollow/')
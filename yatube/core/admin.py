@@ -0,0 +1,20 @@
+from django.contrib import admin
+
+from .models import Task
+
+
+class TaskAdmin(admin.ModelAdmin):
+    """Класс для админки Task."""
+
+    list_display = (
+        'name',
+        'run_at',
+        'started',
+        'attempts',
+        'max_attempts',
+        'error',
+    )
+    list_filter = ('name',)
+
+
+admin.site.register(Task, TaskAdmin)
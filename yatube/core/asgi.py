@@ -0,0 +1,168 @@
+"""ASGI-приложение поверх синхронного обработчика Django.
+
+Django 2.2 не умеет обслуживать ASGI сам, поэтому ``ASGIHandler``
+принимает соединения в цикле событий, а каждый запрос целиком — от
+чтения тела до отдачи последнего куска ответа — выполняет обычным
+``WSGIHandler`` в пуле из ``ASGI_THREADS`` потоков. Медленное чтение из
+SQLite или с диска занимает один поток пула, а не весь процесс: так
+один воркер ASGI-сервера обслуживает столько запросов одновременно,
+сколько потоков в пуле.
+
+Тело запроса не копится в памяти: поток читает его из ``receive`` по
+мере разбора, поэтому ограничения загрузки из ``core.uploads``
+срабатывают так же, как под WSGI.
+
+Асинхронных представлений в Django 2.2 нет, поэтому все представления
+остаются синхронными и выигрыш дает только пул потоков.
+"""
+import asyncio
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.handlers.wsgi import WSGIHandler
+
+_executor = None
+
+
+def executor():
+    """Общий пул потоков для запросов."""
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            settings.ASGI_THREADS, thread_name_prefix='asgi')
+    return _executor
+
+
+class ClientDisconnected(OSError):
+    """Клиент закрыл соединение, не дослав тело запроса."""
+
+
+class RequestBody:
+    """``wsgi.input``, который читает тело из ``receive`` по требованию."""
+
+    def __init__(self, receive, loop):
+        self.receive = receive
+        self.loop = loop
+        self.buffer = b''
+        self.more = True
+
+    def _pull(self):
+        message = asyncio.run_coroutine_threadsafe(
+            self.receive(), self.loop).result()
+        if message['type'] == 'http.disconnect':
+            raise ClientDisconnected('Клиент отключился')
+        self.buffer += message.get('body', b'')
+        self.more = message.get('more_body', False)
+
+    def read(self, size=-1):
+        while self.more and (size < 0 or len(self.buffer) < size):
+            self._pull()
+        if size < 0:
+            size = len(self.buffer)
+        chunk, self.buffer = self.buffer[:size], self.buffer[size:]
+        return chunk
+
+
+def environ(scope, body):
+    """Окружение WSGI для HTTP-запроса ASGI."""
+    server = scope.get('server') or ('localhost', 80)
+    result = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', ''),
+        # WSGI хранит путь как байты, декодированные из latin-1.
+        'PATH_INFO': scope['path'].encode().decode('latin-1'),
+        'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+        'SERVER_NAME': server[0],
+        'SERVER_PORT': str(server[1] or 80),
+        'SERVER_PROTOCOL': f'HTTP/{scope.get("http_version", "1.1")}',
+        'REMOTE_ADDR': (scope.get('client') or ('', 0))[0],
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': body,
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False,
+    }
+    for name, value in scope.get('headers', ()):
+        name = name.decode('latin-1').upper().replace('-', '_')
+        value = value.decode('latin-1')
+        if name not in ('CONTENT_TYPE', 'CONTENT_LENGTH'):
+            name = f'HTTP_{name}'
+        if name in result:
+            # HTTP/2 разбивает Cookie на несколько заголовков, а Django
+            # ждет их одной строкой через «; ».
+            separator = '; ' if name == 'HTTP_COOKIE' else ','
+            value = f'{result[name]}{separator}{value}'
+        result[name] = value
+    return result
+
+
+class ASGIHandler:
+    """ASGI-приложение, выполняющее запросы Django в пуле потоков.
+
+    Без ``pool`` запросы выполняются в общем пуле ``executor()``.
+    """
+
+    def __init__(self, wsgi_application=None, pool=None):
+        self.wsgi_application = wsgi_application or WSGIHandler()
+        self.pool = pool
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self.lifespan(receive, send)
+        elif scope['type'] == 'http':
+            loop = asyncio.get_running_loop()
+            await loop.run_in_executor(
+                self.pool or executor(), self.respond,
+                environ(scope, RequestBody(receive, loop)), send, loop)
+        else:
+            raise ValueError(f'Неподдерживаемый тип соединения: '
+                             f'{scope["type"]}')
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    def respond(self, request_environ, send, loop):
+        """Выполняет запрос в потоке пула и отправляет ответ по кускам."""
+        def push(message):
+            asyncio.run_coroutine_threadsafe(send(message), loop).result()
+
+        started = []
+
+        def start_response(status, headers, exc_info=None):
+            started.append({
+                'type': 'http.response.start',
+                'status': int(status.split(' ', 1)[0]),
+                'headers': [(name.lower().encode('latin-1'),
+                             value.encode('latin-1'))
+                            for name, value in headers],
+            })
+
+        response = self.wsgi_application(request_environ, start_response)
+        try:
+            push(started[0])
+            for chunk in response:
+                if chunk:
+                    push({'type': 'http.response.body', 'body': chunk,
+                          'more_body': True})
+            push({'type': 'http.response.body', 'body': b''})
+        finally:
+            # close() посылает request_finished и закрывает подключения
+            # к базе в том же потоке, где они открывались. Ответ к этому
+            # времени уже отдан, поэтому работа при закрытии его не держит.
+            response.close()
+
+
+def get_asgi_application():
+    """Настраивает Django и возвращает ASGI-приложение проекта."""
+    import django
+    django.setup(set_prefix=False)
+    return ASGIHandler()
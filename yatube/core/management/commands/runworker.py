@@ -0,0 +1,54 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core import taskqueue
+
+
+class Command(BaseCommand):
+    help = 'Выполняет фоновые задачи из очереди в базе данных.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers', type=int, default=settings.TASK_WORKERS,
+            help='Размер пула; 0 — выполнять задачи в текущем потоке.')
+        parser.add_argument(
+            '--processes', action='store_true',
+            help='Пул процессов вместо пула потоков.')
+        parser.add_argument(
+            '--batch', type=int, default=100,
+            help='Сколько задач забирать за один раз.')
+        parser.add_argument(
+            '--once', action='store_true',
+            help='Выполнить готовые задачи и завершиться.')
+        parser.add_argument(
+            '--sleep', type=float, default=1.0,
+            help='Пауза между проверками пустой очереди в секундах.')
+
+    def handle(self, *args, **options):
+        executor = None
+        if options['workers']:
+            executor = taskqueue.pool(
+                options['workers'], options['processes'])
+        done = failed = 0
+        try:
+            while True:
+                batch_done, batch_failed = taskqueue.process(
+                    executor, options['batch'])
+                done += batch_done
+                failed += batch_failed
+                if batch_done or batch_failed:
+                    self.stdout.write(
+                        f'Выполнено: {batch_done}, с ошибкой: {batch_failed}')
+                elif options['once']:
+                    break
+                else:
+                    time.sleep(options['sleep'])
+        except KeyboardInterrupt:
+            pass
+        finally:
+            if executor is not None:
+                executor.shutdown()
+        self.stdout.write(self.style.SUCCESS(
+            f'Выполнено задач: {done}, с ошибкой: {failed}'))
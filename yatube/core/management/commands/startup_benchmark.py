@@ -0,0 +1,84 @@
+import json
+import os
+import subprocess
+import sys
+from statistics import median
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+PROFILES = ('dev', 'prod')
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает профили настроек: время запуска Django, число '
+        'загруженных модулей и задержку простого запроса. Каждый профиль '
+        'запускается в отдельном процессе.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--profile', action='append', dest='profiles',
+            choices=PROFILES,
+            help='Мерить только этот профиль (можно несколько раз).')
+        parser.add_argument('--url', default='/about/author/')
+        parser.add_argument('--requests', type=int, default=500)
+        parser.add_argument('--warmup', type=int, default=20)
+        parser.add_argument(
+            '--repeat', type=int, default=3,
+            help='Запусков на профиль; в отчет идет медиана.')
+        parser.add_argument(
+            '--output', help='Записать результаты в JSON-файл.')
+
+    def run_profile(self, profile, options):
+        environment = dict(
+            os.environ, DJANGO_ENV=profile,
+            DJANGO_SETTINGS_MODULE='yatube.settings')
+        completed = subprocess.run(
+            [sys.executable, '-m', 'core.startup',
+             '--url', options['url'],
+             '--requests', str(options['requests']),
+             '--warmup', str(options['warmup'])],
+            cwd=settings.BASE_DIR, env=environment,
+            stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+        if completed.returncode:
+            raise CommandError(
+                f'Профиль {profile} не запустился:\n{completed.stderr}')
+        return json.loads(completed.stdout.splitlines()[-1])
+
+    def handle(self, *args, **options):
+        if options['requests'] < 1 or options['repeat'] < 1:
+            raise CommandError('--requests и --repeat должны быть больше нуля')
+        results = {}
+        for profile in options['profiles'] or PROFILES:
+            runs = [self.run_profile(profile, options)
+                    for _ in range(options['repeat'])]
+            results[profile] = {
+                key: median(run[key] for run in runs)
+                for key in runs[0] if key != 'status'}
+            results[profile]['status'] = runs[0]['status']
+        self.print_table(results)
+        if options['output']:
+            with open(options['output'], 'w') as output:
+                json.dump(results, output, ensure_ascii=False, indent=2)
+
+    def print_table(self, results):
+        self.stdout.write(
+            f'{"профиль":<9}{"запуск":>9}{"модули":>8}{"среднее":>9}'
+            f'{"p50":>8}{"p95":>8}{"статус":>8}')
+        for profile, row in results.items():
+            self.stdout.write(
+                f'{profile:<9}{row["startup_ms"]:>9.1f}{row["modules"]:>8}'
+                f'{row["mean_ms"]:>9.3f}{row["p50_ms"]:>8.3f}'
+                f'{row["p95_ms"]:>8.3f}{row["status"]:>8}')
+        if {'dev', 'prod'} <= set(results):
+            dev, prod = results['dev'], results['prod']
+            self.stdout.write(
+                f'prod против dev: запуск '
+                f'{_change(dev["startup_ms"], prod["startup_ms"])}, '
+                f'запрос {_change(dev["mean_ms"], prod["mean_ms"])}')
+
+
+def _change(before, after):
+    return f'{(after - before) / before * 100:+.0f}%'
@@ -0,0 +1,270 @@
+"""Метрики работы приложения в текстовом формате Prometheus.
+
+Счетчики и гистограммы копят значения в памяти процесса. Если задан
+``METRICS_DIR``, процесс не реже раза в ``METRICS_FLUSH_INTERVAL`` секунд
+сохраняет свои значения в файл ``<pid>.json`` этого каталога, а страница
+``/metrics`` складывает файлы всех процессов: так видна сумма по всем
+воркерам сервера и фоновых задач. Все значения — суммы (гистограмма
+хранится накопленными корзинами), поэтому сложение файлов дает
+корректные итоги. Процесс с тем же pid продолжает счет из своего файла,
+а не обнуляет его.
+
+Откуда берутся значения:
+
+* ``core.middleware.MetricsMiddleware`` — время запроса, число и время
+  SQL-запросов по имени URL;
+* ``TimedDjangoTemplates`` — время отрисовки шаблонов страниц;
+* ``FragmentCache`` — попадания и промахи ``{% cache %}`` по фрагментам;
+* ``posts.thumbnails`` — время нарезки миниатюр одной картинки.
+"""
+import atexit
+import glob
+import json
+import os
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+from django.template.backends.django import DjangoTemplates, Template
+
+DEFAULT_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _labels(labels):
+    return tuple(sorted(labels.items()))
+
+
+class Registry:
+    """Значения метрик процесса и их сохранение в общий каталог."""
+
+    def __init__(self):
+        self.families = {}
+        self.samples = {}
+        self.lock = threading.Lock()
+        self.pid = None
+        self.flushed = 0.0
+
+    def register(self, metric):
+        self.families[metric.name] = metric
+        return metric
+
+    def _own_file(self):
+        return os.path.join(settings.METRICS_DIR, f'{os.getpid()}.json')
+
+    def _prepare(self):
+        """После fork начинает счет заново с файла своего pid."""
+        if self.pid == os.getpid():
+            return
+        self.pid = os.getpid()
+        self.samples = {}
+        if settings.METRICS_DIR:
+            self.samples = read_samples(self._own_file())
+
+    def add(self, amounts):
+        """Прибавляет значения вида ``[((имя, метки), число), ...]``."""
+        with self.lock:
+            self._prepare()
+            for key, amount in amounts:
+                self.samples[key] = self.samples.get(key, 0) + amount
+
+    def snapshot(self):
+        with self.lock:
+            self._prepare()
+            return dict(self.samples)
+
+    def flush(self, force=False):
+        """Сохраняет значения процесса, если пора или если force."""
+        now = time.monotonic()
+        if not settings.METRICS_DIR or not force and (
+                now - self.flushed < settings.METRICS_FLUSH_INTERVAL):
+            return
+        self.flushed = now
+        rows = [[name, list(map(list, labels)), value]
+                for (name, labels), value in self.snapshot().items()]
+        os.makedirs(settings.METRICS_DIR, exist_ok=True)
+        target = self._own_file()
+        temporary = f'{target}.{threading.get_ident()}.tmp'
+        with open(temporary, 'w') as output:
+            json.dump(rows, output)
+        os.replace(temporary, target)
+
+    def collect(self):
+        """Значения всех процессов: свои из памяти, чужие из файлов."""
+        samples = self.snapshot()
+        if settings.METRICS_DIR:
+            own = self._own_file()
+            pattern = os.path.join(settings.METRICS_DIR, '*.json')
+            for path in glob.glob(pattern):
+                if path == own:
+                    continue
+                for key, value in read_samples(path).items():
+                    samples[key] = samples.get(key, 0) + value
+        return samples
+
+
+def read_samples(path):
+    """Значения из файла процесса; битый или пропавший файл пуст."""
+    try:
+        with open(path) as source:
+            rows = json.load(source)
+    except (OSError, ValueError):
+        return {}
+    return {(name, tuple(map(tuple, labels))): value
+            for name, labels, value in rows}
+
+
+registry = Registry()
+atexit.register(registry.flush, force=True)
+
+
+class Counter:
+    kind = 'counter'
+    suffixes = ('_total',)
+
+    def __init__(self, name, documentation):
+        self.name = name
+        self.documentation = documentation
+        registry.register(self)
+
+    def inc(self, amount=1, **labels):
+        registry.add([((f'{self.name}_total', _labels(labels)), amount)])
+
+
+class Histogram:
+    kind = 'histogram'
+    suffixes = ('_bucket', '_sum', '_count')
+
+    def __init__(self, name, documentation, buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.buckets = [(bound, ('le', repr(bound))) for bound in buckets]
+        registry.register(self)
+
+    def observe(self, value, **labels):
+        labels = _labels(labels)
+        bucket = f'{self.name}_bucket'
+        amounts = [((bucket, labels + (le,)), int(value <= bound))
+                   for bound, le in self.buckets]
+        amounts.append(((bucket, labels + (('le', '+Inf'),)), 1))
+        amounts.append(((f'{self.name}_sum', labels), value))
+        amounts.append(((f'{self.name}_count', labels), 1))
+        registry.add(amounts)
+
+
+REQUEST_DURATION = Histogram(
+    'yatube_http_request_duration_seconds',
+    'Время обработки запроса по имени URL.')
+REQUESTS = Counter(
+    'yatube_http_requests', 'Запросы по имени URL, методу и статусу.')
+DB_QUERIES = Counter(
+    'yatube_db_queries', 'SQL-запросы по имени URL.')
+DB_QUERY_DURATION = Counter(
+    'yatube_db_query_duration_seconds',
+    'Суммарное время SQL-запросов по имени URL.')
+TEMPLATE_RENDER_DURATION = Histogram(
+    'yatube_template_render_duration_seconds',
+    'Время отрисовки шаблона страницы.')
+FRAGMENT_CACHE = Counter(
+    'yatube_fragment_cache_requests',
+    'Обращения к кешу фрагментов {% cache %} по имени и результату.')
+THUMBNAIL_DURATION = Histogram(
+    'yatube_thumbnail_render_duration_seconds',
+    'Время нарезки всех миниатюр одной картинки.')
+
+
+def _escape(value):
+    return (str(value).replace('\\', r'\\').replace('"', r'\"')
+            .replace('\n', r'\n'))
+
+
+def _format_sample(name, labels, value):
+    if labels:
+        pairs = ','.join(f'{key}="{_escape(label)}"' for key, label in labels)
+        name = f'{name}{{{pairs}}}'
+    return f'{name} {value!r}'
+
+
+def _order(item):
+    """Порядок строк: корзины гистограммы по возрастанию границы."""
+    (name, labels), _ = item
+    return name, [(key, float(value)) if key == 'le' else (key, value)
+                  for key, value in labels]
+
+
+def exposition():
+    """Все метрики в текстовом формате Prometheus 0.0.4."""
+    samples = sorted(registry.collect().items(), key=_order)
+    lines = []
+    for family in registry.families.values():
+        lines.append(f'# HELP {family.name} {family.documentation}')
+        lines.append(f'# TYPE {family.name} {family.kind}')
+        names = {family.name + suffix for suffix in family.suffixes}
+        lines.extend(
+            _format_sample(name, labels, value)
+            for (name, labels), value in samples if name in names)
+    return '\n'.join(lines) + '\n'
+
+
+class TimedTemplate(Template):
+    """Шаблон, который измеряет время своей отрисовки."""
+
+    def render(self, context=None, request=None):
+        start = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            TEMPLATE_RENDER_DURATION.observe(
+                time.perf_counter() - start, template=self.template.name)
+
+
+class TimedDjangoTemplates(DjangoTemplates):
+    """Шаблонизатор Django с учетом времени отрисовки страниц.
+
+    Вложенные ``{% include %}`` входят во время шаблона страницы.
+    """
+
+    def get_template(self, template_name):
+        return TimedTemplate(
+            super().get_template(template_name).template, self)
+
+
+class FragmentCache(BaseCache):
+    """Кеш ``template_fragments``, который считает попадания и промахи.
+
+    Значения хранятся в кеше из ``LOCATION`` (по умолчанию ``default``).
+    """
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        self.location = location or 'default'
+
+    @property
+    def target(self):
+        return caches[self.location]
+
+    def get(self, key, default=None, version=None):
+        missing = object()
+        value = self.target.get(key, missing, version)
+        # Ключ {% cache %} — template.cache.<имя фрагмента>.<хеш>.
+        fragment = key.split('.')[2] if key.count('.') >= 3 else key
+        FRAGMENT_CACHE.inc(
+            fragment=fragment, result='miss' if value is missing else 'hit')
+        return default if value is missing else value
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        return self.target.set(key, value, timeout, version)
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        return self.target.add(key, value, timeout, version)
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        return self.target.touch(key, timeout, version)
+
+    def delete(self, key, version=None):
+        return self.target.delete(key, version)
+
+    def clear(self):
+        return self.target.clear()
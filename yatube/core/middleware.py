@@ -0,0 +1,95 @@
+import logging
+import random
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+
+from . import metrics, slowlog
+from .query_budget import (
+    QueryBudgetExceeded, QueryCounter, check_budget, get_budget)
+
+logger = logging.getLogger(__name__)
+
+
+class QueryBudgetMiddleware:
+    """Проверяет число SQL-запросов запроса по бюджету view."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request.query_budget = None
+        with QueryCounter() as counter:
+            response = self.get_response(request)
+        if settings.DEBUG:
+            response['X-DB-Queries'] = counter.count
+            response['X-DB-Time'] = f'{counter.duration * 1000:.1f}'
+        try:
+            check_budget(counter, request.query_budget, request.path)
+        except QueryBudgetExceeded as error:
+            if settings.QUERY_BUDGET_RAISE:
+                raise
+            logger.warning(error)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        match = request.resolver_match
+        request.query_budget = get_budget(
+            view_func, match.view_name if match else None)
+
+
+class MetricsMiddleware:
+    """Записывает время запроса и его SQL-запросы в метрики по имени URL.
+
+    Стоит сразу после ``SlowRequestMiddleware``, чтобы в измерение вошли
+    все остальные middleware.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        start = time.perf_counter()
+        with QueryCounter() as counter:
+            response = self.get_response(request)
+        match = request.resolver_match
+        view = match.view_name if match else '<unresolved>'
+        metrics.REQUEST_DURATION.observe(
+            time.perf_counter() - start, view=view)
+        metrics.REQUESTS.inc(
+            view=view, method=request.method, status=response.status_code)
+        metrics.DB_QUERIES.inc(counter.count, view=view)
+        metrics.DB_QUERY_DURATION.inc(counter.duration, view=view)
+        metrics.registry.flush()
+        return response
+
+
+class SlowRequestMiddleware:
+    """Пишет в журнал запросы дольше ``SLOW_REQUEST_THRESHOLD``.
+
+    SQL записывается только в доле ``SLOW_LOG_SAMPLE_RATE`` запросов.
+    Стоит первым, чтобы ``EXPLAIN`` не попадал в метрики и бюджеты.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        threshold = settings.SLOW_REQUEST_THRESHOLD
+        if threshold is None:
+            return self.get_response(request)
+        recorder = None
+        with ExitStack() as stack:
+            if random.random() < settings.SLOW_LOG_SAMPLE_RATE:
+                recorder = slowlog.QueryRecorder()
+                for alias in connections:
+                    stack.enter_context(
+                        connections[alias].execute_wrapper(recorder))
+            start = time.perf_counter()
+            response = self.get_response(request)
+            duration = time.perf_counter() - start
+        if duration >= threshold:
+            slowlog.record_on_close(request, response, duration, recorder)
+        return response
@@ -0,0 +1,23 @@
+from django.db import models
+
+
+class Task(models.Model):
+    """Класс для фоновых задач в очереди."""
+
+    name = models.CharField('Задача', max_length=200)
+    payload = models.TextField('Аргументы (JSON)', default='{}')
+    run_at = models.DateTimeField('Выполнить после', db_index=True)
+    started = models.DateTimeField('Начало выполнения', null=True, blank=True)
+    attempts = models.PositiveSmallIntegerField('Попыток', default=0)
+    max_attempts = models.PositiveSmallIntegerField('Наибольшее число попыток')
+    error = models.TextField('Ошибка', blank=True)
+    created = models.DateTimeField('Дата создания', auto_now_add=True)
+
+    class Meta:
+        ordering = ('run_at', 'id')
+        verbose_name = 'Фоновая задача'
+        verbose_name_plural = 'Фоновые задачи'
+
+    def __str__(self) -> str:
+        """Возвращает имя задачи."""
+        return self.name
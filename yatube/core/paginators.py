@@ -0,0 +1,129 @@
+"""Паджинация по ключу (keyset) без COUNT и OFFSET.
+
+Страница выбирается условием по паре ``(key, pk)`` последней или первой
+записи соседней страницы, поэтому стоимость запроса не растёт с номером
+страницы. Ссылки вида ``?page=N`` поддерживаются через OFFSET, но только
+до ``PAGINATION_MAX_OFFSET_PAGE``.
+"""
+import base64
+import json
+from datetime import datetime
+
+from django.conf import settings
+from django.core.paginator import Page, Paginator
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+
+NEXT = 'n'
+PREVIOUS = 'p'
+
+
+def encode_cursor(key, pk, number, direction):
+    """Упаковывает позицию страницы в непрозрачный токен."""
+    if isinstance(key, datetime):
+        key = key.isoformat()
+    payload = json.dumps(
+        [key, pk, number, direction], separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    """Распаковывает токен; для испорченного токена возвращает None."""
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        key, pk, number, direction = json.loads(
+            base64.urlsafe_b64decode(padded.encode()))
+        if isinstance(key, str):
+            key = parse_datetime(key)
+        elif not isinstance(key, int):
+            return None
+        if key is None or direction not in (NEXT, PREVIOUS):
+            return None
+        return key, int(pk), max(int(number), 1), direction
+    except (TypeError, ValueError):
+        return None
+
+
+class KeysetPaginator(Paginator):
+    """Паджинатор по убыванию ``(key, pk)``.
+
+    Возвращает обычные ``Page``, у которых дополнительно заполнены
+    ``cursor``, ``next_cursor`` и ``previous_cursor``. Число страниц
+    не считается: известно только, есть ли страница после текущей.
+
+    Если у queryset явно задан ``order_by`` из двух полей по убыванию,
+    сортировка и условия курсора строятся по ним: так лента может идти
+    по индексу связанной таблицы, значения которой совпадают с
+    ``key`` и ``pk`` объекта.
+    """
+
+    def __init__(self, object_list, per_page, key='pub_date', **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        self.key = key
+        ordering = object_list.query.order_by
+        if len(ordering) != 2:
+            ordering = (key, 'pk')
+        self.lookups = [field.lstrip('-') for field in ordering]
+        self._num_pages = 1
+
+    @property
+    def num_pages(self):
+        return self._num_pages
+
+    def get_page(self, number=None, cursor=None):
+        """Возвращает страницу по токену, номеру или первую."""
+        position = decode_cursor(cursor) if cursor else None
+        if position is not None:
+            return self._keyset_page(*position, cursor=cursor)
+        try:
+            number = int(number)
+        except (TypeError, ValueError):
+            number = 1
+        number = min(max(number, 1), settings.PAGINATION_MAX_OFFSET_PAGE)
+        return self._offset_page(number)
+
+    def _ordered(self, descending=True):
+        sign = '-' if descending else ''
+        return self.object_list.order_by(
+            *(f'{sign}{lookup}' for lookup in self.lookups))
+
+    def _offset_page(self, number):
+        bottom = (number - 1) * self.per_page
+        items = list(self._ordered()[bottom:bottom + self.per_page + 1])
+        return self._build_page(items, number)
+
+    def _keyset_page(self, key, pk, number, direction, cursor):
+        key_lookup, pk_lookup = self.lookups
+        if direction == NEXT:
+            items = list(self._ordered().filter(
+                Q(**{f'{key_lookup}__lt': key})
+                | Q(**{key_lookup: key, f'{pk_lookup}__lt': pk})
+            )[:self.per_page + 1])
+            return self._build_page(items, number, cursor)
+        items = list(self._ordered(descending=False).filter(
+            Q(**{f'{key_lookup}__gt': key})
+            | Q(**{key_lookup: key, f'{pk_lookup}__gt': pk})
+        )[:self.per_page + 1])
+        if number <= 1 or len(items) <= self.per_page:
+            return self._offset_page(1)
+        items = items[:self.per_page][::-1]
+        return self._build_page(items, number, cursor, has_next=True)
+
+    def _build_page(self, items, number, cursor='', has_next=None):
+        """Собирает Page; лишняя запись сверх per_page означает next."""
+        if has_next is None:
+            has_next = len(items) > self.per_page
+        items = items[:self.per_page]
+        self._num_pages = number + 1 if has_next else number
+        page = Page(items, number, self)
+        page.cursor = cursor
+        page.next_cursor = page.previous_cursor = ''
+        if items and has_next:
+            last = items[-1]
+            page.next_cursor = encode_cursor(
+                getattr(last, self.key), last.pk, number + 1, NEXT)
+        if items and number > 1:
+            first = items[0]
+            page.previous_cursor = encode_cursor(
+                getattr(first, self.key), first.pk, number - 1, PREVIOUS)
+        return page
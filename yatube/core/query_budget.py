@@ -0,0 +1,68 @@
+"""Учет SQL-запросов запроса и бюджеты на их число для view.
+
+Бюджет объявляется декоратором ``query_budget`` у view; настройка
+``QUERY_BUDGETS`` по имени URL может его переопределить.
+``QueryBudgetMiddleware`` считает запросы и их время и пишет в лог или
+бросает исключение, если view вышла за бюджет.
+"""
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+
+
+class QueryBudgetExceeded(AssertionError):
+    """View выполнила больше SQL-запросов, чем ей разрешено."""
+
+
+class QueryCounter:
+    """Считает SQL-запросы и их суммарное время на всех подключениях."""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self._stack = None
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.count += 1
+            self.duration += time.perf_counter() - start
+
+    def __enter__(self):
+        self._stack = ExitStack()
+        for alias in connections:
+            self._stack.enter_context(
+                connections[alias].execute_wrapper(self))
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stack.close()
+
+
+def query_budget(limit):
+    """Объявляет максимальное число SQL-запросов для view."""
+    def decorator(view_func):
+        view_func.query_budget = limit
+        return view_func
+    return decorator
+
+
+def get_budget(view_func, view_name=None):
+    """Возвращает бюджет view или None, если он не объявлен.
+
+    Значение из ``QUERY_BUDGETS`` важнее объявленного в декораторе.
+    """
+    return settings.QUERY_BUDGETS.get(
+        view_name, getattr(view_func, 'query_budget', None))
+
+
+def check_budget(counter, budget, label):
+    """Бросает QueryBudgetExceeded, если счетчик превысил бюджет."""
+    if budget is not None and counter.count > budget:
+        raise QueryBudgetExceeded(
+            f'{label}: {counter.count} SQL-запросов '
+            f'({counter.duration * 1000:.1f} мс) при бюджете {budget}')
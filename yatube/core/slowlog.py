@@ -0,0 +1,190 @@
+"""Журнал медленных запросов с их SQL, планами и стеками.
+
+``SlowRequestMiddleware`` замеряет каждый запрос, а в доле
+``SLOW_LOG_SAMPLE_RATE`` запросов еще и ставит ``QueryRecorder`` на все
+подключения: он запоминает текст, параметры и время каждого SQL, а для
+запросов дольше ``SLOW_QUERY_THRESHOLD`` — стек вызова в коде проекта.
+Запрос дольше ``SLOW_REQUEST_THRESHOLD`` пишется в лог, а его запись
+с самыми медленными SQL и их ``EXPLAIN QUERY PLAN`` кладется в кольцевой
+буфер из ``SLOW_LOG_SIZE`` ячеек кеша ``SLOW_LOG_CACHE``.
+
+Запись собирается при закрытии ответа, когда тело уже отдано клиенту:
+``EXPLAIN`` не задерживает сам медленный ответ, но держит воркер, пока
+не выполнится. Быстрые запросы платят лишь за замер времени.
+
+Значения параметров SQL могут содержать пароли, токены и личные данные,
+поэтому по умолчанию в запись попадает только их число; сами значения
+сохраняются лишь при ``SLOW_LOG_PARAMS = True``.
+"""
+import logging
+import os
+import time
+import traceback
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connections
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+POSITION_KEY = 'slowlog:position'
+SLOT_KEY = 'slowlog:slot:{}'
+# Столько символов SQL и параметров сохраняется в записи.
+MAX_TEXT = 2000
+
+
+def _project_stack():
+    """Кадры стека из кода проекта, без Django и библиотек."""
+    frames = traceback.extract_stack()[:-2]
+    own = [frame for frame in frames if frame.filename.startswith(
+        settings.BASE_DIR + os.sep) and 'site-packages' not in frame.filename]
+    return traceback.format_list(own or frames[-10:])
+
+
+class QueryRecorder:
+    """Execute wrapper: время, текст и параметры каждого SQL-запроса."""
+
+    def __init__(self):
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = time.perf_counter() - start
+            stack = (_project_stack()
+                     if duration >= settings.SLOW_QUERY_THRESHOLD else None)
+            self.queries.append((
+                context['connection'].alias, sql, params, many, duration,
+                stack))
+
+
+def explain(alias, sql, params):
+    """План запроса SELECT или None, если его не построить."""
+    if not sql.lstrip().upper().startswith('SELECT'):
+        return None
+    connection = connections[alias]
+    prefix = ('EXPLAIN QUERY PLAN ' if connection.vendor == 'sqlite'
+              else 'EXPLAIN ')
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(prefix + sql, params)
+            return [' '.join(map(str, row)) for row in cursor.fetchall()]
+    except Exception as error:
+        return [f'Не удалось построить план: {error}']
+
+
+def _params(params):
+    """Параметры для записи: значения только при ``SLOW_LOG_PARAMS``."""
+    if settings.SLOW_LOG_PARAMS:
+        return repr(params)[:MAX_TEXT]
+    try:
+        return f'[скрыто: {len(params)}]'
+    except TypeError:
+        return '[скрыто]'
+
+
+def _query_entry(query):
+    alias, sql, params, many, duration, stack = query
+    slow = duration >= settings.SLOW_QUERY_THRESHOLD
+    return {
+        'sql': sql[:MAX_TEXT],
+        'params': _params(params),
+        'duration_ms': round(duration * 1000, 3),
+        'stack': stack,
+        'plan': explain(alias, sql, params) if slow and not many else None,
+    }
+
+
+def entry(request, response, duration, recorder=None):
+    """Запись журнала о медленном запросе."""
+    match = request.resolver_match
+    result = {
+        'time': timezone.now().isoformat(),
+        'method': request.method,
+        'path': request.get_full_path()[:MAX_TEXT],
+        'view': match.view_name if match else None,
+        'status': response.status_code,
+        'duration_ms': round(duration * 1000, 3),
+        'sampled': recorder is not None,
+    }
+    if recorder is not None:
+        queries = recorder.queries
+        slowest = sorted(queries, key=lambda query: query[4], reverse=True)
+        result['queries_count'] = len(queries)
+        result['sql_ms'] = round(
+            sum(query[4] for query in queries) * 1000, 3)
+        result['queries'] = [
+            _query_entry(query)
+            for query in slowest[:settings.SLOW_LOG_MAX_QUERIES]]
+    return result
+
+
+def _cache():
+    return caches[settings.SLOW_LOG_CACHE]
+
+
+def store(record):
+    """Кладет запись в кольцевой буфер поверх самой старой."""
+    cache = _cache()
+    cache.add(POSITION_KEY, 0, None)
+    try:
+        position = cache.incr(POSITION_KEY)
+    except ValueError:
+        # Счетчик вытеснили из кеша между add и incr.
+        cache.set(POSITION_KEY, 1, None)
+        position = 1
+    record['position'] = position
+    cache.set(SLOT_KEY.format(position % settings.SLOW_LOG_SIZE), record, None)
+
+
+def recent(limit=None):
+    """Записи буфера от новых к старым."""
+    slots = _cache().get_many(
+        [SLOT_KEY.format(slot) for slot in range(settings.SLOW_LOG_SIZE)])
+    records = sorted(
+        slots.values(), key=lambda record: record['position'], reverse=True)
+    return records[:limit]
+
+
+def clear():
+    cache = _cache()
+    cache.delete_many(
+        [SLOT_KEY.format(slot) for slot in range(settings.SLOW_LOG_SIZE)])
+    cache.delete(POSITION_KEY)
+
+
+def record(request, response, duration, recorder=None):
+    """Пишет медленный запрос в лог и в кольцевой буфер."""
+    result = entry(request, response, duration, recorder)
+    store(result)
+    logger.warning(
+        'Медленный запрос %s %s: %.0f мс, SQL: %s', result['method'],
+        result['path'], result['duration_ms'],
+        f'{result["queries_count"]} за {result["sql_ms"]:.0f} мс'
+        if recorder is not None else 'не записывался')
+    return result
+
+
+class _DeferredRecord:
+    """Пишет запись при закрытии ответа."""
+
+    def __init__(self, *args):
+        self.args = args
+
+    def close(self):
+        try:
+            record(*self.args)
+        except Exception:
+            logger.exception('Не удалось записать медленный запрос')
+
+
+def record_on_close(request, response, duration, recorder=None):
+    """Откладывает ``record`` до закрытия ответа после отдачи тела."""
+    # Так же FileResponse закрывает свой файл: close() ответа вызывает
+    # close() этих объектов до сигнала request_finished, пока
+    # подключения к базе еще открыты.
+    response._closable_objects.append(
+        _DeferredRecord(request, response, duration, recorder))
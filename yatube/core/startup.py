@@ -0,0 +1,61 @@
+"""Замер запуска и накладных расходов запроса в профиле настроек.
+
+Модуль запускается отдельным процессом (``python -m core.startup``) из
+команды ``startup_benchmark``: профиль выбирается при загрузке настроек
+и не меняется в процессе, поэтому каждый профиль мерится в своем
+интерпретаторе. Результат печатается одной строкой JSON.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+
+def measure(url, requests, warmup):
+    """Время запуска Django и задержки запросов к url в мс."""
+    start = time.perf_counter()
+    from django.core.wsgi import get_wsgi_application
+    from django.urls import get_resolver
+    get_wsgi_application()
+    # URLconf импортируется при первом запросе; загружаем его сразу.
+    get_resolver().url_patterns
+    startup = time.perf_counter() - start
+    modules = len(sys.modules)
+
+    from django.test import Client
+
+    from posts.benchmark import percentile
+
+    # Обычный посетитель, а не INTERNAL_IPS.
+    client = Client(REMOTE_ADDR='203.0.113.10')
+    for _ in range(warmup):
+        client.get(url)
+    timings = []
+    for _ in range(requests):
+        begin = time.perf_counter()
+        response = client.get(url)
+        timings.append((time.perf_counter() - begin) * 1000)
+    return {
+        'startup_ms': round(startup * 1000, 1),
+        'modules': modules,
+        'status': response.status_code,
+        'mean_ms': round(sum(timings) / len(timings), 3),
+        'p50_ms': round(percentile(timings, 50), 3),
+        'p95_ms': round(percentile(timings, 95), 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--url', default='/about/author/')
+    parser.add_argument('--requests', type=int, default=500)
+    parser.add_argument('--warmup', type=int, default=20)
+    options = parser.parse_args()
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yatube.settings')
+    print(json.dumps(measure(
+        options.url, options.requests, options.warmup)))
+
+
+if __name__ == '__main__':
+    main()
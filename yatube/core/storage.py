@@ -0,0 +1,82 @@
+"""Хранилище файлов с адресацией по содержимому.
+
+Имя файла складывается из SHA-256 его содержимого, поэтому одинаковые
+загрузки хранятся в одном экземпляре. Хеш считается во время записи во
+временный файл, и содержимое читается один раз. Хранилище не удаляет
+файлы само: одним файлом могут пользоваться несколько объектов, учет
+ссылок ведет приложение.
+
+``ManifestStaticStorage`` — хранилище статики боевого профиля.
+"""
+import hashlib
+import logging
+import os
+import tempfile
+
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+
+INCOMING_DIR = '.incoming'
+
+logger = logging.getLogger(__name__)
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    """Сохраняет файл по пути ``<каталог>/ab/cd/<sha256>.<расширение>``."""
+
+    def get_available_name(self, name, max_length=None):
+        # Одинаковое имя означает одинаковое содержимое: перезапись не нужна.
+        return name
+
+    def hashed_name(self, name, digest):
+        directory = os.path.dirname(name)
+        extension = os.path.splitext(name)[1].lower()
+        return os.path.join(
+            directory, digest[:2], digest[2:4], digest + extension)
+
+    def _incoming(self):
+        directory = self.path(INCOMING_DIR)
+        os.makedirs(directory, exist_ok=True)
+        return tempfile.NamedTemporaryFile(dir=directory, delete=False)
+
+    def _save(self, name, content):
+        digest = hashlib.sha256()
+        with self._incoming() as incoming:
+            try:
+                for chunk in content.chunks():
+                    if isinstance(chunk, str):
+                        chunk = chunk.encode()
+                    digest.update(chunk)
+                    incoming.write(chunk)
+            except BaseException:
+                os.remove(incoming.name)
+                raise
+        name = self.hashed_name(name, digest.hexdigest())
+        full_path = self.path(name)
+        if os.path.exists(full_path):
+            os.remove(incoming.name)
+        else:
+            os.makedirs(os.path.dirname(full_path), exist_ok=True)
+            os.replace(incoming.name, full_path)
+            if self.file_permissions_mode is not None:
+                os.chmod(full_path, self.file_permissions_mode)
+        return name.replace('\\', '/')
+
+
+class ManifestStaticStorage(ManifestStaticFilesStorage):
+    """Статика с хешем содержимого в имени и долгим кешированием.
+
+    Файл, которого нет ни в манифесте, ни на диске, отдается под своим
+    именем с предупреждением в лог, а не ломает страницу ошибкой 500.
+    """
+
+    manifest_strict = False
+
+    def stored_name(self, name):
+        try:
+            return super().stored_name(name)
+        except ValueError as error:
+            logger.warning(error)
+            return name
@@ -0,0 +1,142 @@
+"""Очередь фоновых задач в базе данных.
+
+Задача — функция из модуля ``tasks`` приложения, помеченная декоратором
+``task``; ``func.delay(...)`` или ``enqueue(name, ...)`` ставит ее в
+очередь строкой ``Task`` с аргументами в JSON. Строка пишется в текущей
+транзакции: воркер увидит задачу только после фиксации, а при откате
+она пропадет вместе с данными, ради которых ставилась.
+
+Команда ``runworker`` забирает задачи условным ``UPDATE`` и выполняет их
+в пуле потоков или процессов. Задача, которую забрали, но не выполнили
+за ``TASK_VISIBILITY_TIMEOUT`` секунд (воркер упал), снова становится
+видна. Упавшая задача повторяется с экспоненциальной задержкой, после
+``max_attempts`` попыток она остается в таблице с текстом ошибки.
+При ``TASKS_ALWAYS_EAGER`` задачи выполняются в текущем процессе сразу
+после фиксации транзакции.
+"""
+import json
+import logging
+import traceback
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import timedelta
+
+import django
+from django.conf import settings
+from django.db import close_old_connections, connections, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import Task
+
+logger = logging.getLogger(__name__)
+
+_registry = {}
+
+
+def task(name=None, max_attempts=None):
+    """Регистрирует функцию как фоновую задачу и добавляет ей ``delay``."""
+    def decorator(func):
+        task_name = name or f'{func.__module__}.{func.__name__}'
+        _registry[task_name] = (func, max_attempts)
+        func.task_name = task_name
+        func.delay = lambda *args, **kwargs: enqueue(
+            task_name, args, kwargs)
+        return func
+    return decorator
+
+
+def enqueue(name, args=(), kwargs=None, delay=0):
+    """Ставит задачу в очередь; аргументы должны сериализоваться в JSON."""
+    payload = json.dumps({'args': list(args), 'kwargs': kwargs or {}})
+    if settings.TASKS_ALWAYS_EAGER:
+        transaction.on_commit(lambda: call(name, payload))
+        return None
+    max_attempts = _registry.get(name, (None, None))[1]
+    return Task.objects.create(
+        name=name, payload=payload,
+        run_at=timezone.now() + timedelta(seconds=delay),
+        max_attempts=max_attempts or settings.TASK_MAX_ATTEMPTS)
+
+
+def call(name, payload):
+    """Выполняет задачу по имени с аргументами из JSON."""
+    if name not in _registry:
+        raise LookupError(f'Неизвестная задача: {name}')
+    func = _registry[name][0]
+    arguments = json.loads(payload)
+    return func(*arguments['args'], **arguments['kwargs'])
+
+
+def claim(limit):
+    """Забирает готовые к выполнению задачи, в том числе брошенные."""
+    now = timezone.now()
+    stale = now - timedelta(seconds=settings.TASK_VISIBILITY_TIMEOUT)
+    candidates = Task.objects.filter(
+        Q(started__isnull=True) | Q(started__lt=stale),
+        run_at__lte=now, attempts__lt=F('max_attempts'))
+    claimed = []
+    for pk, started in candidates.values_list('pk', 'started')[:limit]:
+        taken = Task.objects.filter(pk=pk, started=started).update(
+            started=now, attempts=F('attempts') + 1)
+        if taken:
+            claimed.append(pk)
+    return claimed
+
+
+def retry_delay(attempts):
+    """Пауза перед следующей попыткой: удваивается с каждой неудачей."""
+    return settings.TASK_RETRY_DELAY * 2 ** (attempts - 1)
+
+
+def execute(task_id):
+    """Выполняет забранную задачу; возвращает True, если она удалась."""
+    task_row = Task.objects.filter(pk=task_id).first()
+    if task_row is None:
+        return False
+    try:
+        call(task_row.name, task_row.payload)
+    except Exception:
+        final = task_row.attempts >= task_row.max_attempts
+        (logger.error if final else logger.warning)(
+            'Задача %s упала (попытка %s из %s)', task_row.name,
+            task_row.attempts, task_row.max_attempts, exc_info=True)
+        Task.objects.filter(pk=task_id).update(
+            started=None, error=traceback.format_exc(),
+            run_at=timezone.now() + timedelta(
+                seconds=retry_delay(task_row.attempts)))
+        return False
+    Task.objects.filter(pk=task_id).delete()
+    return True
+
+
+def _execute_in_pool(task_id):
+    """Выполняет задачу в потоке или процессе пула со своим подключением."""
+    close_old_connections()
+    try:
+        return execute(task_id)
+    finally:
+        close_old_connections()
+
+
+def _setup_worker():
+    django.setup()
+
+
+def pool(workers, processes=False):
+    """Пул для выполнения задач: потоки или отдельные процессы."""
+    if processes:
+        # Подключения к базе не должны достаться дочерним процессам.
+        connections.close_all()
+        return ProcessPoolExecutor(workers, initializer=_setup_worker)
+    return ThreadPoolExecutor(workers)
+
+
+def process(executor=None, limit=100):
+    """Выполняет одну порцию задач; возвращает (выполнено, упало)."""
+    task_ids = claim(limit)
+    if executor is None:
+        results = [execute(task_id) for task_id in task_ids]
+    else:
+        results = list(executor.map(_execute_in_pool, task_ids))
+    done = sum(results)
+    return done, len(results) - done
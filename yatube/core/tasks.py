@@ -0,0 +1,13 @@
+"""Общие фоновые задачи."""
+from django.core.mail import EmailMultiAlternatives
+
+from .taskqueue import task
+
+
+@task()
+def send_email(subject, body, from_email, to, html=None):
+    """Отправляет письмо."""
+    message = EmailMultiAlternatives(subject, body, from_email, to)
+    if html:
+        message.attach_alternative(html, 'text/html')
+    message.send()
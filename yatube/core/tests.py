@@ -1,10 +1,419 @@
-from django.test import TestCase
+import asyncio
+import os
+import shutil
+import tempfile
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.core import mail
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.db import transaction
+from django.http import HttpResponse
+from django.test import (
+    RequestFactory, SimpleTestCase, TestCase, override_settings)
+from django.urls import reverse
+from django.utils import timezone
 
 from http import HTTPStatus
 
+from . import asgi, metrics, slowlog, startup, taskqueue
+from .middleware import SlowRequestMiddleware
+from .models import Task
+from .query_budget import QueryBudgetExceeded, get_budget, query_budget
+from .storage import (
+    INCOMING_DIR, ContentAddressedStorage, ManifestStaticStorage)
+
+CALLS = []
+
+
+@taskqueue.task(name='core.tests.record', max_attempts=2)
+def record(value, fail=False):
+    CALLS.append(value)
+    if fail:
+        raise RuntimeError('сбой')
+
 
 class ViewTestClass(TestCase):
     def test_404_page_not_found(self):
         response = self.client.get('/nonexist-page/')
         self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
         self.assertTemplateUsed(response, 'core/404.html')
+
+
+@override_settings(QUERY_BUDGET_RAISE=True)
+class QueryBudgetTestClass(TestCase):
+    def test_view_over_budget_raises(self):
+        with override_settings(QUERY_BUDGETS={'posts:index': 0}):
+            with self.assertRaises(QueryBudgetExceeded):
+                self.client.get(reverse('posts:index'))
+
+    def test_view_within_budget(self):
+        response = self.client.get(reverse('posts:index'))
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+
+    def test_decorator_declares_budget(self):
+        @query_budget(3)
+        def view(request):
+            pass
+        self.assertEqual(get_budget(view, 'posts:missing'), 3)
+
+
+class ContentAddressedStorageTestClass(SimpleTestCase):
+    def setUp(self):
+        self.location = tempfile.mkdtemp()
+        self.storage = ContentAddressedStorage(location=self.location)
+
+    def tearDown(self):
+        shutil.rmtree(self.location, ignore_errors=True)
+
+    def test_same_content_is_stored_once(self):
+        first = self.storage.save('posts/a.JPG', ContentFile(b'meme'))
+        second = self.storage.save('posts/b.jpg', ContentFile(b'meme'))
+        self.assertEqual(first, second)
+        self.assertTrue(first.startswith('posts/'))
+        self.assertTrue(first.endswith('.jpg'))
+        self.assertEqual(os.listdir(self.storage.path(INCOMING_DIR)), [])
+
+    def test_different_content_gets_different_names(self):
+        first = self.storage.save('posts/a.jpg', ContentFile(b'meme'))
+        second = self.storage.save('posts/a.jpg', ContentFile(b'other'))
+        self.assertNotEqual(first, second)
+        with self.storage.open(second) as file:
+            self.assertEqual(file.read(), b'other')
+
+
+@override_settings(TASK_RETRY_DELAY=10, TASK_VISIBILITY_TIMEOUT=60)
+class TaskQueueTestClass(TestCase):
+    def setUp(self):
+        CALLS.clear()
+
+    def test_task_runs_and_is_removed(self):
+        record.delay('ok')
+        self.assertEqual(CALLS, [])
+        self.assertEqual(taskqueue.process(), (1, 0))
+        self.assertEqual(CALLS, ['ok'])
+        self.assertFalse(Task.objects.exists())
+
+    def test_retry_with_backoff(self):
+        record.delay('bad', fail=True)
+        self.assertEqual(taskqueue.process(), (0, 1))
+        task = Task.objects.get()
+        self.assertEqual(task.attempts, 1)
+        self.assertIn('RuntimeError', task.error)
+        self.assertGreater(
+            task.run_at, timezone.now() + timedelta(seconds=9))
+        self.assertEqual(taskqueue.process(), (0, 0))
+        Task.objects.update(run_at=timezone.now())
+        self.assertEqual(taskqueue.process(), (0, 1))
+        self.assertEqual(taskqueue.retry_delay(2), 20)
+        Task.objects.update(run_at=timezone.now())
+        self.assertEqual(taskqueue.process(), (0, 0))
+        self.assertEqual(CALLS, ['bad', 'bad'])
+
+    def test_visibility_timeout(self):
+        record.delay('lost')
+        self.assertEqual(len(taskqueue.claim(10)), 1)
+        self.assertEqual(taskqueue.claim(10), [])
+        Task.objects.update(
+            started=timezone.now() - timedelta(seconds=61))
+        self.assertEqual(taskqueue.process(), (1, 0))
+
+    def test_rollback_drops_task(self):
+        try:
+            with transaction.atomic():
+                record.delay('rolled back')
+                raise RuntimeError
+        except RuntimeError:
+            pass
+        self.assertFalse(Task.objects.exists())
+
+    def test_password_reset_email_is_queued(self):
+        get_user_model().objects.create_user(
+            'darth', 'darth@example.com', 'password')
+        self.client.post(
+            reverse('users:password_reset'), {'email': 'darth@example.com'})
+        self.assertEqual(len(mail.outbox), 0)
+        self.assertEqual(Task.objects.get().name, 'core.tasks.send_email')
+        taskqueue.process()
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, ['darth@example.com'])
+
+
+def call_asgi(application, scope, body_messages=()):
+    """Выполняет ASGI-вызов и возвращает отправленные сообщения."""
+    incoming = list(body_messages) or [{'type': 'http.request'}]
+    sent = []
+
+    async def receive():
+        return incoming.pop(0)
+
+    async def send(message):
+        sent.append(message)
+
+    asyncio.run(application(scope, receive, send))
+    return sent
+
+
+class AsgiTestClass(SimpleTestCase):
+    def test_request_runs_in_pool(self):
+        """Запрос выполняется обработчиком Django и отдается по кускам"""
+        sent = call_asgi(asgi.ASGIHandler(), {
+            'type': 'http', 'method': 'GET', 'path': '/about/author/',
+            'query_string': b'', 'headers': [(b'host', b'testserver')],
+        })
+        self.assertEqual(sent[0]['type'], 'http.response.start')
+        self.assertEqual(sent[0]['status'], HTTPStatus.OK)
+        self.assertIn((b'content-type', b'text/html; charset=utf-8'),
+                      sent[0]['headers'])
+        body = b''.join(message.get('body', b'') for message in sent[1:])
+        self.assertIn('<html'.encode(), body)
+        self.assertFalse(sent[-1].get('more_body', False))
+
+    def test_environ(self):
+        """Заголовки и путь переводятся в окружение WSGI"""
+        environ = asgi.environ({
+            'method': 'POST', 'path': '/группа/', 'query_string': b'a=1',
+            'headers': [(b'content-type', b'text/plain'),
+                        (b'x-tag', b'a'), (b'x-tag', b'b')],
+        }, None)
+        self.assertEqual(
+            environ['PATH_INFO'].encode('latin-1').decode(), '/группа/')
+        self.assertEqual(environ['QUERY_STRING'], 'a=1')
+        self.assertEqual(environ['CONTENT_TYPE'], 'text/plain')
+        self.assertEqual(environ['HTTP_X_TAG'], 'a,b')
+
+    def test_split_cookie_headers(self):
+        """Несколько заголовков Cookie склеиваются через «; »"""
+        environ = asgi.environ({
+            'method': 'GET', 'path': '/',
+            'headers': [(b'cookie', b'sessionid=abc'),
+                        (b'cookie', b'csrftoken=def')],
+        }, None)
+        self.assertEqual(
+            environ['HTTP_COOKIE'], 'sessionid=abc; csrftoken=def')
+
+    def test_body_is_read_on_demand(self):
+        """Тело запроса читается из receive по мере надобности"""
+        messages = [
+            {'type': 'http.request', 'body': b'abc', 'more_body': True},
+            {'type': 'http.request', 'body': b'def', 'more_body': False},
+        ]
+
+        async def receive():
+            return messages.pop(0)
+
+        async def read():
+            body = asgi.RequestBody(receive, asyncio.get_running_loop())
+            loop = asyncio.get_running_loop()
+            first = await loop.run_in_executor(None, body.read, 2)
+            pending = len(messages)
+            rest = await loop.run_in_executor(None, body.read)
+            return first, pending, rest
+
+        self.assertEqual(asyncio.run(read()), (b'ab', 1, b'cdef'))
+
+    def test_lifespan(self):
+        """Сервер получает подтверждение запуска и остановки"""
+        sent = call_asgi(asgi.ASGIHandler(), {'type': 'lifespan'}, [
+            {'type': 'lifespan.startup'}, {'type': 'lifespan.shutdown'}])
+        self.assertEqual([message['type'] for message in sent], [
+            'lifespan.startup.complete', 'lifespan.shutdown.complete'])
+
+
+class MetricsTestClass(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def sample(self, name, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        return metrics.registry.snapshot().get(key, 0)
+
+    def test_request_metrics(self):
+        """Запрос попадает в метрики по имени URL вместе с SQL и шаблоном"""
+        requests = self.sample(
+            'yatube_http_requests_total',
+            view='posts:index', method='GET', status=200)
+        renders = self.sample(
+            'yatube_template_render_duration_seconds_count',
+            template='posts/index.html')
+        misses = self.sample(
+            'yatube_fragment_cache_requests_total',
+            fragment='index_page', result='miss')
+        hits = self.sample(
+            'yatube_fragment_cache_requests_total',
+            fragment='index_page', result='hit')
+        self.client.get(reverse('posts:index'))
+        self.client.get(reverse('posts:index'))
+        self.assertEqual(self.sample(
+            'yatube_http_requests_total',
+            view='posts:index', method='GET', status=200), requests + 2)
+        self.assertEqual(self.sample(
+            'yatube_template_render_duration_seconds_count',
+            template='posts/index.html'), renders + 2)
+        self.assertEqual(self.sample(
+            'yatube_fragment_cache_requests_total',
+            fragment='index_page', result='miss'), misses + 1)
+        self.assertEqual(self.sample(
+            'yatube_fragment_cache_requests_total',
+            fragment='index_page', result='hit'), hits + 1)
+        self.assertGreater(
+            self.sample('yatube_db_queries_total', view='posts:index'), 0)
+
+    def test_endpoint(self):
+        """Страница /metrics отдает текстовый формат Prometheus"""
+        self.client.get(reverse('posts:index'))
+        response = self.client.get('/metrics')
+        self.assertEqual(
+            response['Content-Type'],
+            'text/plain; version=0.0.4; charset=utf-8')
+        text = response.content.decode()
+        self.assertIn(
+            '# TYPE yatube_http_request_duration_seconds histogram', text)
+        buckets = [line for line in text.splitlines() if line.startswith(
+            'yatube_http_request_duration_seconds_bucket{view="posts:index"')]
+        self.assertTrue(buckets[0].split()[0].endswith('le="0.005"}'))
+        self.assertTrue(buckets[-1].split()[0].endswith('le="+Inf"}'))
+
+    @override_settings(METRICS_ALLOWED_IPS=['10.0.0.1'], METRICS_TOKEN='s3')
+    def test_endpoint_access(self):
+        """/metrics открыт только адресам из списка и по токену"""
+        self.assertEqual(self.client.get('/metrics').status_code, 403)
+        self.assertEqual(self.client.get(
+            '/metrics', HTTP_AUTHORIZATION='Bearer wrong').status_code, 403)
+        self.assertEqual(self.client.get(
+            '/metrics', HTTP_AUTHORIZATION='Bearer s3').status_code, 200)
+        self.assertEqual(self.client.get(
+            '/metrics', REMOTE_ADDR='10.0.0.1').status_code, 200)
+
+    def test_processes_are_summed(self):
+        """Значения процессов из общего каталога складываются"""
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        with override_settings(METRICS_DIR=directory):
+            registry = metrics.Registry()
+            registry.add([(('hits_total', (('page', 'a'),)), 2)])
+            registry.flush(force=True)
+            self.assertEqual(metrics.read_samples(os.path.join(
+                directory, f'{os.getpid()}.json')), registry.snapshot())
+            with open(os.path.join(directory, '1.json'), 'w') as output:
+                output.write('[["hits_total", [["page", "a"]], 5]]')
+            self.assertEqual(registry.collect(), {
+                ('hits_total', (('page', 'a'),)): 7})
+
+
+@override_settings(
+    SLOW_REQUEST_THRESHOLD=0, SLOW_QUERY_THRESHOLD=0,
+    SLOW_LOG_SAMPLE_RATE=1, SLOW_LOG_SIZE=3)
+class SlowLogTestClass(TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        super().setUpClass()
+        cls.user = get_user_model().objects.create(username='darth')
+
+    def setUp(self):
+        slowlog.clear()
+
+    def test_slow_request_is_recorded(self):
+        """Медленный запрос записывается с SQL, планом и стеком"""
+        with self.assertLogs('core.slowlog', 'WARNING'):
+            self.client.get(reverse('posts:profile', args=['darth']))
+        record = slowlog.recent()[0]
+        self.assertEqual(record['view'], 'posts:profile')
+        self.assertTrue(record['sampled'])
+        self.assertEqual(record['queries_count'], len(record['queries']))
+        query = next(query for query in record['queries']
+                     if '"auth_user"."username" =' in query['sql'])
+        self.assertEqual(query['params'], '[скрыто: 1]')
+        self.assertTrue(query['plan'])
+        self.assertTrue(any(
+            'posts/views.py' in frame for frame in query['stack']))
+
+    @override_settings(SLOW_LOG_PARAMS=True)
+    def test_params_are_kept_on_request(self):
+        """Значения параметров сохраняются только по настройке"""
+        with self.assertLogs('core.slowlog', 'WARNING'):
+            self.client.get(reverse('posts:profile', args=['darth']))
+        self.assertTrue(any(
+            "'darth'" in query['params']
+            for query in slowlog.recent()[0]['queries']))
+
+    def test_recorded_after_response_is_closed(self):
+        """Запись с планами собирается при закрытии ответа"""
+        middleware = SlowRequestMiddleware(
+            lambda request: HttpResponse('ok'))
+        request = RequestFactory().get('/')
+        request.resolver_match = None
+        response = middleware(request)
+        self.assertEqual(slowlog.recent(), [])
+        with self.assertLogs('core.slowlog', 'WARNING'):
+            response.close()
+        self.assertEqual(slowlog.recent()[0]['path'], '/')
+
+    @override_settings(SLOW_LOG_SAMPLE_RATE=0)
+    def test_unsampled_request_has_no_queries(self):
+        """Без выборки записывается только время запроса"""
+        with self.assertLogs('core.slowlog', 'WARNING'):
+            self.client.get(reverse('posts:index'))
+        record = slowlog.recent()[0]
+        self.assertFalse(record['sampled'])
+        self.assertNotIn('queries', record)
+
+    @override_settings(SLOW_REQUEST_THRESHOLD=None)
+    def test_disabled(self):
+        self.client.get(reverse('posts:index'))
+        self.assertEqual(slowlog.recent(), [])
+
+    @override_settings(SLOW_REQUEST_THRESHOLD=60)
+    def test_ring_buffer(self):
+        """Буфер хранит только последние записи"""
+        for number in range(5):
+            slowlog.store({'number': number})
+        self.assertEqual(
+            [record['number'] for record in slowlog.recent()], [4, 3, 2])
+
+    @override_settings(SLOW_REQUEST_THRESHOLD=60)
+    def test_view_is_for_staff(self):
+        """Журнал доступен только персоналу"""
+        slowlog.store({'path': '/profile/darth/'})
+        url = reverse('slow_requests')
+        self.client.force_login(self.user)
+        self.assertEqual(self.client.get(url).status_code, HTTPStatus.FOUND)
+        self.user.is_staff = True
+        self.user.save()
+        response = self.client.get(url)
+        self.assertEqual(
+            response.json()['results'][0]['path'], '/profile/darth/')
+
+
+class SettingsProfilesTestClass(SimpleTestCase):
+    def test_prod_profile(self):
+        """Боевой профиль без debug_toolbar и с оптимизациями"""
+        from yatube.settings import base, prod
+        self.assertFalse(prod.DEBUG)
+        self.assertNotIn('debug_toolbar', prod.INSTALLED_APPS)
+        self.assertFalse(any('debug_toolbar' in name
+                             for name in prod.MIDDLEWARE))
+        self.assertIn('django.middleware.gzip.GZipMiddleware', prod.MIDDLEWARE)
+        loader, _ = prod.TEMPLATES[0]['OPTIONS']['loaders'][0]
+        self.assertEqual(loader, 'django.template.loaders.cached.Loader')
+        self.assertGreater(prod.DATABASES['default']['CONN_MAX_AGE'], 0)
+        self.assertNotIn('locmem', prod.CACHES['default']['BACKEND'])
+        self.assertNotIn(
+            'django.middleware.gzip.GZipMiddleware', base.MIDDLEWARE)
+
+    def test_missing_static_file_keeps_its_name(self):
+        """Статика без записи в манифесте отдается под исходным именем"""
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        storage = ManifestStaticStorage(location=directory)
+        with self.assertLogs('core.storage', 'WARNING'):
+            self.assertEqual(storage.url('css/missing.css'),
+                             '/static/css/missing.css')
+
+    def test_startup_measure(self):
+        """Замер запуска возвращает время запуска и задержки запросов"""
+        result = startup.measure('/about/author/', requests=2, warmup=0)
+        self.assertEqual(result['status'], HTTPStatus.OK)
+        self.assertGreater(result['startup_ms'], 0)
+        self.assertGreater(result['modules'], 0)
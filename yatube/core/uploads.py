@@ -0,0 +1,162 @@
+"""Ограничения на загружаемые картинки.
+
+``ImageUploadHandler`` стоит первым в ``FILE_UPLOAD_HANDLERS`` и смотрит
+на поток загрузки: считает байты и, как только пришел заголовок
+картинки, читает из него размеры. Слишком большой файл или «бомба
+распаковки» отбрасываются сразу, остаток загрузки не сохраняется ни в
+память, ни на диск: на месте файла форма получает ``RejectedUpload`` с
+причиной отказа, а ``UploadImageField`` показывает эту причину как
+ошибку поля. ``validate_image_size`` и ``fit_image`` проверяют
+картинку в форме и при необходимости уменьшают огромные оригиналы до
+сохранения.
+"""
+import io
+import os
+import warnings
+
+from django import forms
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.files.uploadedfile import InMemoryUploadedFile, UploadedFile
+from django.core.files.uploadhandler import FileUploadHandler
+from django.template.defaultfilters import filesizeformat
+from PIL import Image, ImageOps
+
+# Столько байт начала файла хватает, чтобы прочитать заголовок с EXIF.
+HEADER_BYTES = 256 * 1024
+
+
+def image_size(head):
+    """Размеры картинки по началу файла или None, если их не прочитать."""
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', Image.DecompressionBombWarning)
+        try:
+            with Image.open(io.BytesIO(head)) as image:
+                return image.size
+        except Image.DecompressionBombError:
+            raise
+        except Exception:
+            return None
+
+
+def size_error(width, height):
+    """Текст ошибки, если в картинке больше пикселей, чем разрешено."""
+    limit = settings.IMAGE_UPLOAD_MAX_PIXELS
+    if width * height > limit:
+        return (f'Картинка {width}×{height} слишком большая: '
+                f'допускается не больше {limit // 10 ** 6} Мп.')
+    return None
+
+
+def bytes_error():
+    limit = settings.IMAGE_UPLOAD_MAX_BYTES
+    return f'Файл больше {filesizeformat(limit)}.'
+
+
+class RejectedUpload(UploadedFile):
+    """Пустой файл на месте отброшенной загрузки с причиной отказа."""
+
+    def __init__(self, name, content_type, rejection):
+        super().__init__(io.BytesIO(), name, content_type, 0)
+        self.rejection = rejection
+
+
+class UploadImageField(forms.ImageField):
+    """Поле картинки, сообщающее, почему загрузка была отброшена."""
+
+    def to_python(self, data):
+        rejection = getattr(data, 'rejection', None)
+        if rejection:
+            raise ValidationError(rejection, code='rejected')
+        return super().to_python(data)
+
+
+class ImageUploadHandler(FileUploadHandler):
+    """Проверяет размер файла и картинки, пока загрузка идет потоком."""
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self.received = 0
+        self.head = b''
+        self.checked = False
+        self.rejection = None
+
+    def receive_data_chunk(self, raw_data, start):
+        if self.rejection:
+            return None
+        self.received += len(raw_data)
+        if self.received > settings.IMAGE_UPLOAD_MAX_BYTES:
+            self.rejection = bytes_error()
+            return None
+        if not self.checked:
+            self.head += raw_data
+            self.check_header()
+            if self.rejection:
+                return None
+        return raw_data
+
+    def check_header(self):
+        try:
+            size = image_size(self.head)
+        except Image.DecompressionBombError:
+            self.rejection = 'Картинка похожа на «бомбу распаковки».'
+            return
+        if size is not None:
+            self.rejection = size_error(*size)
+        if size is not None or len(self.head) >= HEADER_BYTES:
+            # Нераспознанный файл проверит поле формы.
+            self.checked = True
+            self.head = b''
+
+    def file_complete(self, file_size):
+        if self.rejection:
+            return RejectedUpload(
+                self.file_name, self.content_type, self.rejection)
+        return None
+
+
+def downscale(file, max_side):
+    """Уменьшает картинку так, чтобы ее стороны не превышали max_side.
+
+    JPEG декодируется сразу в уменьшенном масштабе, поэтому полноразмерный
+    растр в памяти не появляется.
+    """
+    file.seek(0)
+    image = Image.open(file)
+    if getattr(image, 'is_animated', False):
+        file.seek(0)
+        return file
+    image_format = image.format
+    image.thumbnail((max_side, max_side), Image.LANCZOS)
+    image = ImageOps.exif_transpose(image)
+    if image_format == 'JPEG' and image.mode not in ('RGB', 'L'):
+        image = image.convert('RGB')
+    buffer = io.BytesIO()
+    options = {'quality': 90} if image_format in ('JPEG', 'WEBP') else {}
+    if image_format == 'JPEG' and image.info.get('exif'):
+        # Поворот уже применен и убран из EXIF, остальное сохраняем.
+        options['exif'] = image.info['exif']
+    image.save(buffer, image_format, **options)
+    name = os.path.basename(file.name)
+    return InMemoryUploadedFile(
+        buffer, getattr(file, 'field_name', None), name,
+        Image.MIME.get(image_format), buffer.tell(), None)
+
+
+def validate_image_size(file):
+    """Валидатор поля картинки: размер файла и число пикселей."""
+    if getattr(file, 'size', 0) > settings.IMAGE_UPLOAD_MAX_BYTES:
+        raise ValidationError(bytes_error(), code='file_too_big')
+    image = getattr(file, 'image', None)
+    error = image and size_error(*image.size)
+    if error:
+        raise ValidationError(error, code='image_too_big')
+
+
+def fit_image(file):
+    """Уменьшает только что загруженную картинку, если так настроено."""
+    max_side = settings.IMAGE_UPLOAD_DOWNSCALE
+    image = getattr(file, 'image', None)
+    if image is None or not max_side or max(image.size) <= max_side:
+        return file
+    return downscale(file, max_side)
@@ -1,7 +1,16 @@
+from django.conf import settings
+from django.contrib.admin.views.decorators import staff_member_required
+from django.core.exceptions import PermissionDenied
+from django.http import HttpResponse, JsonResponse
 from django.shortcuts import render
+from django.utils.crypto import constant_time_compare
 
 from http import HTTPStatus
 
+from . import slowlog
+from .metrics import exposition
+from .query_budget import query_budget
+
 
 def page_not_found(request, exception):
     """Возвращает кастомную страницу 404."""
@@ -24,3 +33,30 @@ def permission_denied(request, exception):
 
 def csrf_failure(request, reason=''):
     return render(request, 'core/403csrf.html')
+
+
+def metrics_allowed(request):
+    """Пускает к метрикам адреса из списка и запросы с токеном."""
+    if request.META.get('REMOTE_ADDR') in settings.METRICS_ALLOWED_IPS:
+        return True
+    token = settings.METRICS_TOKEN
+    return bool(token) and constant_time_compare(
+        request.META.get('HTTP_AUTHORIZATION', ''), f'Bearer {token}')
+
+
+@query_budget(0)
+def metrics(request):
+    """Возвращает метрики всех процессов в формате Prometheus."""
+    if not metrics_allowed(request):
+        raise PermissionDenied
+    return HttpResponse(
+        exposition(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+@query_budget(2)
+@staff_member_required
+def slow_requests(request):
+    """Возвращает последние записи журнала медленных запросов."""
+    return JsonResponse(
+        {'results': slowlog.recent()},
+        json_dumps_params={'ensure_ascii': False})
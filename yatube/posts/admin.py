@@ -1,9 +1,20 @@
 from django.contrib import admin
 
-from .models import Group, Post, Comment, Follow
+from . import search
+from .models import (
+    CensoredWord, Comment, Follow, Group, Post, ThumbnailJob)
 
 
-class PostAdmin(admin.ModelAdmin):
+class FullTextSearchMixin:
+    """Поиск в списке объектов через бэкенд полнотекстового поиска."""
+
+    def get_search_results(self, request, queryset, search_term):
+        if not search_term:
+            return queryset, False
+        return search.get_backend().filter(queryset, search_term), False
+
+
+class PostAdmin(FullTextSearchMixin, admin.ModelAdmin):
     """Класс для админки Post."""
 
     list_display = (
@@ -32,7 +43,7 @@ class GroupAdmin(admin.ModelAdmin):
     search_fields = ('title', 'descripition',)
 
 
-class CommentAdmin(admin.ModelAdmin):
+class CommentAdmin(FullTextSearchMixin, admin.ModelAdmin):
     """Класс для админки Comment."""
 
     list_display = (
@@ -53,6 +64,30 @@ class FollowAdmin(admin.ModelAdmin):
     )
 
 
+class ThumbnailJobAdmin(admin.ModelAdmin):
+    """Класс для админки ThumbnailJob."""
+
+    list_display = (
+        'post',
+        'source',
+        'created',
+        'started',
+        'attempts',
+        'error',
+    )
+    list_filter = ('attempts',)
+
+
+class CensoredWordAdmin(admin.ModelAdmin):
+    """Класс для админки CensoredWord."""
+
+    list_display = (
+        'word',
+        'created',
+    )
+    search_fields = ('word',)
+
+
 admin.site.register(Comment, CommentAdmin)
 
 admin.site.register(Post, PostAdmin)
@@ -60,3 +95,7 @@ admin.site.register(Post, PostAdmin)
 admin.site.register(Group, GroupAdmin)
 
 admin.site.register(Follow, FollowAdmin)
+
+admin.site.register(ThumbnailJob, ThumbnailJobAdmin)
+
+admin.site.register(CensoredWord, CensoredWordAdmin)
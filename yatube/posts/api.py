@@ -0,0 +1,246 @@
+"""JSON API только для чтения: записи, группы и комментарии.
+
+Списки листаются курсором ``KeysetPaginator`` (ссылки ``next`` и
+``previous`` в ответе). Параметр ``fields`` оставляет в ответе только
+перечисленные поля, и из базы читаются только нужные для них столбцы.
+Число SQL-запросов каждой view постоянно и не зависит от размера
+страницы. Ответ получает ETag по содержимому, и на совпадающий
+``If-None-Match`` отдается 304 без тела. Выгрузка ``export/`` отдается
+потоком без ETag (см. ``posts.export``).
+"""
+import hashlib
+from functools import wraps
+
+from django.conf import settings
+from django.http import Http404, JsonResponse, StreamingHttpResponse
+from django.http.response import HttpResponseBase
+from django.shortcuts import get_object_or_404
+from django.utils.cache import get_conditional_response, quote_etag
+
+from core.paginators import KeysetPaginator
+from core.query_budget import query_budget
+
+from . import export, timeline
+from .models import Comment, Group, Post, User
+
+# Поле ответа: путь к столбцу для only() и функция получения значения.
+POST_FIELDS = {
+    'id': ('id', lambda post: post.pk),
+    'text': ('text', lambda post: post.text),
+    'pub_date': ('pub_date', lambda post: post.pub_date),
+    'author': ('author__username', lambda post: post.author.username),
+    'group': ('group__slug', lambda post: post.group and post.group.slug),
+    'image': ('image', lambda post: post.image.url if post.image else None),
+    'comments_count': ('comments_count', lambda post: post.comments_count),
+}
+COMMENT_FIELDS = {
+    'id': ('id', lambda comment: comment.pk),
+    'post': ('post_id', lambda comment: comment.post_id),
+    'author': ('author__username', lambda comment: comment.author.username),
+    'text': ('text', lambda comment: comment.text),
+    'created': ('created', lambda comment: comment.created),
+}
+GROUP_FIELDS = {
+    'id': ('id', lambda group: group.pk),
+    'slug': ('slug', lambda group: group.slug),
+    'title': ('title', lambda group: group.title),
+    'description': ('description', lambda group: group.description),
+    'posts_count': ('posts_count', lambda group: group.posts_count),
+}
+
+
+class ApiError(Exception):
+    """Ошибка запроса, которая отдается клиенту в JSON."""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def error_response(status, message):
+    return JsonResponse(
+        {'error': message}, status=status,
+        json_dumps_params={'ensure_ascii': False})
+
+
+def json_response(request, data):
+    """JSON-ответ с ETag или 304, если клиент уже получил такой же."""
+    response = JsonResponse(data, json_dumps_params={'ensure_ascii': False})
+    etag = quote_etag(hashlib.md5(response.content).hexdigest())
+    response['ETag'] = etag
+    return get_conditional_response(request, etag=etag, response=response)
+
+
+def api_view(view_func):
+    """Превращает данные view в JSON, а ошибки — в JSON с кодом ответа."""
+    @wraps(view_func)
+    def wrapper(request, *args, **kwargs):
+        if request.method not in ('GET', 'HEAD'):
+            response = error_response(405, 'Метод не поддерживается.')
+            response['Allow'] = 'GET, HEAD'
+            return response
+        try:
+            data = view_func(request, *args, **kwargs)
+        except Http404:
+            return error_response(404, 'Не найдено.')
+        except ApiError as error:
+            return error_response(error.status, str(error))
+        if isinstance(data, HttpResponseBase):
+            return data
+        return json_response(request, data)
+    return wrapper
+
+
+def requested_fields(request, available):
+    """Поля из параметра ``fields`` или все поля ресурса."""
+    names = [name.strip()
+             for name in request.GET.get('fields', '').split(',')
+             if name.strip()]
+    unknown = sorted(set(names) - set(available))
+    if unknown:
+        raise ApiError(400, f'Неизвестные поля: {", ".join(unknown)}.')
+    return names or list(available)
+
+
+def restrict(queryset, fields, available, required=()):
+    """Читает из базы только столбцы запрошенных полей."""
+    paths = {available[name][0] for name in fields} | set(required)
+    related = {path.split('__')[0] for path in paths if '__' in path}
+    return queryset.select_related(*related).only(*paths)
+
+
+def serialize(obj, fields, available):
+    return {name: available[name][1](obj) for name in fields}
+
+
+def page_size(request, default):
+    value = request.GET.get('limit')
+    if value is None:
+        return default
+    try:
+        size = int(value)
+    except ValueError:
+        size = 0
+    if not 1 <= size <= settings.API_MAX_PAGE_SIZE:
+        raise ApiError(
+            400, f'limit должен быть от 1 до {settings.API_MAX_PAGE_SIZE}.')
+    return size
+
+
+def cursor_url(request, cursor):
+    if not cursor:
+        return None
+    params = request.GET.copy()
+    params['cursor'] = cursor
+    return request.build_absolute_uri('?' + params.urlencode())
+
+
+def page_data(request, queryset, available, key='pub_date', per_page=None):
+    """Страница списка по курсору из запроса."""
+    fields = requested_fields(request, available)
+    paginator = KeysetPaginator(
+        restrict(queryset, fields, available, (key,)),
+        page_size(request, per_page or settings.POSTS_ON_PAGE), key=key)
+    page = paginator.get_page(cursor=request.GET.get('cursor'))
+    return {
+        'results': [serialize(obj, fields, available) for obj in page],
+        'next': cursor_url(request, page.next_cursor),
+        'previous': cursor_url(request, page.previous_cursor),
+    }
+
+
+def detail_data(request, queryset, available, **lookup):
+    fields = requested_fields(request, available)
+    obj = get_object_or_404(restrict(queryset, fields, available), **lookup)
+    return serialize(obj, fields, available)
+
+
+@query_budget(1)
+@api_view
+def post_list(request):
+    """Записи главной страницы."""
+    return page_data(request, Post.objects.all(), POST_FIELDS)
+
+
+@query_budget(1)
+@api_view
+def post_detail(request, post_id):
+    """Одна запись."""
+    return detail_data(request, Post.objects.all(), POST_FIELDS, pk=post_id)
+
+
+@query_budget(2)
+@api_view
+def post_comments(request, post_id):
+    """Комментарии записи, новые первыми."""
+    post = get_object_or_404(Post.objects.only('id'), pk=post_id)
+    return page_data(
+        request, Comment.objects.filter(post=post), COMMENT_FIELDS,
+        key='created', per_page=settings.COMMENTS_ON_PAGE)
+
+
+@query_budget(1)
+@api_view
+def group_list(request):
+    """Группы, новые первыми."""
+    return page_data(
+        request, Group.objects.order_by('-pk'), GROUP_FIELDS, key='pk')
+
+
+@query_budget(1)
+@api_view
+def group_detail(request, slug):
+    """Одна группа."""
+    return detail_data(request, Group.objects.all(), GROUP_FIELDS, slug=slug)
+
+
+@query_budget(2)
+@api_view
+def group_posts(request, slug):
+    """Записи группы."""
+    group = get_object_or_404(Group.objects.only('id'), slug=slug)
+    return page_data(request, group.group_posts.all(), POST_FIELDS)
+
+
+@query_budget(2)
+@api_view
+def profile_posts(request, username):
+    """Записи автора."""
+    author = get_object_or_404(User.objects.only('id'), username=username)
+    return page_data(request, author.posts.all(), POST_FIELDS)
+
+
+@query_budget(5)
+@api_view
+def follow_posts(request):
+    """Лента подписок пользователя, вошедшего через сессию."""
+    if not request.user.is_authenticated:
+        raise ApiError(401, 'Нужна авторизация.')
+    return page_data(request, timeline.feed(request.user), POST_FIELDS)
+
+
+@query_budget(2)
+@api_view
+def export_rows(request, resource):
+    """Потоковая выгрузка записей или комментариев в NDJSON или CSV.
+
+    Персонал выгружает что угодно, остальные — только свои тексты.
+    """
+    filters = {name: request.GET.get(name)
+               for name in ('author', 'group', 'since', 'until')}
+    user = request.user
+    if not user.is_authenticated:
+        raise ApiError(401, 'Нужна авторизация.')
+    if not user.is_staff and filters['author'] != user.username:
+        raise ApiError(403, 'Можно выгрузить только свои тексты.')
+    export_format = request.GET.get('format', 'ndjson')
+    try:
+        lines = export.lines(resource, export_format, **filters)
+    except export.ExportError as error:
+        raise ApiError(400, str(error))
+    response = StreamingHttpResponse(
+        export.buffered(lines),
+        content_type=f'{export.FORMATS[export_format]}; charset=utf-8')
+    response['Content-Disposition'] = (
+        f'attachment; filename="{resource}.{export_format}"')
+    return response
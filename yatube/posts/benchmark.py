@@ -0,0 +1,242 @@
+"""Воспроизводимый бенчмарк страниц приложения posts.
+
+``seed`` наполняет базу данными заданного размера (Faker и mixer с
+фиксированным зерном), ``run`` прогоняет сценарии через тестовый клиент
+Django и возвращает задержки, число SQL-запросов и пропускную
+способность для каждого сценария. ``concurrency`` сравнивает, сколько
+одновременных читателей выдерживает один процесс, когда ASGI-приложение
+``core.asgi`` обрабатывает запросы в одном потоке (режим
+``asgi-1thread``, по одному запросу, как синхронный WSGI-воркер) и в
+пуле потоков (режим ``asgi-pool``). Оба режима идут через ASGI, поэтому
+разница между ними — только размер пула.
+"""
+import asyncio
+import math
+import platform
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+import django
+from django.core.cache import cache
+from django.test import Client
+from django.urls import reverse
+from faker import Faker
+from mixer.backend.django import mixer
+
+from core.asgi import ASGIHandler
+from core.query_budget import QueryCounter
+
+from .models import Comment, Follow, Group, Post, User
+
+SCENARIOS = (
+    'index',
+    'group_posts',
+    'profile',
+    'post_detail',
+    'follow_index',
+    'post_create',
+    'add_comment',
+)
+# Сценарии чтения, которые можно выполнять одновременно и анонимно.
+CONCURRENT_SCENARIOS = ('index', 'group_posts', 'profile', 'api_posts')
+
+
+def seed(users=50, groups=5, posts=1000, comments=2000, follows=500,
+         random_seed=0):
+    """Создает детерминированный набор данных и возвращает его размеры."""
+    rng = random.Random(random_seed)
+    fake = Faker('ru_RU')
+    fake.seed_instance(random_seed)
+    user_objs = mixer.cycle(users).blend(
+        User,
+        username=(f'{fake.user_name()}_{i}' for i in range(users)),
+        first_name=(fake.first_name() for _ in range(users)),
+        last_name=(fake.last_name() for _ in range(users)))
+    group_objs = mixer.cycle(groups).blend(
+        Group,
+        title=(fake.sentence(nb_words=3) for _ in range(groups)),
+        slug=(f'group-{i}' for i in range(groups)),
+        description=(fake.paragraph() for _ in range(groups)))
+    pairs = set()
+    while len(pairs) < min(follows, users * (users - 1)):
+        pairs.add(tuple(rng.sample(user_objs, 2)))
+    for user, author in sorted(pairs, key=lambda pair: (
+            pair[0].pk, pair[1].pk)):
+        mixer.blend(Follow, user=user, author=author)
+    post_objs = mixer.cycle(posts).blend(
+        Post,
+        author=(rng.choice(user_objs) for _ in range(posts)),
+        group=(rng.choice(group_objs + [None]) for _ in range(posts)),
+        text=(fake.paragraph() for _ in range(posts)),
+        image='')
+    mixer.cycle(comments).blend(
+        Comment,
+        post=(rng.choice(post_objs) for _ in range(comments)),
+        author=(rng.choice(user_objs) for _ in range(comments)),
+        text=(fake.sentence() for _ in range(comments)))
+    return {
+        'users': users,
+        'groups': groups,
+        'posts': posts,
+        'comments': comments,
+        'follows': len(pairs),
+        'seed': random_seed,
+    }
+
+
+def percentile(values, percent):
+    """Процентиль по методу ближайшего ранга."""
+    ordered = sorted(values)
+    rank = max(math.ceil(percent / 100 * len(ordered)), 1)
+    return ordered[rank - 1]
+
+
+def _requests(rng):
+    """Возвращает фабрики запросов сценариев для читателя."""
+    post_ids = list(Post.objects.values_list('id', flat=True))
+    slugs = list(Group.objects.values_list('slug', flat=True))
+    usernames = list(User.objects.values_list('username', flat=True))
+    return {
+        'index': lambda: ('get', reverse('posts:index'), None),
+        'group_posts': lambda: ('get', reverse(
+            'posts:group_list', args=[rng.choice(slugs)]), None),
+        'profile': lambda: ('get', reverse(
+            'posts:profile', args=[rng.choice(usernames)]), None),
+        'post_detail': lambda: ('get', reverse(
+            'posts:post_detail', args=[rng.choice(post_ids)]), None),
+        'follow_index': lambda: ('get', reverse('posts:follow_index'), None),
+        'api_posts': lambda: ('get', reverse('api:post_list'), None),
+        'post_create': lambda: ('post', reverse('posts:post_create'), {
+            'text': f'Benchmark post {rng.random()}'}),
+        'add_comment': lambda: ('post', reverse(
+            'posts:add_comment', args=[rng.choice(post_ids)]), {
+                'text': f'Benchmark comment {rng.random()}'}),
+    }
+
+
+def _latency(timings, elapsed):
+    milliseconds = [timing * 1000 for timing in timings]
+    return {
+        'requests': len(timings),
+        'p50_ms': round(percentile(milliseconds, 50), 3),
+        'p95_ms': round(percentile(milliseconds, 95), 3),
+        'p99_ms': round(percentile(milliseconds, 99), 3),
+        'throughput_rps': round(len(timings) / elapsed, 2),
+    }
+
+
+def _summary(timings, queries, elapsed):
+    summary = _latency(timings, elapsed)
+    summary['mean_queries'] = round(sum(queries) / len(queries), 2)
+    summary['max_queries'] = max(queries)
+    return summary
+
+
+def run(scenarios=SCENARIOS, requests=100, warmup=10, cold=False,
+        random_seed=0):
+    """Прогоняет сценарии и возвращает статистику по каждому."""
+    rng = random.Random(random_seed)
+    reader = User.objects.filter(follower__isnull=False).first()
+    client = Client()
+    client.force_login(reader or User.objects.first())
+    factories = _requests(rng)
+    results = {}
+    for name in scenarios:
+        for _ in range(warmup):
+            method, url, data = factories[name]()
+            getattr(client, method)(url, data)
+        timings, queries = [], []
+        started = time.perf_counter()
+        for _ in range(requests):
+            method, url, data = factories[name]()
+            if cold:
+                cache.clear()
+            with QueryCounter() as counter:
+                start = time.perf_counter()
+                getattr(client, method)(url, data)
+                timings.append(time.perf_counter() - start)
+            queries.append(counter.count)
+        results[name] = _summary(
+            timings, queries, time.perf_counter() - started)
+    return results
+
+
+async def _get(application, url):
+    """Выполняет GET-запрос к ASGI-приложению и возвращает статус."""
+    parts = urlsplit(url)
+    scope = {
+        'type': 'http',
+        'http_version': '1.1',
+        'method': 'GET',
+        'scheme': 'http',
+        'path': parts.path,
+        'query_string': parts.query.encode(),
+        'headers': [(b'host', b'testserver')],
+        'server': ('testserver', 80),
+    }
+    statuses = []
+
+    async def receive():
+        return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+    async def send(message):
+        if message['type'] == 'http.response.start':
+            statuses.append(message['status'])
+
+    await application(scope, receive, send)
+    return statuses[0]
+
+
+async def _load(application, factory, requests, clients):
+    """Гоняет requests запросов из clients одновременных клиентов."""
+    remaining = iter(range(requests))
+    timings = []
+
+    async def client():
+        for _ in remaining:
+            url = factory()[1]
+            start = time.perf_counter()
+            status = await _get(application, url)
+            timings.append(time.perf_counter() - start)
+            if status != 200:
+                raise RuntimeError(f'{url} вернул {status}')
+
+    await asyncio.gather(*(client() for _ in range(clients)))
+    return timings
+
+
+def concurrency(scenarios=CONCURRENT_SCENARIOS, requests=200, clients=16,
+                threads=8, warmup=10, random_seed=0):
+    """Сравнивает ASGI с одним потоком и с пулом из threads потоков.
+
+    Задержка считается от момента, когда клиент отправил запрос, поэтому
+    в нее входит ожидание свободного потока.
+    """
+    rng = random.Random(random_seed)
+    factories = _requests(rng)
+    results = {}
+    for name in scenarios:
+        results[name] = {}
+        for label, size in (('asgi-1thread', 1), ('asgi-pool', threads)):
+            with ThreadPoolExecutor(size) as pool:
+                application = ASGIHandler(pool=pool)
+                asyncio.run(_load(
+                    application, factories[name], warmup, clients))
+                started = time.perf_counter()
+                timings = asyncio.run(_load(
+                    application, factories[name], requests, clients))
+                results[name][label] = _latency(
+                    timings, time.perf_counter() - started)
+    return results
+
+
+def environment():
+    """Описание окружения для сравнения прогонов между собой."""
+    return {
+        'python': platform.python_version(),
+        'django': django.get_version(),
+        'platform': platform.platform(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+    }
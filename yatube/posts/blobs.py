@@ -0,0 +1,94 @@
+"""Учет ссылок на файлы картинок в хранилище с адресацией по содержимому.
+
+Одинаковые картинки разных записей хранятся одним файлом, поэтому файл и
+его миниатюры удаляются только после того, как на него не осталось
+ссылок, и только после фиксации транзакции.
+"""
+import logging
+from itertools import islice
+
+from django.core.exceptions import SuspiciousFileOperation
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from . import thumbnails
+from .models import ImageBlob, Post, ThumbnailJob
+
+logger = logging.getLogger(__name__)
+
+REBUILD_BATCH_SIZE = 5000
+
+
+def acquire(name):
+    """Учитывает новую ссылку на файл; возвращает, готовы ли миниатюры."""
+    blobs = ImageBlob.objects.filter(name=name)
+    if not blobs.update(refcount=F('refcount') + 1):
+        try:
+            with transaction.atomic():
+                ImageBlob.objects.create(name=name, refcount=1)
+            return False
+        except IntegrityError:
+            # Тот же файл одновременно загрузили в другом запросе.
+            blobs.update(refcount=F('refcount') + 1)
+    return blobs.values_list('thumbnails_ready', flat=True).get()
+
+
+def release(name):
+    """Снимает ссылку на файл и удаляет его, если ссылок не осталось."""
+    ImageBlob.objects.filter(name=name, refcount__gt=0).update(
+        refcount=F('refcount') - 1)
+    deleted, _ = ImageBlob.objects.filter(name=name, refcount=0).delete()
+    if deleted:
+        transaction.on_commit(lambda: delete_files(name))
+
+
+def delete_files(name):
+    """Удаляет файл картинки и все его миниатюры."""
+    if ImageBlob.objects.filter(name=name).exists():
+        # Пока транзакция фиксировалась, тот же файл загрузили снова.
+        return
+    try:
+        Post._meta.get_field('image').storage.delete(name)
+    except SuspiciousFileOperation:
+        logger.warning('Файл %s лежит вне хранилища, не удаляем', name)
+        return
+    thumbnails.delete(name)
+
+
+def _in_batches(rows, create):
+    while True:
+        batch = list(islice(rows, REBUILD_BATCH_SIZE))
+        if not batch:
+            return
+        create(batch)
+
+
+def rebuild():
+    """Учитывает картинки записей, вставленных в обход сигналов.
+
+    Создает недостающие ``ImageBlob``, исправляет счетчики ссылок и
+    ставит в очередь нарезку миниатюр там, где их еще нет. Возвращает
+    число исправленных счетчиков.
+    """
+    images = Post.objects.exclude(image='')
+    names = images.order_by().values_list('image', flat=True).distinct()
+    _in_batches(
+        names.iterator(),
+        lambda names: ImageBlob.objects.bulk_create(
+            [ImageBlob(name=name) for name in names], ignore_conflicts=True))
+    references = Coalesce(Subquery(
+        Post.objects.filter(image=OuterRef('name')).order_by().values(
+            'image').annotate(total=Count('pk')).values('total')), 0)
+    repaired = ImageBlob.objects.exclude(refcount=references).update(
+        refcount=references)
+    pending = images.filter(thumbnails_ready=False)
+    pending.filter(image__in=ImageBlob.objects.filter(
+        thumbnails_ready=True).values('name')).update(thumbnails_ready=True)
+    _in_batches(
+        pending.filter(thumbnail_job__isnull=True).values_list(
+            'pk', 'image').iterator(),
+        lambda rows: ThumbnailJob.objects.bulk_create(
+            [ThumbnailJob(post_id=pk, source=image) for pk, image in rows],
+            ignore_conflicts=True))
+    return repaired
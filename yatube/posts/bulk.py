@@ -0,0 +1,98 @@
+"""Пакетная вставка больших объемов данных.
+
+Вставка идет через ``bulk_create`` порциями внутри транзакций и не
+вызывает сигналы моделей, поэтому после нее нужно вызвать
+``rebuild_derived``: он пересчитывает счетчики, ссылки на картинки и
+ленты подписок и сбрасывает кешированные фрагменты.
+"""
+import time
+from contextlib import contextmanager
+from itertools import islice
+
+from django.db import transaction
+
+from . import blobs, caching, counters, timeline
+from .models import Follow, User
+
+DEFAULT_BATCH_SIZE = 5000
+
+
+def batched(iterable, size):
+    """Разбивает итерируемый объект на списки длиной не больше size."""
+    iterator = iter(iterable)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+class InsertStats:
+    """Число вставленных строк и скорость вставки по моделям."""
+
+    def __init__(self):
+        self.rows = {}
+        self.seconds = {}
+
+    def add(self, label, rows, seconds):
+        self.rows[label] = self.rows.get(label, 0) + rows
+        self.seconds[label] = self.seconds.get(label, 0) + seconds
+
+    def rate(self, label):
+        seconds = self.seconds.get(label) or 0
+        return self.rows.get(label, 0) / seconds if seconds else 0.0
+
+    def lines(self):
+        for label, rows in self.rows.items():
+            yield (
+                f'{label}: {rows} строк за {self.seconds[label]:.1f} с '
+                f'({self.rate(label):.0f} строк/с)')
+
+
+def insert(model, objs, batch_size=DEFAULT_BATCH_SIZE, stats=None,
+           ignore_conflicts=False):
+    """Вставляет объекты порциями, каждая порция в своей транзакции.
+
+    Размер одного INSERT выбирает бэкенд базы: SQLite ограничивает число
+    параметров и термов запроса, а Django 2.2 не урезает явный
+    ``batch_size`` до этого предела.
+    """
+    total = 0
+    label = model._meta.model_name
+    for batch in batched(objs, batch_size):
+        start = time.perf_counter()
+        with transaction.atomic():
+            model.objects.bulk_create(
+                batch, ignore_conflicts=ignore_conflicts)
+        total += len(batch)
+        if stats is not None:
+            stats.add(label, len(batch), time.perf_counter() - start)
+    return total
+
+
+@contextmanager
+def explicit_dates(model, *field_names):
+    """Позволяет задать значения полей с auto_now и auto_now_add."""
+    fields = [model._meta.get_field(name) for name in field_names]
+    saved = [(field.auto_now, field.auto_now_add) for field in fields]
+    for field in fields:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, (auto_now, auto_now_add) in zip(fields, saved):
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+def rebuild_derived(timelines=True):
+    """Восстанавливает данные, которые обычно поддерживают сигналы."""
+    repaired = counters.recount()
+    repaired['images'] = blobs.rebuild()
+    if timelines:
+        timeline.sync_celebrities()
+        readers = User.objects.filter(
+            pk__in=Follow.objects.values('user')).iterator()
+        for reader in readers:
+            timeline.backfill(reader)
+    caching.bump(caching.INDEX)
+    return repaired
@@ -0,0 +1,116 @@
+"""Версии кешированных фрагментов страниц.
+
+Каждая область (главная, группа, профиль) хранит в кеше номер поколения,
+который входит в ключ ``{% cache %}``. Сигналы моделей увеличивают
+поколение только затронутых областей, поэтому фрагменты можно хранить
+часами: устаревший ключ просто перестаёт запрашиваться.
+
+Это верно, только если поколения видны всем процессам: воркерам сервера,
+``runworker`` и командам импорта. Если кеш ``default`` свой у каждого
+процесса (``LocMemCache``), чужое увеличение поколения до процесса не
+дойдет, поэтому фрагменты живут не дольше
+``FRAGMENT_CACHE_LOCAL_TIMEOUT``.
+"""
+import random
+import time
+
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.core.cache.backends.locmem import LocMemCache
+
+INDEX = 'index'
+VERSION_KEY = 'fragment-version:{}'
+
+
+def group_scope(group_id):
+    return f'group:{group_id}'
+
+
+def profile_scope(user_id):
+    return f'profile:{user_id}'
+
+
+def author_scope(user_id):
+    return f'author:{user_id}'
+
+
+def group_info_scope(group_id):
+    return f'group-info:{group_id}'
+
+
+def _initial_version():
+    """Начальное поколение не повторяет вытесненные из кеша значения."""
+    return int(time.time() * 1000)
+
+
+def _versions(scopes):
+    """Возвращает поколения областей одним обращением к кешу."""
+    keys = {VERSION_KEY.format(scope): scope for scope in scopes}
+    versions = cache.get_many(keys)
+    missing = {key: _initial_version() for key in keys if key not in versions}
+    if missing:
+        cache.set_many(missing, None)
+        versions.update(missing)
+    return {scope: versions[key] for key, scope in keys.items()}
+
+
+def version(*scopes):
+    """Возвращает строку поколений для ключа фрагмента."""
+    versions = _versions(scopes)
+    return '.'.join(str(versions[scope]) for scope in scopes)
+
+
+def _post_scopes(post):
+    scopes = [author_scope(post.author_id)]
+    if post.group_id:
+        scopes.append(group_info_scope(post.group_id))
+    return scopes
+
+
+def page_scopes(post, previous_group_id=None):
+    """Области страниц-списков, на которых видна запись."""
+    scopes = {INDEX, profile_scope(post.author_id)}
+    for group_id in (post.group_id, previous_group_id):
+        if group_id:
+            scopes.add(group_scope(group_id))
+    return scopes
+
+
+def annotate_versions(posts):
+    """Проставляет записям ``fragment_version`` для кеша их разметки.
+
+    Версия складывается из времени изменения записи и поколений её
+    автора и группы, поэтому фрагмент записи переиспользуется на всех
+    страницах-списках и сбрасывается при изменении любого из них.
+    """
+    posts = list(posts)
+    versions = _versions(
+        {scope for post in posts for scope in _post_scopes(post)})
+    for post in posts:
+        post.fragment_version = '.'.join(
+            [str(post.updated.timestamp())]
+            + [str(versions[scope]) for scope in _post_scopes(post)])
+    return posts
+
+
+def bump(*scopes):
+    """Делает недействительными фрагменты перечисленных областей."""
+    for scope in scopes:
+        key = VERSION_KEY.format(scope)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, _initial_version(), None)
+
+
+def is_shared():
+    """Видны ли поколения другим процессам."""
+    return not isinstance(caches['default'], LocMemCache)
+
+
+def timeout():
+    """Время жизни фрагмента с разбросом, чтобы ключи не истекали разом."""
+    base = settings.FRAGMENT_CACHE_TIMEOUT
+    if not is_shared():
+        base = min(base, settings.FRAGMENT_CACHE_LOCAL_TIMEOUT)
+    return base + random.randint(0, base // 10)
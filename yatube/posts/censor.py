@@ -0,0 +1,108 @@
+"""Замена запрещенных слов звездочками в записях и комментариях.
+
+Слова берутся из модели ``CensoredWord`` и из файла ``CENSOR_WORDS_FILE``
+(по слову в строке, ``#`` — комментарий), если он задан. Весь список
+компилируется в одно регулярное выражение, и текст проверяется за один
+проход без разбиения на слова. Шаблон хранится в процессе и собирается
+заново, когда меняется поколение списка в кеше (его увеличивают сигналы
+``CensoredWord``) или время изменения файла. Если кеш ``default`` свой у
+каждого процесса, чужое поколение не видно, поэтому шаблон еще и
+пересобирается не реже раза в ``CENSOR_LOCAL_TTL`` секунд.
+"""
+import hashlib
+import os
+import re
+import time
+
+from django.conf import settings
+
+from . import caching
+from .models import CensoredWord
+
+SCOPE = 'censored-words'
+
+_compiled = {'key': None, 'pattern': None, 'expires': 0.0}
+
+
+def normalize(word):
+    return ' '.join(word.split()).lower()
+
+
+def fingerprint(words):
+    """Отпечаток списка слов: меняется только вместе с его содержимым."""
+    words = sorted({normalize(word) for word in words} - {''})
+    return hashlib.sha1('\n'.join(words).encode()).hexdigest()
+
+
+def compile_pattern(words):
+    """Собирает шаблон, который находит слова из списка целиком.
+
+    Регистр не важен; соседние знаки препинания не мешают совпадению,
+    а слово внутри более длинного слова не совпадает.
+    """
+    words = sorted({normalize(word) for word in words} - {''},
+                   key=len, reverse=True)
+    if not words:
+        return None
+    alternatives = '|'.join(
+        r'\s+'.join(map(re.escape, word.split())) for word in words)
+    return re.compile(rf'(?<!\w)(?:{alternatives})(?!\w)', re.IGNORECASE)
+
+
+def _file_state():
+    path = settings.CENSOR_WORDS_FILE
+    if not path:
+        return None
+    try:
+        return path, os.stat(path).st_mtime_ns
+    except FileNotFoundError:
+        return path, None
+
+
+def read_words_file(path):
+    with open(path, encoding='utf-8') as words_file:
+        return [line for line in words_file
+                if not line.lstrip().startswith('#')]
+
+
+def load_words(file_state=None):
+    words = list(CensoredWord.objects.values_list('word', flat=True))
+    if file_state and file_state[1] is not None:
+        words += read_words_file(file_state[0])
+    return words
+
+
+def current_words():
+    """Текущий список слов из базы и файла."""
+    return load_words(_file_state())
+
+
+def get_pattern():
+    """Возвращает скомпилированный шаблон, пересобирая его при изменениях."""
+    file_state = _file_state()
+    key = (caching.version(SCOPE), file_state)
+    now = time.monotonic()
+    expired = not caching.is_shared() and now >= _compiled['expires']
+    if _compiled['key'] != key or expired:
+        _compiled['pattern'] = compile_pattern(load_words(file_state))
+        _compiled['key'] = key
+        _compiled['expires'] = now + settings.CENSOR_LOCAL_TTL
+    return _compiled['pattern']
+
+
+def reload():
+    """Сбрасывает шаблон во всех процессах с общим кешем."""
+    caching.bump(SCOPE)
+    _compiled['key'] = None
+
+
+def _mask(match):
+    return re.sub(r'\S', '*', match.group())
+
+
+def censor(text, pattern=None):
+    """Заменяет звездочками запрещенные слова в тексте."""
+    pattern = pattern or get_pattern()
+    if pattern is None or not text:
+        return text
+    return pattern.sub(_mask, text)
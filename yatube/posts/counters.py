@@ -0,0 +1,90 @@
+"""Денормализованные счетчики записей, подписок и комментариев.
+
+Счетчики меняются атомарными ``F()``-обновлениями из сигналов моделей,
+а ``recount`` пересчитывает их пакетно, если они разошлись с данными.
+"""
+from itertools import islice
+
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from .models import Comment, Follow, Group, Post, User, UserCounter
+
+RECOUNT_BATCH_SIZE = 1000
+
+
+def _add(queryset, field, delta):
+    """Меняет счетчик на delta, не опуская его ниже нуля."""
+    if delta < 0:
+        queryset = queryset.filter(**{f'{field}__gte': -delta})
+    queryset.update(**{field: F(field) + delta})
+
+
+def change_user(user_id, field, delta):
+    _add(UserCounter.objects.filter(pk=user_id), field, delta)
+
+
+def change_group(group_id, delta):
+    if group_id:
+        _add(Group.objects.filter(pk=group_id), 'posts_count', delta)
+
+
+def change_post(post_id, delta):
+    _add(Post.objects.filter(pk=post_id), 'comments_count', delta)
+
+
+def _total(model, field):
+    """Выражение с числом строк model, ссылающихся на внешний pk."""
+    rows = model.objects.filter(**{field: OuterRef('pk')}).order_by()
+    return Coalesce(
+        Subquery(rows.values(field).annotate(
+            total=Count('pk')).values('total')),
+        0)
+
+
+def _repair(queryset, field, expression):
+    """Исправляет разошедшиеся счетчики и возвращает их число."""
+    return queryset.exclude(**{field: expression}).update(
+        **{field: expression})
+
+
+def _repair_users(queryset):
+    return {
+        'posts': _repair(queryset, 'posts_count', _total(Post, 'author')),
+        'followers': _repair(
+            queryset, 'followers_count', _total(Follow, 'author')),
+        'following': _repair(
+            queryset, 'following_count', _total(Follow, 'user')),
+    }
+
+
+def recount():
+    """Пересчитывает все счетчики; возвращает число исправленных строк."""
+    missing = User.objects.filter(counters__isnull=True).values_list(
+        'pk', flat=True).iterator()
+    while True:
+        batch = list(islice(missing, RECOUNT_BATCH_SIZE))
+        if not batch:
+            break
+        UserCounter.objects.bulk_create(
+            [UserCounter(user_id=pk) for pk in batch],
+            ignore_conflicts=True
+        )
+    repaired = _repair_users(UserCounter.objects.all())
+    repaired['group posts'] = _repair(
+        Group.objects.all(), 'posts_count', _total(Post, 'group'))
+    repaired['comments'] = _repair(
+        Post.objects.all(), 'comments_count', _total(Comment, 'post'))
+    return repaired
+
+
+def for_user(user):
+    """Возвращает счетчики пользователя, создавая их при необходимости."""
+    try:
+        return user.counters
+    except UserCounter.DoesNotExist:
+        counters, created = UserCounter.objects.get_or_create(user=user)
+        if created:
+            _repair_users(UserCounter.objects.filter(pk=user.pk))
+            counters.refresh_from_db()
+        return counters
@@ -0,0 +1,170 @@
+"""Потоковая выгрузка записей и комментариев в NDJSON и CSV.
+
+Строки читаются курсором ``iterator(chunk_size=...)`` по возрастанию id
+и сразу превращаются в текст, поэтому память не растет с размером
+выгрузки. Одни и те же генераторы строк отдают и
+``StreamingHttpResponse``, и команда ``manage.py export``.
+"""
+import csv
+import json
+from datetime import datetime, time, timedelta
+
+from django.conf import settings
+from django.utils import timezone
+from django.utils.dateparse import datetime_re, parse_date, parse_datetime
+
+from .models import Comment, Post
+
+# Столбцы выгрузки: имя в файле и путь для values_list().
+RESOURCES = {
+    'posts': (Post, 'pub_date', (
+        ('id', 'id'),
+        ('pub_date', 'pub_date'),
+        ('author', 'author__username'),
+        ('group', 'group__slug'),
+        ('text', 'text'),
+        ('image', 'image'),
+        ('comments_count', 'comments_count'),
+    )),
+    'comments': (Comment, 'created', (
+        ('id', 'id'),
+        ('post', 'post_id'),
+        ('created', 'created'),
+        ('author', 'author__username'),
+        ('text', 'text'),
+    )),
+}
+FORMATS = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv',
+}
+
+
+class ExportError(ValueError):
+    """Неверные параметры выгрузки."""
+
+
+def _precision(value):
+    """Шаг последнего указанного разряда времени в строке даты."""
+    parts = datetime_re.match(value).groupdict()
+    if parts['second'] is None:
+        return timedelta(minutes=1)
+    if parts['microsecond'] is None:
+        return timedelta(seconds=1)
+    return timedelta(microseconds=10 ** (6 - len(parts['microsecond'])))
+
+
+def parse_bound(value, end=False):
+    """Граница периода из даты или даты со временем.
+
+    Конец периода включительный с точностью, с которой он указан, и
+    возвращается как исключающая граница: для даты — начало следующего
+    дня, для времени до минут — следующей минуты, до секунд — следующей
+    секунды, с долями секунды — следующей доли той же разрядности.
+    Если следующей единицы нет, например после 9999-12-31, конец
+    периода открыт и возвращается None.
+    """
+    try:
+        moment = parse_datetime(value)
+        day = None if moment else parse_date(value)
+    except ValueError:
+        # Формат верный, но такой даты нет, например 2024-02-30.
+        day = moment = None
+    if moment is None and day is None:
+        raise ExportError(f'Неверная дата: {value}')
+    try:
+        if moment is None:
+            if end:
+                day += timedelta(days=1)
+            moment = datetime.combine(day, time.min)
+        elif end:
+            moment += _precision(value)
+    except OverflowError:
+        return None
+    if settings.USE_TZ and timezone.is_naive(moment):
+        moment = timezone.make_aware(moment)
+    return moment
+
+
+def rows(resource, author=None, group=None, since=None, until=None):
+    """Queryset строк выгрузки с фильтрами по автору, группе и периоду.
+
+    Для комментариев группа — это группа записи.
+    """
+    if resource not in RESOURCES:
+        raise ExportError(f'Неизвестный ресурс: {resource}')
+    model, date_field, columns = RESOURCES[resource]
+    queryset = model.objects.all()
+    if author:
+        queryset = queryset.filter(author__username=author)
+    if group:
+        group_lookup = 'group__slug' if model is Post else 'post__group__slug'
+        queryset = queryset.filter(**{group_lookup: group})
+    if since:
+        queryset = queryset.filter(
+            **{f'{date_field}__gte': parse_bound(since)})
+    until = parse_bound(until, end=True) if until else None
+    if until is not None:
+        queryset = queryset.filter(**{f'{date_field}__lt': until})
+    return queryset.order_by('pk').values_list(
+        *(path for _, path in columns))
+
+
+def header(resource):
+    return [name for name, _ in RESOURCES[resource][2]]
+
+
+def _stream(queryset):
+    return queryset.iterator(chunk_size=settings.EXPORT_CHUNK_SIZE)
+
+
+def _values(row):
+    """Значения строки; даты в ISO 8601 с микросекундами."""
+    return [value.isoformat() if isinstance(value, datetime) else value
+            for value in row]
+
+
+def ndjson_lines(resource, queryset):
+    """Строки NDJSON: по объекту JSON на строку."""
+    names = header(resource)
+    encoder = json.JSONEncoder(ensure_ascii=False)
+    for row in _stream(queryset):
+        yield encoder.encode(dict(zip(names, _values(row)))) + '\n'
+
+
+class _Echo:
+    """Файл, который возвращает записанное вместо того, чтобы хранить."""
+
+    def write(self, value):
+        return value
+
+
+def csv_lines(resource, queryset):
+    """Строки CSV с заголовком."""
+    writer = csv.writer(_Echo())
+    yield writer.writerow(header(resource))
+    for row in _stream(queryset):
+        yield writer.writerow(_values(row))
+
+
+def buffered(lines, size=64 * 1024):
+    """Склеивает строки в куски примерно по size символов."""
+    buffer, length = [], 0
+    for line in lines:
+        buffer.append(line)
+        length += len(line)
+        if length >= size:
+            yield ''.join(buffer)
+            buffer, length = [], 0
+    if buffer:
+        yield ''.join(buffer)
+
+
+def lines(resource, export_format, **filters):
+    """Генератор строк выгрузки в нужном формате."""
+    if export_format not in FORMATS:
+        raise ExportError(f'Неизвестный формат: {export_format}')
+    queryset = rows(resource, **filters)
+    if export_format == 'csv':
+        return csv_lines(resource, queryset)
+    return ndjson_lines(resource, queryset)
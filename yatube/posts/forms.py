@@ -1,20 +1,28 @@
 from django import forms
 
-from .models import Comment, Post
+from core.uploads import UploadImageField, fit_image, validate_image_size
 
-AUTHORS_LIST = [
-    'донцова',
-    'спаркс',
-    'джеймс',
-    'майер',
-    'коэльо'
-]
+from . import censor
+from .models import Comment, Post
 
 
 class PostForm(forms.ModelForm):
     class Meta:
         model = Post
         fields = ('text', 'group', 'image')
+        field_classes = {'image': UploadImageField}
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fields['image'].validators.append(validate_image_size)
+
+    def clean_text(self):
+        """Заменяет запрещенные слова звездочками."""
+        return censor.censor(self.cleaned_data['text'])
+
+    def clean_image(self):
+        """Уменьшает слишком большой оригинал картинки."""
+        return fit_image(self.cleaned_data['image'])
 
 
 class CommentForm(forms.ModelForm):
@@ -23,10 +31,5 @@ class CommentForm(forms.ModelForm):
         fields = ('text',)
 
     def clean_text(self):
-        """Заменяет слова из списка звездочками."""
-        comment = self.cleaned_data['text']
-        comment_text = comment.split()
-        for i in range(len(comment_text)):
-            if comment_text[i].lower() in AUTHORS_LIST:
-                comment_text[i] = len(comment_text[i]) * '*'
-        return (' '.join(comment_text))
+        """Заменяет запрещенные слова звездочками."""
+        return censor.censor(self.cleaned_data['text'])
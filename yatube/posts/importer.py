@@ -0,0 +1,232 @@
+"""Массовый импорт записей и комментариев из NDJSON и CSV.
+
+Формат строк совпадает с выгрузкой ``posts.export``. Авторы и группы
+ищутся по словарям ``username → id`` и ``slug → id``, которые читаются
+из базы один раз и дополняются по ходу импорта. Строки вставляются
+через ``posts.bulk`` порциями, каждая в своей транзакции, без сигналов
+моделей; производные данные восстанавливаются в конце одним проходом.
+
+Если в строке есть свободный ``id``, он сохраняется. Занятый ``id`` —
+в базе или раньше в том же файле — заменяется новым, больше всех
+существующих. Для каждой вставленной записи запоминается её итоговый
+``id``, и комментарии из той же выгрузки ссылаются только на свои
+записи: комментарий к пропущенной записи пропускается, а не цепляется к
+чужой записи с тем же ``id``. Если записи в этом запуске не
+импортируются, ``post`` комментария — это ``id`` записи в базе.
+"""
+import csv
+import json
+import os
+
+from django.core.management.color import no_style
+from django.db import connection
+from django.db.models import Max
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from . import bulk, caching
+from .models import Comment, Group, Post, User
+
+
+class ImportFileError(ValueError):
+    """Файл импорта не удается прочитать."""
+
+
+def read_rows(path, import_format=None):
+    """Читает строки файла как словари; формат берется из расширения."""
+    import_format = import_format or os.path.splitext(path)[1].lstrip('.')
+    if import_format not in ('ndjson', 'csv'):
+        raise ImportFileError(f'Неизвестный формат: {import_format}')
+    with open(path, encoding='utf-8', newline='') as source:
+        if import_format == 'csv':
+            yield from csv.DictReader(source)
+            return
+        for number, line in enumerate(source, 1):
+            if not line.strip():
+                continue
+            try:
+                yield json.loads(line)
+            except ValueError as error:
+                raise ImportFileError(f'Строка {number}: {error}')
+
+
+def _value(row, name):
+    """Значение столбца; пустая строка CSV означает отсутствие значения."""
+    value = row.get(name)
+    return None if value == '' else value
+
+
+def _id(row, name):
+    value = _value(row, name)
+    if value is None:
+        return None
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        raise ImportFileError(f'Неверный {name}: {value}')
+
+
+def _moment(row, name, default):
+    value = _value(row, name)
+    try:
+        moment = parse_datetime(value) if value else None
+    except ValueError:
+        # Формат верный, но такой даты нет, например 2024-02-30.
+        raise ImportFileError(f'Неверная дата {name}: {value}')
+    if moment is None:
+        return default
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment)
+    return moment
+
+
+class Importer:
+    """Импорт с общими для всех файлов словарями авторов и групп."""
+
+    def __init__(self, batch_size=bulk.DEFAULT_BATCH_SIZE,
+                 create_missing=False, stats=None):
+        self.batch_size = batch_size
+        self.create_missing = create_missing
+        self.stats = stats or bulk.InsertStats()
+        self.users = dict(User.objects.values_list('username', 'pk'))
+        self.groups = dict(Group.objects.values_list('slug', 'pk'))
+        self.skipped = 0
+        self.remapped = 0
+        # Номер строки текущего файла для сообщений об ошибках.
+        self.number = 0
+        # Исходный id вставленной записи → её id в базе.
+        self.post_ids = {}
+        self.imported_posts = False
+        self.author_ids = set()
+        self.group_ids = set()
+
+    def _add_missing(self, model, lookup, field, names, make):
+        """Создает недостающих авторов или группы и дополняет словарь."""
+        missing = {name for name in names if name and name not in lookup}
+        if not missing or not self.create_missing:
+            return
+        bulk.insert(
+            model, (make(name) for name in missing), self.batch_size,
+            self.stats, ignore_conflicts=True)
+        lookup.update(model.objects.filter(
+            **{f'{field}__in': missing}).values_list(field, 'pk'))
+
+    def _resolve(self, batch):
+        self._add_missing(
+            User, self.users, 'username',
+            {_value(row, 'author') for row in batch},
+            lambda name: User(username=name, password='!'))
+        self._add_missing(
+            Group, self.groups, 'slug',
+            {_value(row, 'group') for row in batch},
+            lambda slug: Group(title=slug, slug=slug))
+
+    def _check(self, batch, ids, date):
+        """Проверяет id и даты порции до того, как что-то записать."""
+        for row in batch:
+            self.number += 1
+            try:
+                for name in ids:
+                    _id(row, name)
+                _moment(row, date, None)
+            except ImportFileError as error:
+                raise ImportFileError(f'Строка {self.number}: {error}')
+
+    def _post(self, row, now):
+        author_id = self.users.get(_value(row, 'author'))
+        group = _value(row, 'group')
+        group_id = self.groups.get(group)
+        if author_id is None or group and group_id is None:
+            return None
+        self.author_ids.add(author_id)
+        if group_id:
+            self.group_ids.add(group_id)
+        moment = _moment(row, 'pub_date', now)
+        return Post(
+            pk=_id(row, 'id'), author_id=author_id, group_id=group_id,
+            text=row.get('text') or '', image=_value(row, 'image') or '',
+            pub_date=moment, updated=moment)
+
+    def import_posts(self, rows):
+        """Вставляет записи; строки с неизвестным автором пропускаются."""
+        total = 0
+        now = timezone.now()
+        self.number = 0
+        self.imported_posts = True
+        with bulk.explicit_dates(Post, 'pub_date', 'updated'):
+            for batch in bulk.batched(rows, self.batch_size):
+                self._check(batch, ('id',), 'pub_date')
+                self._resolve(batch)
+                posts = [self._post(row, now) for row in batch]
+                found = [post for post in posts if post is not None]
+                self.skipped += len(posts) - len(found)
+                sources = [post.pk for post in found]
+                self._free_ids(Post, found)
+                for source, post in zip(sources, found):
+                    if source is not None:
+                        self.post_ids.setdefault(source, post.pk)
+                total += bulk.insert(Post, found, self.batch_size, self.stats)
+        return total
+
+    def _free_ids(self, model, objects):
+        """Заменяет занятые id объектов новыми; возвращает пары замен."""
+        ids = [obj.pk for obj in objects if obj.pk is not None]
+        if not ids:
+            return []
+        taken = set(model.objects.filter(pk__in=ids).values_list(
+            'pk', flat=True))
+        top = max(ids + [model.objects.aggregate(top=Max('pk'))['top'] or 0])
+        seen = set()
+        changes = []
+        for obj in objects:
+            if obj.pk in taken or obj.pk in seen:
+                top += 1
+                changes.append((obj.pk, top))
+                obj.pk = top
+            seen.add(obj.pk)
+        self.remapped += len(changes)
+        return changes
+
+    def _comments(self, batch, now):
+        post_ids = [_id(row, 'post') for row in batch]
+        if self.imported_posts:
+            post_ids = [self.post_ids.get(pk) for pk in post_ids]
+        existing = set(Post.objects.filter(
+            pk__in=[pk for pk in post_ids if pk]).values_list(
+                'pk', flat=True))
+        for row, post_id in zip(batch, post_ids):
+            author_id = self.users.get(_value(row, 'author'))
+            if author_id is None or post_id not in existing:
+                self.skipped += 1
+                continue
+            yield Comment(
+                pk=_id(row, 'id'), post_id=post_id, author_id=author_id,
+                text=row.get('text') or '',
+                created=_moment(row, 'created', now))
+
+    def import_comments(self, rows):
+        """Вставляет комментарии к уже существующим записям."""
+        total = 0
+        now = timezone.now()
+        self.number = 0
+        with bulk.explicit_dates(Comment, 'created'):
+            for batch in bulk.batched(rows, self.batch_size):
+                self._check(batch, ('id', 'post'), 'created')
+                self._resolve(batch)
+                comments = list(self._comments(batch, now))
+                self._free_ids(Comment, comments)
+                total += bulk.insert(
+                    Comment, comments, self.batch_size, self.stats)
+        return total
+
+    def finish(self, timelines=True):
+        """Восстанавливает производные данные и сбрасывает фрагменты."""
+        with connection.cursor() as cursor:
+            for sql in connection.ops.sequence_reset_sql(
+                    no_style(), [User, Group, Post, Comment]):
+                cursor.execute(sql)
+        repaired = bulk.rebuild_derived(timelines)
+        caching.bump(
+            *(caching.profile_scope(pk) for pk in self.author_ids),
+            *(caching.group_scope(pk) for pk in self.group_ids))
+        return repaired
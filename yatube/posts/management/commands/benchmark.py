@@ -0,0 +1,128 @@
+import json
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import (
+    override_settings, setup_test_environment, teardown_test_environment)
+
+from posts import benchmark
+
+
+class Command(BaseCommand):
+    help = (
+        'Наполняет отдельную тестовую базу данными и измеряет задержки, '
+        'SQL-запросы и пропускную способность страниц posts.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=50)
+        parser.add_argument('--groups', type=int, default=5)
+        parser.add_argument('--posts', type=int, default=1000)
+        parser.add_argument('--comments', type=int, default=2000)
+        parser.add_argument('--follows', type=int, default=500)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument(
+            '--requests', type=int, default=100,
+            help='Число измеряемых запросов на сценарий.')
+        parser.add_argument('--warmup', type=int, default=10)
+        parser.add_argument(
+            '--scenario', action='append', dest='scenarios',
+            choices=benchmark.SCENARIOS,
+            help='Запустить только этот сценарий (можно несколько раз).')
+        parser.add_argument(
+            '--cold', action='store_true',
+            help='Очищать кеш перед каждым запросом.')
+        parser.add_argument(
+            '--concurrency', type=int, default=0, metavar='CLIENTS',
+            help='Сравнить ASGI с одним потоком и с пулом при таком '
+                 'числе одновременных клиентов.')
+        parser.add_argument(
+            '--threads', type=int, default=settings.ASGI_THREADS,
+            help='Потоков в ASGI-пуле для --concurrency.')
+        parser.add_argument(
+            '--output', help='Записать результаты в JSON-файл.')
+
+    def handle(self, *args, **options):
+        if options['requests'] < 1:
+            raise CommandError('--requests должен быть больше нуля')
+        media_root = tempfile.mkdtemp(prefix='yatube-benchmark-')
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(
+            verbosity=0, autoclobber=True)
+        try:
+            with override_settings(
+                    DEBUG=False, MEDIA_ROOT=media_root,
+                    QUERY_BUDGET_RAISE=False):
+                dataset = benchmark.seed(
+                    users=options['users'],
+                    groups=options['groups'],
+                    posts=options['posts'],
+                    comments=options['comments'],
+                    follows=options['follows'],
+                    random_seed=options['seed'])
+                results = benchmark.run(
+                    scenarios=options['scenarios'] or benchmark.SCENARIOS,
+                    requests=options['requests'],
+                    warmup=options['warmup'],
+                    cold=options['cold'],
+                    random_seed=options['seed'])
+                concurrent = self.run_concurrency(options)
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+            shutil.rmtree(media_root, ignore_errors=True)
+        report = {
+            'environment': benchmark.environment(),
+            'dataset': dataset,
+            'options': {
+                'requests': options['requests'],
+                'warmup': options['warmup'],
+                'cold': options['cold'],
+            },
+            'results': results,
+        }
+        self.print_table(results)
+        if concurrent:
+            report['concurrency'] = concurrent
+            self.print_concurrency(concurrent)
+        if options['output']:
+            with open(options['output'], 'w') as output:
+                json.dump(report, output, ensure_ascii=False, indent=2)
+
+    def run_concurrency(self, options):
+        if options['concurrency'] < 1:
+            return None
+        scenarios = [
+            name for name in benchmark.CONCURRENT_SCENARIOS
+            if not options['scenarios'] or name in options['scenarios']]
+        return benchmark.concurrency(
+            scenarios=scenarios or benchmark.CONCURRENT_SCENARIOS,
+            requests=options['requests'],
+            clients=options['concurrency'],
+            threads=options['threads'],
+            warmup=options['warmup'],
+            random_seed=options['seed'])
+
+    def print_table(self, results):
+        self.stdout.write(
+            f'{"сценарий":<14}{"p50":>9}{"p95":>9}{"p99":>9}'
+            f'{"запросы":>9}{"rps":>9}')
+        for name, row in results.items():
+            self.stdout.write(
+                f'{name:<14}{row["p50_ms"]:>9.2f}{row["p95_ms"]:>9.2f}'
+                f'{row["p99_ms"]:>9.2f}{row["mean_queries"]:>9.1f}'
+                f'{row["throughput_rps"]:>9.1f}')
+
+    def print_concurrency(self, results):
+        self.stdout.write(
+            f'\n{"сценарий":<14}{"режим":<14}{"p50":>9}{"p95":>9}'
+            f'{"p99":>9}{"rps":>9}')
+        for name, modes in results.items():
+            for mode, row in modes.items():
+                self.stdout.write(
+                    f'{name:<14}{mode:<14}{row["p50_ms"]:>9.2f}'
+                    f'{row["p95_ms"]:>9.2f}{row["p99_ms"]:>9.2f}'
+                    f'{row["throughput_rps"]:>9.1f}')
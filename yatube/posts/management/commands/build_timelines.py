@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+
+from posts import timeline
+from posts.models import TimelineEntry, User
+
+
+class Command(BaseCommand):
+    help = 'Заполняет материализованные ленты подписок.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user', action='append', dest='usernames', default=[],
+            help='Пересобрать ленту только для этого пользователя.')
+        parser.add_argument(
+            '--clear', action='store_true',
+            help='Удалить существующие записи лент перед заполнением.')
+
+    def handle(self, *args, **options):
+        users = User.objects.filter(follower__isnull=False).distinct()
+        if options['usernames']:
+            users = users.filter(username__in=options['usernames'])
+        timeline.sync_celebrities()
+        built = 0
+        for user in users.iterator():
+            if options['clear']:
+                TimelineEntry.objects.filter(user=user).delete()
+            timeline.backfill(user)
+            built += 1
+        self.stdout.write(self.style.SUCCESS(f'Собрано лент: {built}'))
@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import export
+
+
+class Command(BaseCommand):
+    help = 'Выгружает записи или комментарии потоком в NDJSON или CSV.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('resource', choices=sorted(export.RESOURCES))
+        parser.add_argument(
+            '--format', default='ndjson', choices=sorted(export.FORMATS))
+        parser.add_argument('--author', help='Имя пользователя автора.')
+        parser.add_argument('--group', help='Адрес (slug) группы.')
+        parser.add_argument(
+            '--since', help='Начало периода: дата или дата со временем.')
+        parser.add_argument(
+            '--until',
+            help='Конец периода включительно, с точностью до указанного '
+                 'разряда: день, минута, секунда.')
+        parser.add_argument(
+            '--output', help='Файл для выгрузки; по умолчанию stdout.')
+
+    def handle(self, *args, **options):
+        try:
+            lines = export.lines(
+                options['resource'], options['format'],
+                author=options['author'], group=options['group'],
+                since=options['since'], until=options['until'])
+        except export.ExportError as error:
+            raise CommandError(error)
+        if not options['output']:
+            for chunk in export.buffered(lines):
+                self.stdout.write(chunk, ending='')
+            return
+        with open(options['output'], 'w', encoding='utf-8',
+                  newline='') as output:
+            for chunk in export.buffered(lines):
+                output.write(chunk)
+        self.stderr.write(f'Выгрузка сохранена в {options["output"]}')
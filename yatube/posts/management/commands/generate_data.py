@@ -0,0 +1,218 @@
+import bisect
+import random
+from datetime import datetime, time, timedelta
+from io import BytesIO
+from itertools import accumulate
+
+from django.core.files.base import ContentFile
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+from faker import Faker
+from PIL import Image
+
+from posts import bulk
+from posts.models import Comment, Follow, Group, Post, User
+
+TEXT_POOL_SIZE = 1000
+IMAGE_POOL_SIZE = 10
+IMAGE_SIZE = (960, 640)
+# Даты публикаций отсчитываются назад от этого дня, а не от текущего.
+DEFAULT_END = '2024-01-01'
+# Сколько раз на подписку тянуть пару, прежде чем сдаться.
+FOLLOW_ATTEMPTS = 20
+
+
+class Command(BaseCommand):
+    help = (
+        'Генерирует большой детерминированный набор данных: пользователей, '
+        'группы, записи, комментарии и подписки со степенным '
+        'распределением популярности авторов.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=10000)
+        parser.add_argument('--groups', type=int, default=100)
+        parser.add_argument('--posts', type=int, default=1000000)
+        parser.add_argument('--comments', type=int, default=1000000)
+        parser.add_argument('--follows', type=int, default=200000)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument(
+            '--alpha', type=float, default=1.2,
+            help='Показатель степенного распределения популярности.')
+        parser.add_argument(
+            '--days', type=int, default=365,
+            help='За сколько дней распределить даты публикаций.')
+        parser.add_argument(
+            '--end', default=DEFAULT_END,
+            help='День, к которому приурочены даты (ГГГГ-ММ-ДД).')
+        parser.add_argument(
+            '--images', type=float, default=0.0,
+            help='Доля записей с картинкой, от 0 до 1.')
+        parser.add_argument(
+            '--batch-size', type=int, default=bulk.DEFAULT_BATCH_SIZE)
+        parser.add_argument(
+            '--skip-timelines', action='store_true',
+            help='Не собирать ленты подписок после генерации.')
+
+    def check_options(self, options, prefix):
+        if not 0 <= options['images'] <= 1:
+            raise CommandError('--images должен быть от 0 до 1')
+        if options['users'] < 2:
+            raise CommandError('--users должен быть не меньше 2')
+        for name in ('batch_size', 'days'):
+            if options[name] < 1:
+                raise CommandError(
+                    f'--{name.replace("_", "-")} должен быть больше 0')
+        if options['comments'] > 0 and options['posts'] < 1:
+            raise CommandError('Для --comments нужна хотя бы одна запись')
+        try:
+            end = parse_date(options['end'])
+        except ValueError:
+            end = None
+        if end is None:
+            raise CommandError(f'Неверная дата --end: {options["end"]}')
+        if User.objects.filter(username__startswith=prefix).exists():
+            raise CommandError(
+                f'Данные с --seed {options["seed"]} уже есть в базе: '
+                f'укажите другое зерно или удалите их')
+        return timezone.make_aware(datetime.combine(end, time.min))
+
+    def handle(self, *args, **options):
+        prefix = f'gen{options["seed"]}_'
+        self.now = self.check_options(options, prefix)
+        self.rng = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+        self.stats = bulk.InsertStats()
+        fake = Faker('ru_RU')
+        fake.seed_instance(options['seed'])
+        self.texts = [fake.paragraph() for _ in range(TEXT_POOL_SIZE)]
+        self.period = timedelta(days=options['days']).total_seconds()
+
+        user_ids = self.create_users(prefix, options['users'])
+        group_ids = self.create_groups(prefix, options['groups'])
+        weights = list(accumulate(
+            1 / rank ** options['alpha']
+            for rank in range(1, len(user_ids) + 1)))
+        popular = self.rng.sample(user_ids, len(user_ids))
+        self.create_follows(
+            user_ids, popular, weights, options['follows'])
+        images = self.create_images(options['images'])
+        posts = self.create_posts(
+            popular, weights, group_ids, images, options['images'],
+            options['posts'])
+        self.create_comments(posts, user_ids, options['comments'])
+
+        self.stdout.write('Пересчет счетчиков и лент...')
+        bulk.rebuild_derived(timelines=not options['skip_timelines'])
+        for line in self.stats.lines():
+            self.stdout.write(line)
+        self.stdout.write(self.style.SUCCESS('Данные сгенерированы'))
+
+    def pick(self, population, weights):
+        """Выбирает элемент со степенным распределением весов."""
+        point = self.rng.random() * weights[-1]
+        return population[bisect.bisect(weights, point)]
+
+    def moment(self):
+        return self.now - timedelta(seconds=self.rng.random() * self.period)
+
+    def create_users(self, prefix, amount):
+        bulk.insert(
+            User,
+            (User(username=f'{prefix}{i}', password='!')
+             for i in range(amount)),
+            self.batch_size, self.stats)
+        return list(User.objects.filter(
+            username__startswith=prefix).order_by('pk').values_list(
+                'pk', flat=True))
+
+    def create_groups(self, prefix, amount):
+        bulk.insert(
+            Group,
+            (Group(
+                title=f'Группа {i}',
+                slug=f'{prefix}{i}'.replace('_', '-'),
+                description=self.rng.choice(self.texts))
+             for i in range(amount)),
+            self.batch_size, self.stats)
+        return list(Group.objects.filter(
+            slug__startswith=prefix.replace('_', '-')).order_by(
+                'pk').values_list('pk', flat=True))
+
+    def create_follows(self, user_ids, popular, weights, amount):
+        """Создает amount различных подписок, повторы тянутся заново."""
+        wanted = min(amount, len(user_ids) * (len(user_ids) - 1))
+        pairs = set()
+
+        def edges():
+            for _ in range(amount * FOLLOW_ATTEMPTS):
+                if len(pairs) >= wanted:
+                    return
+                pair = (self.rng.choice(user_ids), self.pick(popular, weights))
+                if pair[0] != pair[1] and pair not in pairs:
+                    pairs.add(pair)
+                    yield Follow(user_id=pair[0], author_id=pair[1])
+
+        bulk.insert(
+            Follow, edges(), self.batch_size, self.stats,
+            ignore_conflicts=True)
+        if len(pairs) < amount:
+            self.stdout.write(self.style.WARNING(
+                f'Создано подписок: {len(pairs)} из {amount}'))
+
+    def create_images(self, share):
+        """Создает небольшой набор картинок, общий для всех записей.
+
+        Картинки сохраняются через хранилище записей, поэтому имя файла
+        зависит от содержимого и прогоны с разными зернами не затирают
+        картинки друг друга.
+        """
+        if not share:
+            return []
+        storage = Post._meta.get_field('image').storage
+        names = []
+        for _ in range(IMAGE_POOL_SIZE):
+            color = tuple(self.rng.randrange(256) for _ in range(3))
+            content = BytesIO()
+            Image.new('RGB', IMAGE_SIZE, color).save(content, 'JPEG')
+            names.append(storage.save(
+                'posts/generated.jpg', ContentFile(content.getvalue())))
+        return names
+
+    def create_posts(self, popular, weights, group_ids, images, share,
+                     amount):
+        first_id = (Post.objects.order_by('-pk').values_list(
+            'pk', flat=True).first() or 0)
+
+        def posts():
+            for _ in range(amount):
+                moment = self.moment()
+                yield Post(
+                    author_id=self.pick(popular, weights),
+                    group_id=self.rng.choice(group_ids + [None]),
+                    text=self.rng.choice(self.texts),
+                    image=(self.rng.choice(images)
+                           if images and self.rng.random() < share else ''),
+                    pub_date=moment,
+                    updated=moment)
+
+        with bulk.explicit_dates(Post, 'pub_date', 'updated'):
+            bulk.insert(Post, posts(), self.batch_size, self.stats)
+        return list(Post.objects.filter(pk__gt=first_id).values_list(
+            'pk', 'pub_date'))
+
+    def create_comments(self, posts, user_ids, amount):
+        """Создает комментарии, написанные после своих записей."""
+        def comments():
+            for _ in range(amount):
+                post_id, pub_date = self.rng.choice(posts)
+                yield Comment(
+                    post_id=post_id,
+                    author_id=self.rng.choice(user_ids),
+                    text=self.rng.choice(self.texts),
+                    created=pub_date + self.rng.random() * (
+                        self.now - pub_date))
+
+        with bulk.explicit_dates(Comment, 'created'):
+            bulk.insert(Comment, comments(), self.batch_size, self.stats)
@@ -0,0 +1,63 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import bulk, importer
+
+
+class Command(BaseCommand):
+    help = (
+        'Импортирует записи и комментарии из NDJSON или CSV в формате '
+        'выгрузки export. Строки вставляются порциями без сигналов, '
+        'счетчики, ленты и кеш восстанавливаются в конце.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--posts', help='Файл с записями.')
+        parser.add_argument('--comments', help='Файл с комментариями.')
+        parser.add_argument(
+            '--format', choices=('ndjson', 'csv'),
+            help='Формат файлов; по умолчанию по расширению.')
+        parser.add_argument(
+            '--batch-size', type=int, default=bulk.DEFAULT_BATCH_SIZE)
+        parser.add_argument(
+            '--create-missing', action='store_true',
+            help='Создавать неизвестных авторов и группы, а не пропускать '
+                 'их строки.')
+        parser.add_argument(
+            '--skip-timelines', action='store_true',
+            help='Не собирать ленты подписок после импорта.')
+
+    def handle(self, *args, **options):
+        if not options['posts'] and not options['comments']:
+            raise CommandError('Укажите --posts и/или --comments')
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size должен быть больше 0')
+        started = time.perf_counter()
+        loader = importer.Importer(
+            options['batch_size'], options['create_missing'])
+        try:
+            if options['posts']:
+                loader.import_posts(importer.read_rows(
+                    options['posts'], options['format']))
+            if options['comments']:
+                loader.import_comments(importer.read_rows(
+                    options['comments'], options['format']))
+        except (OSError, importer.ImportFileError) as error:
+            raise CommandError(error)
+        finally:
+            # Порции уже закоммичены, поэтому производные данные
+            # восстанавливаются и после ошибки на середине файла.
+            self.stdout.write('Пересчет счетчиков, картинок и лент...')
+            loader.finish(timelines=not options['skip_timelines'])
+        for line in loader.stats.lines():
+            self.stdout.write(line)
+        if loader.skipped:
+            self.stdout.write(
+                f'Пропущено строк без автора, группы или записи: '
+                f'{loader.skipped}')
+        if loader.remapped:
+            self.stdout.write(
+                f'Строк с занятым id, получивших новый: {loader.remapped}')
+        self.stdout.write(self.style.SUCCESS(
+            f'Импорт завершен за {time.perf_counter() - started:.1f} с'))
@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import recensor
+
+
+class Command(BaseCommand):
+    help = (
+        'Применяет текущий список запрещенных слов к уже сохраненным '
+        'комментариям. Прерванный проход продолжается с контрольной точки.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=recensor.DEFAULT_BATCH_SIZE)
+        parser.add_argument(
+            '--rate', type=float, default=0,
+            help='Не больше стольких комментариев в секунду; 0 — без '
+                 'ограничения.')
+        parser.add_argument(
+            '--restart', action='store_true',
+            help='Начать с первого комментария, а не с контрольной точки.')
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size должен быть больше 0')
+        read = changed = 0
+        for batch_read, batch_changed in recensor.recensor_comments(
+                options['batch_size'], options['rate'], options['restart']):
+            read += batch_read
+            changed += batch_changed
+            if options['verbosity'] > 1:
+                self.stdout.write(
+                    f'Проверено: {read}, исправлено: {changed}')
+        self.stdout.write(self.style.SUCCESS(
+            f'Проверено комментариев: {read}, исправлено: {changed}'))
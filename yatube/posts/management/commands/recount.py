@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+
+from posts import counters
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает денормализованные счетчики.'
+
+    def handle(self, *args, **options):
+        for name, repaired in counters.recount().items():
+            self.stdout.write(f'{name}: исправлено {repaired}')
+        self.stdout.write(self.style.SUCCESS('Счетчики пересчитаны'))
@@ -0,0 +1,37 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from posts import thumbnails
+
+
+class Command(BaseCommand):
+    help = 'Нарезает миниатюры картинок записей из очереди заданий.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers', type=int, default=settings.THUMBNAIL_WORKERS,
+            help='Число процессов; 0 — нарезать в текущем процессе.')
+        parser.add_argument(
+            '--batch', type=int, default=100,
+            help='Сколько заданий забирать за один раз.')
+        parser.add_argument(
+            '--loop', action='store_true',
+            help='Не завершаться, а ждать новые задания.')
+        parser.add_argument(
+            '--sleep', type=float, default=2.0,
+            help='Пауза между проверками очереди в секундах.')
+
+    def handle(self, *args, **options):
+        total = 0
+        while True:
+            done = thumbnails.process(options['workers'], options['batch'])
+            total += done
+            if done:
+                self.stdout.write(f'Готово миниатюр для записей: {done}')
+            elif not options['loop']:
+                break
+            else:
+                time.sleep(options['sleep'])
+        self.stdout.write(self.style.SUCCESS(f'Обработано записей: {total}'))
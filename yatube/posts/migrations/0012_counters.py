@@ -0,0 +1,71 @@
+# Generated by Django 2.2.16 on 2026-10-18 17:56
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+import django.db.models.deletion
+
+
+def _total(model, field):
+    rows = model.objects.filter(**{field: OuterRef('pk')}).order_by()
+    return Coalesce(
+        Subquery(rows.values(field).annotate(
+            total=Count('pk')).values('total')),
+        0)
+
+
+def fill_counters(apps, schema_editor):
+    """Заполняет счетчики по существующим данным."""
+    User = apps.get_model(settings.AUTH_USER_MODEL)
+    UserCounter = apps.get_model('posts', 'UserCounter')
+    Post = apps.get_model('posts', 'Post')
+    Group = apps.get_model('posts', 'Group')
+    Comment = apps.get_model('posts', 'Comment')
+    Follow = apps.get_model('posts', 'Follow')
+    UserCounter.objects.bulk_create(
+        [UserCounter(user_id=pk)
+         for pk in User.objects.values_list('pk', flat=True)],
+        batch_size=1000
+    )
+    UserCounter.objects.update(
+        posts_count=_total(Post, 'author'),
+        followers_count=_total(Follow, 'author'),
+        following_count=_total(Follow, 'user'))
+    Group.objects.update(posts_count=_total(Post, 'group'))
+    Post.objects.update(comments_count=_total(Comment, 'post'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('posts', '0011_feed_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserCounter',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='counters', serialize=False, to=settings.AUTH_USER_MODEL, verbose_name='Пользователь')),
+                ('posts_count', models.PositiveIntegerField(default=0, verbose_name='Записей')),
+                ('followers_count', models.PositiveIntegerField(default=0, verbose_name='Подписчиков')),
+                ('following_count', models.PositiveIntegerField(default=0, verbose_name='Подписок')),
+            ],
+            options={
+                'verbose_name': 'Счетчики пользователя',
+                'verbose_name_plural': 'Счетчики пользователей',
+            },
+        ),
+        migrations.AddField(
+            model_name='group',
+            name='posts_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Количество записей'),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='comments_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Количество комментариев'),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,26 @@
+from django.db import migrations
+
+
+def requeue_images(apps, schema_editor):
+    """Нарезает заново миниатюры в новых ширинах и форматах."""
+    Post = apps.get_model('posts', 'Post')
+    ThumbnailJob = apps.get_model('posts', 'ThumbnailJob')
+    posts = Post.objects.exclude(image='')
+    posts.update(thumbnails_ready=False)
+    ThumbnailJob.objects.all().delete()
+    ThumbnailJob.objects.bulk_create(
+        [ThumbnailJob(post_id=pk, source=image)
+         for pk, image in posts.values_list('pk', 'image')],
+        batch_size=500
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0013_thumbnails'),
+    ]
+
+    operations = [
+        migrations.RunPython(requeue_images, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 2.2.16 on 2026-10-18 18:19
+
+import core.storage
+from django.db import migrations, models
+from django.db.models import Count, Max
+
+
+def fill_blobs(apps, schema_editor):
+    """Учитывает ссылки на уже загруженные картинки."""
+    Post = apps.get_model('posts', 'Post')
+    ImageBlob = apps.get_model('posts', 'ImageBlob')
+    images = Post.objects.exclude(image='').order_by().values(
+        'image').annotate(refs=Count('pk'), ready=Max('thumbnails_ready'))
+    ImageBlob.objects.bulk_create(
+        [ImageBlob(name=row['image'], refcount=row['refs'],
+                   thumbnails_ready=bool(row['ready']))
+         for row in images],
+        batch_size=500
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0014_thumbnail_variants'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImageBlob',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, unique=True, verbose_name='Файл')),
+                ('refcount', models.PositiveIntegerField(default=0, verbose_name='Ссылок')),
+                ('thumbnails_ready', models.BooleanField(default=False, verbose_name='Миниатюры готовы')),
+                ('created', models.DateTimeField(auto_now_add=True, verbose_name='Дата загрузки')),
+            ],
+            options={
+                'verbose_name': 'Файл картинки',
+                'verbose_name_plural': 'Файлы картинок',
+            },
+        ),
+        migrations.AlterField(
+            model_name='post',
+            name='image',
+            field=models.ImageField(blank=True, storage=core.storage.ContentAddressedStorage(), upload_to='posts/', verbose_name='Картинка'),
+        ),
+        migrations.RunPython(fill_blobs, migrations.RunPython.noop),
+    ]
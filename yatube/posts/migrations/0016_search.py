@@ -0,0 +1,93 @@
+from django.db import migrations
+
+# Записи и комментарии лежат в одной таблице FTS5; rowid кодирует тип
+# строки и её id, поэтому триггеры удаляют строки по rowid без перебора.
+CREATE_SQL = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS posts_search USING fts5(
+        text, post_id UNINDEXED,
+        tokenize = 'unicode61 remove_diacritics 2'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS posts_search_post_insert
+    AFTER INSERT ON posts_post BEGIN
+        INSERT INTO posts_search (rowid, text, post_id)
+        VALUES (new.id * 2, new.text, new.id);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS posts_search_post_update
+    AFTER UPDATE OF text ON posts_post
+    WHEN new.text IS NOT old.text BEGIN
+        DELETE FROM posts_search WHERE rowid = old.id * 2;
+        INSERT INTO posts_search (rowid, text, post_id)
+        VALUES (new.id * 2, new.text, new.id);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS posts_search_post_delete
+    AFTER DELETE ON posts_post BEGIN
+        DELETE FROM posts_search WHERE rowid = old.id * 2;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS posts_search_comment_insert
+    AFTER INSERT ON posts_comment BEGIN
+        INSERT INTO posts_search (rowid, text, post_id)
+        VALUES (new.id * 2 + 1, new.text, new.post_id);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS posts_search_comment_update
+    AFTER UPDATE OF text, post_id ON posts_comment
+    WHEN new.text IS NOT old.text OR new.post_id IS NOT old.post_id BEGIN
+        DELETE FROM posts_search WHERE rowid = old.id * 2 + 1;
+        INSERT INTO posts_search (rowid, text, post_id)
+        VALUES (new.id * 2 + 1, new.text, new.post_id);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS posts_search_comment_delete
+    AFTER DELETE ON posts_comment BEGIN
+        DELETE FROM posts_search WHERE rowid = old.id * 2 + 1;
+    END
+    """,
+    """
+    INSERT INTO posts_search (rowid, text, post_id)
+    SELECT id * 2, text, id FROM posts_post
+    UNION ALL
+    SELECT id * 2 + 1, text, post_id FROM posts_comment
+    """,
+]
+
+DROP_SQL = [
+    'DROP TRIGGER IF EXISTS posts_search_post_insert',
+    'DROP TRIGGER IF EXISTS posts_search_post_update',
+    'DROP TRIGGER IF EXISTS posts_search_post_delete',
+    'DROP TRIGGER IF EXISTS posts_search_comment_insert',
+    'DROP TRIGGER IF EXISTS posts_search_comment_update',
+    'DROP TRIGGER IF EXISTS posts_search_comment_delete',
+    'DROP TABLE IF EXISTS posts_search',
+]
+
+
+def _run(statements):
+    def run(apps, schema_editor):
+        """Индекс FTS5 есть только в SQLite; другие базы ищут через LIKE."""
+        if schema_editor.connection.vendor != 'sqlite':
+            return
+        for statement in statements:
+            schema_editor.execute(statement)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0015_image_blobs'),
+    ]
+
+    operations = [
+        migrations.RunPython(_run(CREATE_SQL), _run(DROP_SQL)),
+    ]
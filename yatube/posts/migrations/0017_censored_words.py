@@ -0,0 +1,36 @@
+# Generated by Django 2.2.16 on 2026-10-18 18:30
+
+from django.db import migrations, models
+
+# Список, который раньше был зашит в CommentForm.
+INITIAL_WORDS = ['донцова', 'спаркс', 'джеймс', 'майер', 'коэльо']
+
+
+def add_initial_words(apps, schema_editor):
+    CensoredWord = apps.get_model('posts', 'CensoredWord')
+    CensoredWord.objects.bulk_create(
+        [CensoredWord(word=word) for word in INITIAL_WORDS])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0016_search'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CensoredWord',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('word', models.CharField(max_length=100, unique=True, verbose_name='Слово')),
+                ('created', models.DateTimeField(auto_now_add=True, verbose_name='Дата добавления')),
+            ],
+            options={
+                'verbose_name': 'Запрещенное слово',
+                'verbose_name_plural': 'Запрещенные слова',
+                'ordering': ('word',),
+            },
+        ),
+        migrations.RunPython(add_initial_words, migrations.RunPython.noop),
+    ]
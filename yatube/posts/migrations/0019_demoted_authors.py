@@ -0,0 +1,28 @@
+# Generated by Django 2.2.16 on 2026-10-18 19:21
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('posts', '0018_checkpoints'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DemotedAuthor',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created', models.DateTimeField(auto_now_add=True, verbose_name='Дата понижения')),
+                ('author', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='timeline_demotion', to=settings.AUTH_USER_MODEL, verbose_name='Автор')),
+            ],
+            options={
+                'verbose_name': 'Бывшая знаменитость',
+                'verbose_name_plural': 'Бывшие знаменитости',
+            },
+        ),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 2.2.16 on 2026-10-18 19:40
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count
+import django.db.models.deletion
+
+
+def fill_celebrities(apps, schema_editor):
+    """Отмечает авторов, у которых уже больше порога подписчиков."""
+    Follow = apps.get_model('posts', 'Follow')
+    CelebrityAuthor = apps.get_model('posts', 'CelebrityAuthor')
+    authors = Follow.objects.values('author').annotate(
+        followers=Count('id')).filter(
+            followers__gte=settings.TIMELINE_CELEBRITY_FOLLOWERS
+    ).values_list('author', flat=True)
+    CelebrityAuthor.objects.bulk_create(
+        [CelebrityAuthor(author_id=pk) for pk in authors], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('posts', '0019_demoted_authors'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CelebrityAuthor',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created', models.DateTimeField(auto_now_add=True, verbose_name='Дата повышения')),
+                ('author', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='timeline_celebrity', to=settings.AUTH_USER_MODEL, verbose_name='Автор')),
+            ],
+            options={
+                'verbose_name': 'Знаменитость',
+                'verbose_name_plural': 'Знаменитости',
+            },
+        ),
+        migrations.RunPython(fill_celebrities, migrations.RunPython.noop),
+    ]
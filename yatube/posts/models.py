@@ -1,17 +1,43 @@
 from django.contrib.auth import get_user_model
 from django.db import models
 
+from core.storage import ContentAddressedStorage
+
 User = get_user_model()
 
 POST_TEXT_TRANCATE = 15
 
 
-class Group(models.Model):
+class CounterFieldsMixin:
+    """Не перезаписывает счетчики при сохранении существующей строки.
+
+    Счетчики меняются только через ``F()``-обновления, поэтому значение,
+    прочитанное вместе с объектом, может устареть к моменту ``save()``.
+    """
+
+    counter_fields = ()
+
+    def save(self, *args, **kwargs):
+        if (not self._state.adding and kwargs.get('update_fields') is None
+                and not kwargs.get('force_insert')):
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key
+                and field.name not in self.counter_fields
+            ]
+        super().save(*args, **kwargs)
+
+
+class Group(CounterFieldsMixin, models.Model):
     """Класс для групп."""
 
     title = models.CharField('имя группы', max_length=200)
     slug = models.SlugField('адрес', unique=True)
     description = models.TextField('описание')
+    posts_count = models.PositiveIntegerField(
+        'Количество записей', default=0, editable=False)
+
+    counter_fields = ('posts_count',)
 
     class Meta:
         verbose_name = 'Группа'
@@ -22,13 +48,14 @@ class Group(models.Model):
         return self.title
 
 
-class Post(models.Model):
+class Post(CounterFieldsMixin, models.Model):
     """Класс для постов."""
 
     text = models.TextField(
         'Текст поста',
         help_text='Введите текст поста')
     pub_date = models.DateTimeField('Дата публикации', auto_now_add=True)
+    updated = models.DateTimeField('Дата изменения', auto_now=True)
     author = models.ForeignKey(
         User,
         on_delete=models.CASCADE,
@@ -47,13 +74,30 @@ class Post(models.Model):
     image = models.ImageField(
         'Картинка',
         upload_to='posts/',
+        storage=ContentAddressedStorage(),
         blank=True
     )
+    comments_count = models.PositiveIntegerField(
+        'Количество комментариев', default=0, editable=False)
+    thumbnails_ready = models.BooleanField(
+        'Миниатюры готовы', default=False, editable=False)
+
+    counter_fields = ('comments_count',)
 
     class Meta:
         ordering = ('-pub_date',)
         verbose_name = 'Запись'
         verbose_name_plural = 'Записи'
+        indexes = [
+            models.Index(
+                fields=('-pub_date', '-id'), name='post_pub_date_idx'),
+            models.Index(
+                fields=('author', '-pub_date', '-id'),
+                name='post_author_pub_date_idx'),
+            models.Index(
+                fields=('group', '-pub_date', '-id'),
+                name='post_group_pub_date_idx'),
+        ]
 
     def __str__(self) -> str:
         """Возвращает обрезанный текст поста."""
@@ -85,6 +129,11 @@ class Comment(models.Model):
         ordering = ('-created',)
         verbose_name = 'Комментарий'
         verbose_name_plural = 'Комментарии'
+        indexes = [
+            models.Index(
+                fields=('post', '-created', '-id'),
+                name='comment_post_created_idx'),
+        ]
 
     def __str__(self) -> str:
         """Возвращает текст комментария."""
@@ -113,3 +162,187 @@ class Follow(models.Model):
 
     class Meta:
         verbose_name = 'Подписки'
+        constraints = [
+            models.UniqueConstraint(
+                fields=('user', 'author'), name='unique_follow'),
+        ]
+
+
+class TimelineEntry(models.Model):
+    """Класс для материализованной ленты подписок."""
+
+    user = models.ForeignKey(
+        User,
+        related_name='timeline',
+        verbose_name='Читатель',
+        on_delete=models.CASCADE
+    )
+    post = models.ForeignKey(
+        Post,
+        related_name='timeline_entries',
+        verbose_name='Запись',
+        on_delete=models.CASCADE
+    )
+    author = models.ForeignKey(
+        User,
+        related_name='+',
+        verbose_name='Автор',
+        on_delete=models.CASCADE
+    )
+    pub_date = models.DateTimeField('Дата публикации')
+
+    class Meta:
+        ordering = ('-pub_date',)
+        verbose_name = 'Запись ленты'
+        verbose_name_plural = 'Лента подписок'
+        constraints = [
+            models.UniqueConstraint(
+                fields=('user', 'post'), name='unique_timeline_entry'),
+        ]
+        indexes = [
+            models.Index(
+                fields=('user', '-pub_date', '-post'),
+                name='timeline_user_pub_date_idx'),
+        ]
+
+    def __str__(self) -> str:
+        """Возвращает читателя и запись в его ленте."""
+        return f'{self.user} - {self.post}'
+
+
+class CelebrityAuthor(models.Model):
+    """Класс для знаменитостей, чьи записи не раскладываются по лентам."""
+
+    author = models.OneToOneField(
+        User,
+        related_name='timeline_celebrity',
+        verbose_name='Автор',
+        on_delete=models.CASCADE
+    )
+    created = models.DateTimeField('Дата повышения', auto_now_add=True)
+
+    class Meta:
+        verbose_name = 'Знаменитость'
+        verbose_name_plural = 'Знаменитости'
+
+    def __str__(self) -> str:
+        """Возвращает автора."""
+        return str(self.author)
+
+
+class DemotedAuthor(models.Model):
+    """Класс для бывших знаменитостей, чьи записи еще раскладываются."""
+
+    author = models.OneToOneField(
+        User,
+        related_name='timeline_demotion',
+        verbose_name='Автор',
+        on_delete=models.CASCADE
+    )
+    created = models.DateTimeField('Дата понижения', auto_now_add=True)
+
+    class Meta:
+        verbose_name = 'Бывшая знаменитость'
+        verbose_name_plural = 'Бывшие знаменитости'
+
+    def __str__(self) -> str:
+        """Возвращает автора."""
+        return str(self.author)
+
+
+class UserCounter(models.Model):
+    """Класс для счетчиков пользователя."""
+
+    user = models.OneToOneField(
+        User,
+        primary_key=True,
+        related_name='counters',
+        verbose_name='Пользователь',
+        on_delete=models.CASCADE
+    )
+    posts_count = models.PositiveIntegerField('Записей', default=0)
+    followers_count = models.PositiveIntegerField('Подписчиков', default=0)
+    following_count = models.PositiveIntegerField('Подписок', default=0)
+
+    class Meta:
+        verbose_name = 'Счетчики пользователя'
+        verbose_name_plural = 'Счетчики пользователей'
+
+    def __str__(self) -> str:
+        """Возвращает пользователя, к которому относятся счетчики."""
+        return str(self.user)
+
+
+class ThumbnailJob(models.Model):
+    """Класс для заданий на нарезку миниатюр картинки записи."""
+
+    post = models.OneToOneField(
+        Post,
+        related_name='thumbnail_job',
+        verbose_name='Запись',
+        on_delete=models.CASCADE
+    )
+    source = models.CharField('Картинка', max_length=100)
+    created = models.DateTimeField('Дата создания', auto_now_add=True)
+    started = models.DateTimeField('Начало обработки', null=True, blank=True)
+    attempts = models.PositiveSmallIntegerField('Попыток', default=0)
+    error = models.TextField('Ошибка', blank=True)
+
+    class Meta:
+        ordering = ('created',)
+        verbose_name = 'Задание на миниатюры'
+        verbose_name_plural = 'Задания на миниатюры'
+
+    def __str__(self) -> str:
+        """Возвращает картинку, для которой нарезаются миниатюры."""
+        return self.source
+
+
+class ImageBlob(models.Model):
+    """Класс для учета ссылок на файл картинки в хранилище."""
+
+    name = models.CharField('Файл', max_length=100, unique=True)
+    refcount = models.PositiveIntegerField('Ссылок', default=0)
+    thumbnails_ready = models.BooleanField('Миниатюры готовы', default=False)
+    created = models.DateTimeField('Дата загрузки', auto_now_add=True)
+
+    class Meta:
+        verbose_name = 'Файл картинки'
+        verbose_name_plural = 'Файлы картинок'
+
+    def __str__(self) -> str:
+        """Возвращает имя файла в хранилище."""
+        return self.name
+
+
+class CensoredWord(models.Model):
+    """Класс для слов, которые заменяются звездочками в текстах."""
+
+    word = models.CharField('Слово', max_length=100, unique=True)
+    created = models.DateTimeField('Дата добавления', auto_now_add=True)
+
+    class Meta:
+        ordering = ('word',)
+        verbose_name = 'Запрещенное слово'
+        verbose_name_plural = 'Запрещенные слова'
+
+    def __str__(self) -> str:
+        """Возвращает запрещенное слово."""
+        return self.word
+
+
+class Checkpoint(models.Model):
+    """Класс для позиции, с которой продолжается пакетная обработка."""
+
+    name = models.CharField('Задача', max_length=100, unique=True)
+    position = models.BigIntegerField('Последний обработанный id', default=0)
+    state = models.CharField('Состояние', max_length=64, blank=True)
+    updated = models.DateTimeField('Дата обновления', auto_now=True)
+
+    class Meta:
+        verbose_name = 'Контрольная точка'
+        verbose_name_plural = 'Контрольные точки'
+
+    def __str__(self) -> str:
+        """Возвращает задачу и позицию."""
+        return f'{self.name}: {self.position}'
@@ -0,0 +1,65 @@
+"""Повторная цензура уже сохраненных комментариев.
+
+Форма применяет цензуру только к новым текстам, поэтому после изменения
+списка слов старые комментарии нужно перепроверить. Комментарии читаются
+порциями по возрастанию id, измененные тексты записываются через
+``bulk_update``, и каждая порция сохраняется в своей короткой транзакции
+вместе с контрольной точкой. Прерванный проход продолжается с последней
+точки, а если с тех пор изменился список слов, начинается заново.
+"""
+import time
+
+from django.db import transaction
+
+from . import censor
+from .models import Checkpoint, Comment
+
+CHECKPOINT = 'recensor-comments'
+DEFAULT_BATCH_SIZE = 1000
+
+
+def _checkpoint(state, restart):
+    checkpoint, _ = Checkpoint.objects.get_or_create(name=CHECKPOINT)
+    if restart or checkpoint.state != state:
+        checkpoint.position = 0
+        checkpoint.state = state
+    return checkpoint
+
+
+def _censor_batch(pattern, after, batch_size):
+    """Последний id порции, число прочитанных и измененные комментарии."""
+    rows = Comment.objects.filter(pk__gt=after).order_by('pk').values_list(
+        'pk', 'text')[:batch_size]
+    last, read, changed = None, 0, []
+    for pk, text in rows.iterator():
+        last, read = pk, read + 1
+        censored = censor.censor(text, pattern)
+        if censored != text:
+            changed.append(Comment(pk=pk, text=censored))
+    return last, read, changed
+
+
+def recensor_comments(batch_size=DEFAULT_BATCH_SIZE, rate=None,
+                      restart=False):
+    """Перепроверяет комментарии, по порциям отдает (прочитано, изменено).
+
+    rate ограничивает число прочитанных комментариев в секунду, чтобы
+    проход по живой базе не отнимал у нее все время.
+    """
+    words = censor.current_words()
+    pattern = censor.compile_pattern(words)
+    checkpoint = _checkpoint(censor.fingerprint(words), restart)
+    while pattern is not None:
+        started = time.monotonic()
+        last, read, changed = _censor_batch(
+            pattern, checkpoint.position, batch_size)
+        if last is None:
+            break
+        with transaction.atomic():
+            Comment.objects.bulk_update(changed, ['text'])
+            checkpoint.position = last
+            checkpoint.save()
+        yield read, len(changed)
+        if rate:
+            time.sleep(max(0.0, read / rate - (time.monotonic() - started)))
+    checkpoint.save()
@@ -0,0 +1,227 @@
+"""Полнотекстовый поиск по записям и комментариям.
+
+Бэкенд выбирается настройкой ``SEARCH_BACKEND``. ``Fts5Backend`` ищет по
+виртуальной таблице SQLite FTS5 ``posts_search``, которую поддерживают
+триггеры базы (миграция 0016), поэтому индекс не отстает и при массовой
+вставке в обход сигналов. ``LikeBackend`` годится для других баз и
+небольших объемов данных.
+
+Результаты листаются по курсору из позиции последней найденной записи,
+которую возвращает бэкенд: для FTS5 это ``(score, rowid)`` лучшего
+совпадения, где меньший score означает лучшее совпадение, а rowid
+разводит записи с одинаковым score.
+"""
+import base64
+import json
+import re
+from functools import lru_cache
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Q
+from django.utils.module_loading import import_string
+
+from . import caching
+from .models import Comment, Post
+
+MAX_TERMS = 10
+# Более короткое последнее слово ищется целиком: префикс из одной-двух
+# букв совпадает с большой частью индекса.
+MIN_PREFIX = 3
+
+
+def terms(query):
+    """Слова запроса без знаков препинания и операторов."""
+    return re.findall(r'\w+', query)[:MAX_TERMS]
+
+
+def match_expression(query):
+    """Превращает ввод пользователя в безопасный запрос FTS5.
+
+    Каждое слово ищется как отдельная фраза, последнее — по префиксу,
+    чтобы операторы FTS5 во вводе не ломали запрос.
+    """
+    words = terms(query)
+    if not words:
+        return ''
+    expression = ' '.join(f'"{word}"' for word in words)
+    return expression + '*' if len(words[-1]) >= MIN_PREFIX else expression
+
+
+class SearchBackend:
+    """Интерфейс бэкенда поиска."""
+
+    def search(self, query, limit, after=None):
+        """Возвращает до limit пар ``(position, post_id)`` после курсора.
+
+        ``position`` — кортеж чисел, по которому упорядочены результаты;
+        он же передается обратно как ``after``.
+        """
+        raise NotImplementedError
+
+    def filter(self, queryset, query):
+        """Оставляет в queryset записей или комментариев найденные."""
+        raise NotImplementedError
+
+
+class Fts5Backend(SearchBackend):
+    """Поиск по таблице FTS5 с ранжированием bm25.
+
+    Ранжируются только ``SEARCH_MAX_CANDIDATES`` новейших совпадений
+    среди записей и столько же среди комментариев. Записи хранятся под
+    четными rowid ``id * 2``, комментарии под нечетными ``id * 2 + 1``,
+    поэтому окно каждого вида берется отдельно по его четности, и
+    частые комментарии не вытесняют из окна записи. Общая нижняя
+    граница по rowid проверяется FTS5 по индексу, поэтому цена запроса
+    по частому слову не растет с размером таблицы.
+    """
+
+    WINDOW_SQL = """
+        SELECT rowid FROM posts_search
+        WHERE posts_search MATCH %s AND rowid %% 2 = %s
+        ORDER BY rowid DESC
+        LIMIT 1 OFFSET %s
+    """
+    SEARCH_SQL = """
+        SELECT score, hit, post_id FROM (
+            SELECT MIN(rank) AS score, rowid AS hit, post_id
+            FROM posts_search
+            WHERE posts_search MATCH %s AND rowid >= %s
+                AND (rowid %% 2 = 0 AND rowid >= %s
+                     OR rowid %% 2 = 1 AND rowid >= %s)
+            GROUP BY post_id
+        )
+        {where}
+        ORDER BY score, hit
+        LIMIT %s
+    """
+
+    def _floor(self, cursor, expression, remainder):
+        """Наименьший rowid в окне новейших совпадений одного вида."""
+        cursor.execute(self.WINDOW_SQL, [
+            expression, remainder, settings.SEARCH_MAX_CANDIDATES - 1])
+        row = cursor.fetchone()
+        return row[0] if row else 0
+
+    def search(self, query, limit, after=None):
+        expression = match_expression(query)
+        if not expression:
+            return []
+        with connection.cursor() as cursor:
+            posts = self._floor(cursor, expression, 0)
+            comments = self._floor(cursor, expression, 1)
+            where = ''
+            params = [expression, min(posts, comments), posts, comments]
+            if after is not None:
+                where = 'WHERE score > %s OR (score = %s AND hit > %s)'
+                params += [after[0], after[0], after[1]]
+            cursor.execute(
+                self.SEARCH_SQL.format(where=where), params + [limit])
+            return [((score, hit), post_id)
+                    for score, hit, post_id in cursor.fetchall()]
+
+    def filter(self, queryset, query):
+        expression = match_expression(query)
+        if not expression:
+            return queryset.none()
+        remainder = 1 if queryset.model is Comment else 0
+        # RawSQL в ``pk__in`` Django заключает в двойные скобки, и SQLite
+        # берет из такого подзапроса только первую строку.
+        where = (f'{queryset.model._meta.db_table}.id IN ('
+                 'SELECT rowid / 2 FROM posts_search '
+                 'WHERE posts_search MATCH %s AND rowid %% 2 = %s)')
+        return queryset.extra(where=[where], params=[expression, remainder])
+
+
+class LikeBackend(SearchBackend):
+    """Поиск через LIKE: новые записи выше, без ранжирования."""
+
+    def _condition(self, query):
+        condition = Q()
+        for term in terms(query):
+            condition &= Q(text__icontains=term)
+        return condition
+
+    def search(self, query, limit, after=None):
+        if not terms(query):
+            return []
+        posts = Post.objects.filter(
+            Q(pk__in=Comment.objects.filter(
+                self._condition(query)).values('post_id'))
+            | self._condition(query))
+        if after is not None:
+            posts = posts.filter(pk__lt=after[0])
+        return [((pk,), pk) for pk in posts.order_by('-pk').values_list(
+            'pk', flat=True)[:limit]]
+
+    def filter(self, queryset, query):
+        if not terms(query):
+            return queryset.none()
+        return queryset.filter(self._condition(query))
+
+
+@lru_cache(maxsize=None)
+def _load_backend(path):
+    return import_string(path)()
+
+
+def get_backend():
+    """Возвращает бэкенд из настройки ``SEARCH_BACKEND``."""
+    return _load_backend(settings.SEARCH_BACKEND)
+
+
+def encode_cursor(position, number):
+    payload = json.dumps([list(position), number], separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    """Распаковывает токен; для испорченного токена возвращает None."""
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        position, number = json.loads(
+            base64.urlsafe_b64decode(padded.encode()))
+        if not position or not all(
+                isinstance(value, (int, float))
+                and not isinstance(value, bool) for value in position):
+            return None
+        return tuple(position), max(int(number), 1)
+    except (TypeError, ValueError):
+        return None
+
+
+class ResultsPage:
+    """Страница результатов поиска с курсором на следующую."""
+
+    def __init__(self, posts, number, next_cursor=''):
+        self.object_list = posts
+        self.number = number
+        self.next_cursor = next_cursor
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_next(self):
+        return bool(self.next_cursor)
+
+
+def search_page(query, cursor=None, per_page=None):
+    """Возвращает страницу найденных записей в порядке релевантности."""
+    per_page = per_page or settings.POSTS_ON_PAGE
+    position = decode_cursor(cursor) if cursor else None
+    after, number = position or (None, 1)
+    rows = get_backend().search(query, per_page + 1, after)
+    has_next = len(rows) > per_page
+    rows = rows[:per_page]
+    found = Post.objects.select_related('author', 'group').in_bulk(
+        [post_id for _, post_id in rows])
+    posts = [found[post_id] for _, post_id in rows if post_id in found]
+    caching.annotate_versions(posts)
+    next_cursor = ''
+    if has_next:
+        position, _ = rows[-1]
+        next_cursor = encode_cursor(position, number + 1)
+    return ResultsPage(posts, number, next_cursor)
@@ -0,0 +1,181 @@
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from . import blobs, caching, censor, counters, thumbnails, timeline
+from .models import (
+    CensoredWord, Comment, Follow, Group, Post, ThumbnailJob, User,
+    UserCounter)
+
+
+@receiver(post_save, sender=Post)
+def fan_out_post(sender, instance, created, **kwargs):
+    """Раскладывает новую запись по лентам подписчиков."""
+    if created:
+        timeline.fan_out(instance)
+
+
+@receiver(post_save, sender=Follow)
+def promote_celebrity(sender, instance, created, **kwargs):
+    """Отмечает автора, достигшего порога знаменитости."""
+    if created:
+        timeline.check_promotion(instance.author_id)
+
+
+@receiver(post_save, sender=Follow)
+def backfill_timeline(sender, instance, created, **kwargs):
+    """Добавляет в ленту записи автора, на которого подписались."""
+    if created:
+        timeline.backfill(instance.user, [instance.author_id])
+
+
+@receiver(post_delete, sender=Follow)
+def clear_timeline(sender, instance, **kwargs):
+    """Убирает из ленты записи автора, от которого отписались."""
+    timeline.remove_author(instance.user_id, instance.author_id)
+
+
+@receiver(post_delete, sender=Follow)
+def demote_celebrity(sender, instance, **kwargs):
+    """Возвращает в ленты записи автора, ставшего ниже порога знаменитости."""
+    timeline.check_demotion(instance.author_id)
+
+
+@receiver(pre_save, sender=Post)
+def remember_previous_state(sender, instance, **kwargs):
+    """Запоминает прежнюю группу и картинку записи.
+
+    Группа нужна, чтобы сбросить и её фрагменты, картинка — чтобы учесть
+    ссылки на файлы и нарезать миниатюры только для новой картинки.
+    """
+    previous_group_id, previous_image, ready = None, '', False
+    if instance.pk:
+        previous_group_id, previous_image, ready = Post.objects.filter(
+            pk=instance.pk).values_list(
+                'group_id', 'image', 'thumbnails_ready').first() or (
+                    None, '', False)
+    instance._previous_group_id = previous_group_id
+    instance._previous_image = previous_image
+    instance._image_changed = (
+        (instance.image.name or '') != previous_image
+        or bool(instance.image) and not instance.image._committed)
+    instance.thumbnails_ready = ready and not instance._image_changed
+
+
+@receiver(post_save, sender=Post)
+def track_post_image(sender, instance, created, **kwargs):
+    """Учитывает ссылку на новую картинку и готовит её миниатюры.
+
+    Миниатюры картинки с тем же содержимым переиспользуются, иначе
+    нарезка ставится в очередь.
+    """
+    if not getattr(instance, '_image_changed', False) or kwargs.get('raw'):
+        return
+    if instance.image:
+        if blobs.acquire(instance.image.name):
+            Post.objects.filter(pk=instance.pk).update(thumbnails_ready=True)
+            instance.thumbnails_ready = True
+            if not created:
+                ThumbnailJob.objects.filter(post=instance).delete()
+        else:
+            thumbnails.enqueue(instance, created)
+    if instance._previous_image:
+        blobs.release(instance._previous_image)
+
+
+@receiver(post_delete, sender=Post)
+def release_post_image(sender, instance, **kwargs):
+    """Снимает ссылку на картинку удаленной записи."""
+    if instance.image:
+        blobs.release(instance.image.name)
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def invalidate_post_fragments(sender, instance, **kwargs):
+    """Сбрасывает фрагменты страниц, на которых видна запись."""
+    caching.bump(*caching.page_scopes(
+        instance, getattr(instance, '_previous_group_id', None)))
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def invalidate_group_fragments(sender, instance, **kwargs):
+    """Сбрасывает фрагменты, в которых выводится группа."""
+    caching.bump(
+        caching.INDEX,
+        caching.group_scope(instance.pk),
+        caching.group_info_scope(instance.pk))
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_user_fragments(sender, instance, **kwargs):
+    """Сбрасывает фрагменты, в которых выводится автор."""
+    if kwargs.get('update_fields') == frozenset(('last_login',)):
+        return
+    caching.bump(
+        caching.INDEX,
+        caching.profile_scope(instance.pk),
+        caching.author_scope(instance.pk))
+
+
+@receiver(post_save, sender=User)
+def create_user_counters(sender, instance, created, **kwargs):
+    """Создает строку счетчиков для нового пользователя."""
+    if created and not kwargs.get('raw'):
+        UserCounter.objects.get_or_create(user=instance)
+
+
+@receiver(post_save, sender=Post)
+def count_saved_post(sender, instance, created, **kwargs):
+    """Учитывает новую запись и перенос записи в другую группу."""
+    if created:
+        counters.change_user(instance.author_id, 'posts_count', 1)
+        counters.change_group(instance.group_id, 1)
+        return
+    previous_group_id = getattr(instance, '_previous_group_id', None)
+    if previous_group_id != instance.group_id:
+        counters.change_group(previous_group_id, -1)
+        counters.change_group(instance.group_id, 1)
+
+
+@receiver(post_delete, sender=Post)
+def count_deleted_post(sender, instance, **kwargs):
+    """Учитывает удаление записи."""
+    counters.change_user(instance.author_id, 'posts_count', -1)
+    counters.change_group(instance.group_id, -1)
+
+
+@receiver(post_save, sender=Comment)
+def count_saved_comment(sender, instance, created, **kwargs):
+    """Учитывает новый комментарий."""
+    if created:
+        counters.change_post(instance.post_id, 1)
+
+
+@receiver(post_delete, sender=Comment)
+def count_deleted_comment(sender, instance, **kwargs):
+    """Учитывает удаление комментария."""
+    counters.change_post(instance.post_id, -1)
+
+
+@receiver(post_save, sender=Follow)
+def count_saved_follow(sender, instance, created, **kwargs):
+    """Учитывает новую подписку."""
+    if created:
+        counters.change_user(instance.user_id, 'following_count', 1)
+        counters.change_user(instance.author_id, 'followers_count', 1)
+
+
+@receiver(post_delete, sender=Follow)
+def count_deleted_follow(sender, instance, **kwargs):
+    """Учитывает отписку."""
+    counters.change_user(instance.user_id, 'following_count', -1)
+    counters.change_user(instance.author_id, 'followers_count', -1)
+
+
+@receiver(post_save, sender=CensoredWord)
+@receiver(post_delete, sender=CensoredWord)
+def reload_censored_words(sender, instance, **kwargs):
+    """Пересобирает шаблон цензуры после изменения списка слов."""
+    censor.reload()
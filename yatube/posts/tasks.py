@@ -0,0 +1,25 @@
+"""Фоновые задачи приложения posts."""
+from core.taskqueue import task
+
+from . import thumbnails, timeline
+from .models import Post
+
+
+@task()
+def fan_out_post(post_id):
+    """Раскладывает запись по лентам подписчиков."""
+    post = Post.objects.filter(pk=post_id).first()
+    if post is not None:
+        timeline.fan_out(post, inline=True)
+
+
+@task()
+def demote_author(author_id):
+    """Раскладывает записи бывшей знаменитости по лентам подписчиков."""
+    timeline.demote(author_id)
+
+
+@task()
+def render_thumbnails(post_id):
+    """Нарезает миниатюры картинки записи, если задание еще не забрали."""
+    thumbnails.process_jobs(thumbnails.claim(1, post_id=post_id))
@@ -0,0 +1,18 @@
+from django import template
+
+from posts import thumbnails
+
+register = template.Library()
+
+
+@register.inclusion_tag('posts/includes/post_image.html')
+def post_image(post, size):
+    """Выводит адаптивную миниатюру картинки записи или заглушку."""
+    if not post.image:
+        return {'image': None}
+    return {
+        'image': post.image,
+        'picture': (thumbnails.picture(post.image.name, size)
+                    if post.thumbnails_ready else None),
+        'ratio': thumbnails.ratio(size),
+    }
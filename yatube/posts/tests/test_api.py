@@ -0,0 +1,110 @@
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from ..models import Comment, Follow, Group, Post, User
+
+TEST_POSTS_AMOUNT = 5
+
+
+class ApiTests(TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        super().setUpClass()
+        cls.user = User.objects.create(username='darth')
+        cls.reader = User.objects.create(username='luke')
+        cls.group = Group.objects.create(
+            title='Test group', slug='test_slug', description='Описание')
+        cls.posts = [
+            Post.objects.create(
+                author=cls.user, group=cls.group, text=f'Текст {i}')
+            for i in range(TEST_POSTS_AMOUNT)
+        ]
+        cls.post = cls.posts[-1]
+        Comment.objects.create(
+            post=cls.post, author=cls.reader, text='Комментарий')
+        Follow.objects.create(user=cls.reader, author=cls.user)
+
+    def get(self, name, kwargs=None, client=None, **params):
+        client = client or Client()
+        return client.get(reverse(f'api:{name}', kwargs=kwargs), params)
+
+    def test_cursor_pages(self):
+        """Курсор проходит весь список без повторов"""
+        ids = []
+        response = self.get('post_list', limit=2)
+        while True:
+            data = response.json()
+            ids += [post['id'] for post in data['results']]
+            if not data['next']:
+                break
+            response = Client().get(data['next'])
+        self.assertEqual(ids, [post.pk for post in reversed(self.posts)])
+
+    def test_sparse_fieldsets(self):
+        """Параметр fields оставляет только перечисленные поля"""
+        response = self.get('post_list', fields='id,group', limit=1)
+        self.assertEqual(
+            response.json()['results'],
+            [{'id': self.post.pk, 'group': self.group.slug}])
+        response = self.get('post_list', fields='id,password')
+        self.assertEqual(response.status_code, 400)
+
+    def test_fixed_query_counts(self):
+        """Число запросов не зависит от размера страницы и полей"""
+        lists = (
+            ('post_list', None, 1),
+            ('group_posts', {'slug': self.group.slug}, 2),
+            ('profile_posts', {'username': self.user.username}, 2),
+            ('post_comments', {'post_id': self.post.pk}, 2),
+            ('group_list', None, 1),
+        )
+        for name, kwargs, queries in lists:
+            for limit in (1, 10):
+                with self.subTest(name=name, limit=limit):
+                    with self.assertNumQueries(queries):
+                        response = self.get(name, kwargs, limit=limit)
+                    self.assertEqual(response.status_code, 200)
+
+    def test_details(self):
+        """Запись и группа отдаются по одному запросу"""
+        with self.assertNumQueries(1):
+            response = self.get('post_detail', {'post_id': self.post.pk})
+        self.assertEqual(response.json()['author'], self.user.username)
+        self.assertEqual(response.json()['comments_count'], 1)
+        response = self.get(
+            'group_detail', {'slug': self.group.slug}, fields='posts_count')
+        self.assertEqual(response.json(), {'posts_count': TEST_POSTS_AMOUNT})
+        response = self.get('post_detail', {'post_id': 0})
+        self.assertEqual(response.status_code, 404)
+        self.assertIn('error', response.json())
+
+    def test_etag(self):
+        """Совпадающий If-None-Match дает 304 без тела"""
+        response = self.get('post_detail', {'post_id': self.post.pk})
+        etag = response['ETag']
+        response = Client().get(
+            reverse('api:post_detail', kwargs={'post_id': self.post.pk}),
+            HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b'')
+        self.post.text = 'Новый текст'
+        self.post.save()
+        response = Client().get(
+            reverse('api:post_detail', kwargs={'post_id': self.post.pk}),
+            HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_follow(self):
+        """Лента подписок доступна только после входа"""
+        self.assertEqual(self.get('follow_posts').status_code, 401)
+        client = Client()
+        client.force_login(self.reader)
+        response = self.get('follow_posts', client=client, fields='id')
+        self.assertEqual(
+            [post['id'] for post in response.json()['results']],
+            [post.pk for post in reversed(self.posts)])
+
+    def test_read_only(self):
+        """Изменяющие методы не поддерживаются"""
+        response = Client().post(reverse('api:post_list'))
+        self.assertEqual(response.status_code, 405)
@@ -0,0 +1,37 @@
+from django.test import TestCase, TransactionTestCase
+
+from .. import benchmark
+from ..models import Follow, Post
+
+
+class BenchmarkTests(TestCase):
+    def test_percentile(self):
+        """Процентиль считается по ближайшему рангу"""
+        values = list(range(1, 101))
+        self.assertEqual(benchmark.percentile(values, 50), 50)
+        self.assertEqual(benchmark.percentile(values, 99), 99)
+        self.assertEqual(benchmark.percentile([7], 95), 7)
+
+    def test_seed_and_run(self):
+        """Набор данных создается, а сценарии возвращают статистику"""
+        dataset = benchmark.seed(
+            users=4, groups=2, posts=12, comments=6, follows=5)
+        self.assertEqual(Post.objects.count(), 12)
+        self.assertEqual(Follow.objects.count(), dataset['follows'])
+        results = benchmark.run(requests=2, warmup=0)
+        self.assertEqual(set(results), set(benchmark.SCENARIOS))
+        for row in results.values():
+            self.assertEqual(row['requests'], 2)
+            self.assertGreater(row['throughput_rps'], 0)
+
+
+class ConcurrencyBenchmarkTests(TransactionTestCase):
+    def test_concurrency(self):
+        """Оба режима обслуживают одних и тех же клиентов"""
+        benchmark.seed(users=4, groups=2, posts=12, comments=0, follows=2)
+        results = benchmark.concurrency(
+            requests=4, clients=2, threads=2, warmup=0)
+        self.assertEqual(set(results), set(benchmark.CONCURRENT_SCENARIOS))
+        for modes in results.values():
+            self.assertEqual(set(modes), {'asgi-1thread', 'asgi-pool'})
+            self.assertEqual(modes['asgi-pool']['requests'], 4)
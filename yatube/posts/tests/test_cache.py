@@ -1,8 +1,26 @@
-from django.core.cache import cache
-from django.test import TestCase, Client
+import shutil
+import tempfile
+from unittest import mock
+
+from django.conf import settings
+from django.core.cache.backends.filebased import FileBasedCache
+from django.test import TestCase, Client, override_settings
 from django.urls import reverse
 
-from ..models import Post, User
+from .. import caching
+from ..models import Group, Post, User
+
+TEMP_CACHE_DIR = tempfile.mkdtemp()
+SHARED_CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': TEMP_CACHE_DIR,
+    },
+    'template_fragments': {
+        'BACKEND': 'core.metrics.FragmentCache',
+        'LOCATION': 'default',
+    },
+}
 
 
 class PostCacheTest(TestCase):
@@ -17,10 +35,95 @@ class PostCacheTest(TestCase):
         )
 
     def test_index_cache(self):
+        """Главная страница отдается из кеша, пока пост не изменен"""
         response = self.guest_client.get(reverse('posts:index'))
-        self.post.delete()
+        Post.objects.filter(pk=self.post.pk).update(text='Changed quietly')
         response2 = self.guest_client.get(reverse('posts:index'))
         self.assertEqual(response.content, response2.content)
-        cache.clear()
-        response3 = self.guest_client.get(reverse('posts:index'))
-        self.assertNotEqual(response2.content, response3.content)
+
+    def test_index_cache_invalidated_on_post_delete(self):
+        """Удаление поста сразу сбрасывает кеш главной страницы"""
+        post = Post.objects.create(author=self.user, text='Short lived')
+        response = self.guest_client.get(reverse('posts:index'))
+        post.delete()
+        response2 = self.guest_client.get(reverse('posts:index'))
+        self.assertNotEqual(response.content, response2.content)
+
+    def test_index_cache_invalidated_on_post_edit(self):
+        """Изменение поста сразу видно на главной странице"""
+        self.guest_client.get(reverse('posts:index'))
+        self.post.text = 'Edited text'
+        self.post.save()
+        response = self.guest_client.get(reverse('posts:index'))
+        self.assertContains(response, 'Edited text')
+
+    def test_index_cache_invalidated_on_group_change(self):
+        """Изменение группы сбрасывает кеш главной страницы"""
+        group = Group.objects.create(title='Group', slug='old_slug')
+        Post.objects.create(author=self.user, text='In group', group=group)
+        self.guest_client.get(reverse('posts:index'))
+        group.slug = 'new_slug'
+        group.save()
+        response = self.guest_client.get(reverse('posts:index'))
+        self.assertContains(response, '/group/new_slug/')
+
+    def test_post_fragment_cached_on_group_page(self):
+        """Разметка поста на странице группы берется из кеша"""
+        group = Group.objects.create(title='Group', slug='cached_group')
+        post = Post.objects.create(
+            author=self.user, text='Group post', group=group)
+        url = reverse('posts:group_list', kwargs={'slug': group.slug})
+        self.guest_client.get(url)
+        Post.objects.filter(pk=post.pk).update(text='Changed quietly')
+        self.assertContains(self.guest_client.get(url), 'Group post')
+        post.text = 'Edited group post'
+        post.save()
+        self.assertContains(self.guest_client.get(url), 'Edited group post')
+
+    def test_post_fragment_invalidated_on_author_change(self):
+        """Изменение автора сбрасывает кеш разметки его постов"""
+        group = Group.objects.create(title='Group', slug='author_group')
+        Post.objects.create(author=self.user, text='By author', group=group)
+        url = reverse('posts:group_list', kwargs={'slug': group.slug})
+        self.guest_client.get(url)
+        self.user.first_name = 'Anakin'
+        self.user.save()
+        self.assertContains(self.guest_client.get(url), 'Anakin')
+
+
+@override_settings(CACHES=SHARED_CACHES)
+class SharedCacheTest(TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        super().setUpClass()
+        cls.user = User.objects.create(username='darth')
+        cls.post = Post.objects.create(author=cls.user, text='Test text')
+
+    @classmethod
+    def tearDownClass(cls) -> None:
+        super().tearDownClass()
+        shutil.rmtree(TEMP_CACHE_DIR, ignore_errors=True)
+
+    def test_bump_from_another_process(self):
+        """Поколение, увеличенное другим процессом, сбрасывает фрагменты"""
+        client = Client()
+        client.get(reverse('posts:index'))
+        Post.objects.filter(pk=self.post.pk).update(text='Changed quietly')
+        self.assertContains(client.get(reverse('posts:index')), 'Test text')
+        other_process = FileBasedCache(TEMP_CACHE_DIR, {})
+        with mock.patch.object(caching, 'cache', other_process):
+            caching.bump(caching.INDEX, caching.author_scope(self.user.pk))
+        self.assertContains(
+            client.get(reverse('posts:index')), 'Changed quietly')
+
+    def test_shared_cache_keeps_long_timeout(self):
+        """С общим кешем фрагменты живут FRAGMENT_CACHE_TIMEOUT"""
+        self.assertGreaterEqual(
+            caching.timeout(), settings.FRAGMENT_CACHE_TIMEOUT)
+
+
+class LocalCacheTimeoutTest(TestCase):
+    def test_local_cache_uses_short_timeout(self):
+        """С кешем процесса фрагменты живут недолго"""
+        self.assertLessEqual(
+            caching.timeout(), settings.FRAGMENT_CACHE_LOCAL_TIMEOUT * 1.1)
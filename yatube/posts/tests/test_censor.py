@@ -0,0 +1,136 @@
+import os
+import shutil
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from django.core.cache.backends.filebased import FileBasedCache
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+from .. import caching, censor, recensor
+from ..forms import PostForm
+from ..models import CensoredWord, Checkpoint, Comment, Post, User
+
+
+class CensorTests(TestCase):
+    def setUp(self):
+        self.addCleanup(censor.reload)
+
+    def test_punctuation_and_case(self):
+        """Слова ищутся без учета регистра и рядом со знаками препинания"""
+        self.assertEqual(
+            censor.censor('(ДОНЦОВА), «Коэльо»!\nи донцоват'),
+            '(*******), «******»!\nи донцоват')
+
+    def test_phrases(self):
+        """Фраза из нескольких слов совпадает при любых пробелах"""
+        CensoredWord.objects.create(word='Пауло  Коэльо')
+        self.assertEqual(
+            censor.censor('Пауло\nкоэльо'), '*****\n******')
+
+    def test_reload_on_change(self):
+        """Шаблон пересобирается после изменения списка"""
+        self.assertEqual(censor.censor('Толстой'), 'Толстой')
+        word = CensoredWord.objects.create(word='толстой')
+        self.assertEqual(censor.censor('Толстой'), '*******')
+        word.delete()
+        self.assertEqual(censor.censor('Толстой'), 'Толстой')
+
+    def test_compiled_once(self):
+        """Без изменений список не читается из базы повторно"""
+        censor.censor('текст')
+        with self.assertNumQueries(0):
+            censor.censor('Спаркс')
+
+    @override_settings(CENSOR_LOCAL_TTL=0)
+    def test_local_cache_pattern_expires(self):
+        """С кешем процесса шаблон подхватывает чужие изменения по TTL"""
+        self.assertEqual(censor.censor('Толстой'), 'Толстой')
+        # Слово добавил другой процесс: сигнал до этого не дошел.
+        CensoredWord.objects.bulk_create([CensoredWord(word='толстой')])
+        self.assertEqual(censor.censor('Толстой'), '*******')
+
+    def test_shared_cache_reload(self):
+        """С общим кешем сброс из другого процесса виден сразу"""
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        shared = {'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': directory,
+        }}
+        with override_settings(CACHES=shared):
+            self.assertEqual(censor.censor('Толстой'), 'Толстой')
+            CensoredWord.objects.bulk_create([CensoredWord(word='толстой')])
+            self.assertEqual(censor.censor('Толстой'), 'Толстой')
+            other_process = FileBasedCache(directory, {})
+            with mock.patch.object(caching, 'cache', other_process):
+                caching.bump(censor.SCOPE)
+            self.assertEqual(censor.censor('Толстой'), '*******')
+
+    def test_words_file(self):
+        """Слова из файла добавляются к списку и перечитываются"""
+        fd, path = tempfile.mkstemp()
+        self.addCleanup(os.remove, path)
+        with os.fdopen(fd, 'w', encoding='utf-8') as words_file:
+            words_file.write('# комментарий\nТолстой\n')
+        with override_settings(CENSOR_WORDS_FILE=path):
+            self.assertEqual(
+                censor.censor('Толстой и комментарий'),
+                '******* и комментарий')
+            with open(path, 'a', encoding='utf-8') as words_file:
+                words_file.write('Чехов\n')
+            os.utime(path, ns=(0, 0))
+            self.assertEqual(censor.censor('Чехов'), '*****')
+
+    def test_post_form(self):
+        """Форма записи тоже применяет цензуру"""
+        form = PostForm(data={'text': 'Майер'})
+        self.assertTrue(form.is_valid())
+        self.assertEqual(form.cleaned_data['text'], '*****')
+
+
+class RecensorTests(TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        super().setUpClass()
+        cls.user = User.objects.create(username='darth')
+        cls.post = Post.objects.create(author=cls.user, text='Запись')
+        Comment.objects.bulk_create(
+            [Comment(post=cls.post, author=cls.user, text=text)
+             for text in ('Читаю Толстого', 'Толстой!', 'Чехов', 'толстой')])
+
+    def setUp(self):
+        self.addCleanup(censor.reload)
+        CensoredWord.objects.create(word='толстой')
+
+    def texts(self):
+        return list(Comment.objects.order_by('pk').values_list(
+            'text', flat=True))
+
+    def test_command(self):
+        """Команда исправляет старые комментарии порциями"""
+        out = StringIO()
+        call_command('recensor', batch_size=3, stdout=out)
+        self.assertEqual(
+            self.texts(), ['Читаю Толстого', '*******!', 'Чехов', '*******'])
+        self.assertIn('Проверено комментариев: 4, исправлено: 2',
+                      out.getvalue())
+        self.assertEqual(
+            Checkpoint.objects.get(name=recensor.CHECKPOINT).position,
+            Comment.objects.order_by('pk').last().pk)
+
+    def test_resume_from_checkpoint(self):
+        """Прерванный проход продолжается с контрольной точки"""
+        batches = recensor.recensor_comments(batch_size=2)
+        self.assertEqual(next(batches), (2, 1))
+        batches.close()
+        self.assertEqual(list(recensor.recensor_comments()), [(2, 1)])
+        self.assertEqual(list(recensor.recensor_comments()), [])
+
+    def test_new_words_restart(self):
+        """После изменения списка слов проход начинается заново"""
+        list(recensor.recensor_comments())
+        CensoredWord.objects.create(word='чехов')
+        self.assertEqual(list(recensor.recensor_comments()), [(4, 1)])
+        self.assertEqual(self.texts()[2], '*****')
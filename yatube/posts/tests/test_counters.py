@@ -0,0 +1,76 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from ..models import Comment, Follow, Group, Post, User, UserCounter
+
+
+class CountersTests(TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        super().setUpClass()
+        cls.user = User.objects.create(username='darth')
+        cls.author = User.objects.create(username='luke')
+        cls.group = Group.objects.create(title='Test group', slug='test_slug')
+        cls.other_group = Group.objects.create(
+            title='Other group', slug='other_slug')
+
+    def counters(self, user):
+        return UserCounter.objects.get(user=user)
+
+    def test_post_counters(self):
+        """Счетчики записей автора и группы меняются вместе с записями"""
+        post = Post.objects.create(
+            author=self.author, text='Test text', group=self.group)
+        self.assertEqual(self.counters(self.author).posts_count, 1)
+        self.group.refresh_from_db()
+        self.assertEqual(self.group.posts_count, 1)
+        post.group = self.other_group
+        post.save()
+        self.group.refresh_from_db()
+        self.other_group.refresh_from_db()
+        self.assertEqual(self.group.posts_count, 0)
+        self.assertEqual(self.other_group.posts_count, 1)
+        post.delete()
+        self.assertEqual(self.counters(self.author).posts_count, 0)
+        self.other_group.refresh_from_db()
+        self.assertEqual(self.other_group.posts_count, 0)
+
+    def test_follow_and_comment_counters(self):
+        """Счетчики подписок и комментариев меняются вместе с данными"""
+        Follow.objects.create(user=self.user, author=self.author)
+        self.assertEqual(self.counters(self.user).following_count, 1)
+        self.assertEqual(self.counters(self.author).followers_count, 1)
+        post = Post.objects.create(author=self.author, text='Test text')
+        Comment.objects.create(post=post, author=self.user, text='Comment')
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 1)
+        Follow.objects.filter(user=self.user).delete()
+        self.assertEqual(self.counters(self.author).followers_count, 0)
+
+    def test_stale_instance_does_not_overwrite_counter(self):
+        """Сохранение записи не затирает счетчик комментариев"""
+        post = Post.objects.create(author=self.author, text='Test text')
+        Comment.objects.create(post=post, author=self.user, text='Comment')
+        post.text = 'Edited text'
+        post.save()
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 1)
+
+    def test_recount_repairs_drift(self):
+        """Команда recount исправляет разошедшиеся счетчики"""
+        Post.objects.create(author=self.author, text='Test text')
+        UserCounter.objects.filter(user=self.author).update(posts_count=7)
+        UserCounter.objects.filter(user=self.user).delete()
+        call_command('recount', stdout=StringIO())
+        self.assertEqual(self.counters(self.author).posts_count, 1)
+        self.assertEqual(self.counters(self.user).posts_count, 0)
+
+    def test_profile_shows_posts_count(self):
+        """На странице профиля выводится число записей автора"""
+        Post.objects.create(author=self.author, text='Test text')
+        response = Client().get(
+            reverse('posts:profile', kwargs={'username': 'luke'}))
+        self.assertEqual(response.context['posts_count'], 1)
@@ -0,0 +1,142 @@
+import csv
+import io
+import json
+from datetime import timedelta
+
+from django.core.management import CommandError, call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from .. import export
+from ..models import Comment, Group, Post, User
+
+
+@override_settings(EXPORT_CHUNK_SIZE=2)
+class ExportTests(TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        super().setUpClass()
+        cls.user = User.objects.create(username='darth')
+        cls.other = User.objects.create(username='luke')
+        cls.group = Group.objects.create(title='Группа', slug='test_slug')
+        cls.posts = [
+            Post.objects.create(
+                author=cls.user, group=cls.group, text=f'Текст, "{i}"')
+            for i in range(3)
+        ]
+        cls.foreign = Post.objects.create(author=cls.other, text='Чужая')
+        Comment.objects.create(
+            post=cls.posts[0], author=cls.other, text='Комментарий')
+        Post.objects.filter(pk=cls.posts[0].pk).update(
+            pub_date=timezone.now() - timedelta(days=10))
+
+    def export(self, *args, **options):
+        out = io.StringIO()
+        call_command('export', *args, stdout=out, **options)
+        return out.getvalue()
+
+    def test_ndjson_filters(self):
+        """Выгрузка фильтрует по автору, группе и периоду"""
+        lines = self.export('posts', author='darth', group='test_slug')
+        rows = [json.loads(line) for line in lines.splitlines()]
+        self.assertEqual(
+            [row['id'] for row in rows], [post.pk for post in self.posts])
+        self.assertEqual(rows[1]['text'], 'Текст, "1"')
+        since = (timezone.now() - timedelta(days=1)).date().isoformat()
+        lines = self.export('posts', author='darth', since=since)
+        self.assertEqual(len(lines.splitlines()), 2)
+        lines = self.export('posts', until=since)
+        self.assertEqual(len(lines.splitlines()), 1)
+
+    def test_until_datetime_is_inclusive(self):
+        """Конец периода со временем входит в выгрузку"""
+        moment = timezone.now().replace(microsecond=0) - timedelta(days=5)
+        Post.objects.filter(pk=self.posts[1].pk).update(pub_date=moment)
+        lines = self.export(
+            'posts', author='darth', since=moment.isoformat(),
+            until=moment.isoformat())
+        self.assertEqual(
+            [json.loads(line)['id'] for line in lines.splitlines()],
+            [self.posts[1].pk])
+        earlier = (moment - timedelta(microseconds=1)).isoformat()
+        self.assertEqual(self.export('posts', until=earlier).count('\n'), 1)
+
+    def test_until_includes_whole_unit_of_its_precision(self):
+        """Конец периода включает всю минуту, секунду или долю секунды"""
+        bounds = (
+            ('2024-01-01', '2024-01-02T00:00:00'),
+            ('2024-01-01 10:30', '2024-01-01T10:31:00'),
+            ('2024-01-01T10:30:15', '2024-01-01T10:30:16'),
+            ('2024-01-01T10:30:15.5', '2024-01-01T10:30:15.600000'),
+            ('2024-01-01T10:30:15.123456', '2024-01-01T10:30:15.123457'),
+        )
+        for value, expected in bounds:
+            with self.subTest(value=value):
+                self.assertEqual(
+                    export.parse_bound(value, end=True),
+                    export.parse_bound(expected))
+
+    def test_until_last_day_is_open_ended(self):
+        """Конец периода на последнем дне календаря не ломает выгрузку"""
+        for value in ('9999-12-31', '9999-12-31T23:59'):
+            with self.subTest(value=value):
+                self.assertIsNone(export.parse_bound(value, end=True))
+                self.assertEqual(
+                    self.export('posts', until=value).count('\n'), 4)
+
+    def test_csv(self):
+        """CSV содержит заголовок и экранирует текст"""
+        rows = list(csv.reader(io.StringIO(
+            self.export('comments', format='csv', group='test_slug'))))
+        self.assertEqual(rows[0], export.header('comments'))
+        self.assertEqual(rows[1][1], str(self.posts[0].pk))
+        self.assertEqual(rows[1][4], 'Комментарий')
+        posts = list(csv.reader(io.StringIO(
+            self.export('posts', format='csv'))))
+        self.assertEqual(posts[1][4], 'Текст, "0"')
+
+    def test_buffered(self):
+        """Строки склеиваются в куски не меньше заданного размера"""
+        chunks = list(export.buffered(['ab', 'cd', 'e'], size=3))
+        self.assertEqual(chunks, ['abcd', 'e'])
+
+    def test_endpoint_streams(self):
+        """Пользователь выгружает потоком только свои тексты"""
+        url = reverse('api:export', kwargs={'resource': 'posts'})
+        self.assertEqual(Client().get(url).status_code, 401)
+        client = Client()
+        client.force_login(self.user)
+        self.assertEqual(client.get(url).status_code, 403)
+        response = client.get(url, {'author': 'darth', 'format': 'csv'})
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'text/csv; charset=utf-8')
+        content = b''.join(response.streaming_content).decode()
+        self.assertEqual(len(list(csv.reader(io.StringIO(content)))), 4)
+        response = client.get(
+            url, {'author': 'darth', 'since': 'вчера'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_endpoint_rejects_impossible_date(self):
+        """API отвечает 400 на несуществующую дату"""
+        client = Client()
+        client.force_login(self.user)
+        response = client.get(
+            reverse('api:export', kwargs={'resource': 'posts'}),
+            {'author': 'darth', 'since': '2024-02-30'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_command_rejects_impossible_date(self):
+        """Команда сообщает о несуществующей дате без трассировки"""
+        with self.assertRaisesMessage(CommandError, '2024-02-30'):
+            self.export('posts', until='2024-02-30T10:00')
+
+    def test_staff_exports_everything(self):
+        """Персонал выгружает тексты любых авторов"""
+        staff = User.objects.create(username='admin', is_staff=True)
+        client = Client()
+        client.force_login(staff)
+        response = client.get(
+            reverse('api:export', kwargs={'resource': 'posts'}))
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(len(lines), 4)
@@ -1,11 +1,15 @@
+import hashlib
+import io
 import shutil
 import tempfile
+from unittest import mock
 
 from django.conf import settings
 from django.core.files.uploadedfile import SimpleUploadedFile
 from django.test import Client, TestCase, override_settings
 from django.urls import reverse
 from django.utils import timezone
+from PIL import Image
 
 from posts.models import Post, Group, User, Comment
 
@@ -239,12 +243,13 @@ class PostCreateFormTests(TestCase):
             response, reverse('posts:profile', kwargs={'username': 'darth'})
         )
         self.assertEqual(Post.objects.count(), posts_count + 1)
+        digest = hashlib.sha256(small_gif).hexdigest()
         self.assertTrue(
             Post.objects.filter(
                 text='Test text with image',
                 group=self.group,
                 author=self.user,
-                image='posts/small.gif'
+                image=f'posts/{digest[:2]}/{digest[2:4]}/{digest}.gif'
             ).exists()
         )
 
@@ -303,3 +308,60 @@ class PostCreateFormTests(TestCase):
                 author=self.user
             ).exists()
         )
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class PostImageUploadTests(TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        super().setUpClass()
+        cls.user = User.objects.create(username='darth')
+        cls.authorized_client = Client()
+        cls.authorized_client.force_login(cls.user)
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    @staticmethod
+    def image(size, image_format='PNG', name='image.png'):
+        buffer = io.BytesIO()
+        Image.new('RGB', size, (200, 30, 30)).save(buffer, image_format)
+        return SimpleUploadedFile(name, buffer.getvalue())
+
+    def post_image(self, image):
+        return self.authorized_client.post(
+            reverse('posts:post_create'),
+            data={'text': 'Text with image', 'image': image})
+
+    @override_settings(IMAGE_UPLOAD_MAX_PIXELS=100)
+    def test_too_many_pixels_rejected(self):
+        """Картинка с большим числом пикселей отклоняется по заголовку"""
+        response = self.post_image(self.image((20, 20)))
+        self.assertIn('20×20', response.context['form'].errors['image'][0])
+        self.assertFalse(Post.objects.exists())
+
+    @override_settings(IMAGE_UPLOAD_MAX_BYTES=50)
+    def test_too_big_file_rejected(self):
+        """Файл больше лимита отклоняется"""
+        response = self.post_image(self.image((200, 200), 'BMP', 'a.bmp'))
+        self.assertIn(
+            'Файл больше', response.context['form'].errors['image'][0])
+        self.assertFalse(Post.objects.exists())
+
+    def test_decompression_bomb_rejected(self):
+        """Бомба распаковки отклоняется до сохранения файла"""
+        with mock.patch.object(Image, 'MAX_IMAGE_PIXELS', 100):
+            response = self.post_image(self.image((20, 20)))
+        self.assertIn('бомб', response.context['form'].errors['image'][0])
+        self.assertFalse(Post.objects.exists())
+
+    @override_settings(IMAGE_UPLOAD_DOWNSCALE=10)
+    def test_huge_original_is_downscaled(self):
+        """Оригинал с длинной стороной больше лимита уменьшается"""
+        self.post_image(self.image((40, 20), 'JPEG', 'photo.jpg'))
+        post = Post.objects.get()
+        with Image.open(post.image) as image:
+            self.assertEqual(image.size, (10, 5))
+            self.assertEqual(image.format, 'JPEG')
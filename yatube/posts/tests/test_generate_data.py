@@ -0,0 +1,97 @@
+import shutil
+import tempfile
+from io import StringIO
+
+from django.conf import settings
+from django.core.management import CommandError, call_command
+from django.db.models import F
+from django.test import TestCase, override_settings
+
+from ..models import (
+    Comment, Follow, Group, Post, TimelineEntry, User, UserCounter)
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class GenerateDataTests(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def generate(self, seed=0, **options):
+        options = {
+            'users': 20, 'groups': 3, 'posts': 200, 'comments': 100,
+            'follows': 60, 'seed': seed, 'batch_size': 50, **options}
+        call_command('generate_data', stdout=StringIO(), **options)
+
+    def test_generates_requested_rows(self):
+        """Команда создает данные и пересчитывает производные таблицы"""
+        self.generate()
+        self.assertEqual(User.objects.count(), 20)
+        self.assertEqual(Post.objects.count(), 200)
+        self.assertEqual(Comment.objects.count(), 100)
+        self.assertEqual(Follow.objects.count(), 60)
+        self.assertEqual(UserCounter.objects.count(), 20)
+        self.assertTrue(TimelineEntry.objects.exists())
+        self.assertEqual(
+            sum(UserCounter.objects.values_list('posts_count', flat=True)),
+            200)
+
+    def test_generation_is_deterministic(self):
+        """Одинаковое зерно дает одинаковые данные"""
+        self.generate(seed=7)
+        first = list(Post.objects.order_by('pk').values_list(
+            'author__username', 'group__slug', 'text', 'pub_date'))
+        Group.objects.all().delete()
+        User.objects.all().delete()
+        self.generate(seed=7)
+        second = list(Post.objects.order_by('pk').values_list(
+            'author__username', 'group__slug', 'text', 'pub_date'))
+        self.assertEqual(first, second)
+
+    def test_image_share(self):
+        """Картинка есть примерно у заданной доли записей"""
+        self.generate(posts=1000, images=0.1)
+        with_image = Post.objects.exclude(image='').count()
+        self.assertGreater(with_image, 60)
+        self.assertLess(with_image, 140)
+
+    def test_comments_without_posts(self):
+        """Комментарии без записей отклоняются до вставки данных"""
+        with self.assertRaisesMessage(CommandError, '--comments'):
+            self.generate(posts=0, comments=10)
+        self.assertFalse(User.objects.exists())
+
+    def test_bad_sizes(self):
+        """Нулевые --batch-size и --days отклоняются до вставки данных"""
+        for option in ('batch_size', 'days'):
+            with self.subTest(option=option):
+                with self.assertRaisesMessage(CommandError, '--'):
+                    self.generate(**{option: 0})
+        self.assertFalse(User.objects.exists())
+
+    def test_comments_follow_their_posts(self):
+        """Комментарий не старше своей записи"""
+        self.generate()
+        self.assertFalse(Comment.objects.filter(
+            created__lt=F('post__pub_date')).exists())
+
+    def test_images_of_different_seeds_do_not_clash(self):
+        """Картинки разных зерен не затирают друг друга"""
+        self.generate(seed=1, posts=100, images=1)
+        first = set(Post.objects.values_list('image', flat=True))
+        self.generate(seed=2, posts=100, images=1)
+        second = set(Post.objects.exclude(
+            image__in=first).values_list('image', flat=True))
+        self.assertTrue(second)
+        self.assertEqual(
+            Post.objects.filter(image__in=first).count(), 100)
+
+    def test_same_seed_twice(self):
+        """Повторный запуск с тем же зерном сообщает, что данные уже есть"""
+        self.generate(seed=3)
+        with self.assertRaisesMessage(CommandError, '--seed 3'):
+            self.generate(seed=3)
+        self.assertEqual(Post.objects.count(), 200)
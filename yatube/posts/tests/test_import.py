@@ -0,0 +1,159 @@
+import csv
+import json
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from django.core.management import CommandError, call_command
+from django.test import TestCase
+
+from ..models import (
+    Comment, Group, ImageBlob, Post, ThumbnailJob, User, UserCounter)
+
+
+class ImportDataTests(TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        super().setUpClass()
+        cls.directory = tempfile.mkdtemp()
+        cls.user = User.objects.create(username='darth')
+
+    @classmethod
+    def tearDownClass(cls) -> None:
+        shutil.rmtree(cls.directory, ignore_errors=True)
+        super().tearDownClass()
+
+    def write_ndjson(self, name, rows):
+        path = os.path.join(self.directory, name)
+        with open(path, 'w', encoding='utf-8') as output:
+            for row in rows:
+                output.write(json.dumps(row, ensure_ascii=False) + '\n')
+        return path
+
+    def run_import(self, **options):
+        out = StringIO()
+        call_command('import_data', batch_size=2, stdout=out, **options)
+        return out.getvalue()
+
+    def test_posts_and_comments(self):
+        """Импорт создает авторов и группы и восстанавливает счетчики"""
+        posts = self.write_ndjson('posts.ndjson', [
+            {'id': 100 + i, 'author': 'darth' if i else 'luke',
+             'group': 'old_group' if i % 2 else None, 'text': f'Текст {i}',
+             'pub_date': f'2020-01-0{i + 1}T10:00:00+00:00', 'image': ''}
+            for i in range(3)
+        ] + [{'id': 200, 'author': 'darth', 'text': 'С картинкой',
+              'image': 'posts/old.jpg'}])
+        comments = self.write_ndjson('comments.ndjson', [
+            {'id': 10, 'post': 101, 'author': 'luke', 'text': 'Ответ',
+             'created': '2020-02-01T00:00:00Z'},
+            {'id': 11, 'post': 999, 'author': 'luke', 'text': 'Потерян'},
+        ])
+        out = self.run_import(
+            posts=posts, comments=comments, create_missing=True)
+        self.assertIn('post: 4 строк', out)
+        self.assertIn('Пропущено строк без автора, группы или записи: 1', out)
+        self.assertEqual(
+            Post.objects.get(pk=102).pub_date.isoformat(),
+            '2020-01-03T10:00:00+00:00')
+        self.assertEqual(Post.objects.get(pk=101).group.slug, 'old_group')
+        self.assertEqual(Comment.objects.get(pk=10).post_id, 101)
+        self.assertEqual(Post.objects.get(pk=101).comments_count, 1)
+        self.assertEqual(Group.objects.get().posts_count, 1)
+        self.assertEqual(
+            UserCounter.objects.get(user=self.user).posts_count, 3)
+        self.assertEqual(ImageBlob.objects.get().refcount, 1)
+        self.assertTrue(ThumbnailJob.objects.filter(post_id=200).exists())
+        self.assertEqual(Post.objects.create(
+            author=self.user, text='Новая').pk, 201)
+
+    def test_unknown_authors_skipped(self):
+        """Без --create-missing строки с неизвестными авторами пропускаются"""
+        path = os.path.join(self.directory, 'posts.csv')
+        with open(path, 'w', encoding='utf-8', newline='') as output:
+            writer = csv.writer(output)
+            writer.writerow(['author', 'group', 'text'])
+            writer.writerow(['darth', '', 'Текст, с запятой'])
+            writer.writerow(['nobody', '', 'Текст'])
+        out = self.run_import(posts=path)
+        self.assertIn('Пропущено строк без автора, группы или записи: 1', out)
+        self.assertEqual(
+            list(Post.objects.values_list('text', flat=True)),
+            ['Текст, с запятой'])
+
+    def test_export_round_trip(self):
+        """Выгрузка загружается обратно без потерь"""
+        Post.objects.create(author=self.user, text='Исходная')
+        path = os.path.join(self.directory, 'export.ndjson')
+        call_command('export', 'posts', output=path, stderr=StringIO())
+        exported = list(Post.objects.values_list('text', 'pub_date'))
+        Post.objects.all().delete()
+        self.run_import(posts=path)
+        self.assertEqual(
+            list(Post.objects.values_list('text', 'pub_date')), exported)
+
+    def test_import_into_populated_database(self):
+        """Занятые id получают новые, комментарии идут за своими записями"""
+        taken = Post.objects.create(author=self.user, text='Старая')
+        Comment.objects.create(post=taken, author=self.user, text='Старый')
+        old_comment = Comment.objects.get()
+        posts = self.write_ndjson('taken.ndjson', [
+            {'id': taken.pk, 'author': 'darth', 'text': 'Занятый id'},
+            {'id': taken.pk + 1, 'author': 'darth', 'text': 'Свободный id'},
+            {'id': taken.pk + 1, 'author': 'darth', 'text': 'Повтор id'},
+        ])
+        comments = self.write_ndjson('taken_comments.ndjson', [
+            {'id': old_comment.pk, 'post': taken.pk, 'author': 'darth',
+             'text': 'К занятой'},
+        ])
+        out = self.run_import(posts=posts, comments=comments)
+        self.assertIn('Строк с занятым id, получивших новый: 3', out)
+        self.assertEqual(Post.objects.get(pk=taken.pk).text, 'Старая')
+        self.assertEqual(
+            Post.objects.get(pk=taken.pk + 1).text, 'Свободный id')
+        moved = Post.objects.get(text='Занятый id')
+        self.assertNotIn(moved.pk, (taken.pk, taken.pk + 1))
+        self.assertEqual(Post.objects.count(), 4)
+        comment = Comment.objects.get(text='К занятой')
+        self.assertEqual(comment.post, moved)
+        self.assertEqual(Comment.objects.get(pk=old_comment.pk).text, 'Старый')
+
+    def test_comment_to_skipped_post_is_not_misattached(self):
+        """Комментарий к пропущенной записи не попадает к чужой записи"""
+        unrelated = Post.objects.create(author=self.user, text='Чужая')
+        posts = self.write_ndjson('skipped.ndjson', [
+            {'id': unrelated.pk, 'author': 'nobody', 'text': 'Пропущена'},
+        ])
+        comments = self.write_ndjson('skipped_comments.ndjson', [
+            {'post': unrelated.pk, 'author': 'darth', 'text': 'Не сюда'},
+        ])
+        out = self.run_import(posts=posts, comments=comments)
+        self.assertIn('Пропущено строк без автора, группы или записи: 2', out)
+        self.assertFalse(Comment.objects.exists())
+
+    def test_impossible_date_is_reported(self):
+        """Несуществующая дата — ошибка с номером строки, а не трассировка"""
+        path = self.write_ndjson('bad_date.ndjson', [
+            {'author': 'darth', 'text': 'Верная'},
+            {'author': 'ghost', 'text': 'Неверная',
+             'pub_date': '2024-02-30T10:00:00'},
+        ])
+        with self.assertRaisesMessage(
+                CommandError, 'Строка 2: Неверная дата pub_date'):
+            self.run_import(posts=path, create_missing=True)
+        self.assertFalse(User.objects.filter(username='ghost').exists())
+
+    def test_failed_import_repairs_written_batches(self):
+        """После ошибки в середине файла вставленные порции согласованы"""
+        path = self.write_ndjson('bad_tail.ndjson', [
+            {'author': 'darth', 'text': 'Первая'},
+            {'author': 'darth', 'text': 'Вторая'},
+            {'author': 'darth', 'text': 'Неверная',
+             'pub_date': '2024-02-30T10:00:00'},
+        ])
+        with self.assertRaises(CommandError):
+            self.run_import(posts=path)
+        self.assertEqual(Post.objects.count(), 2)
+        self.assertEqual(
+            UserCounter.objects.get(user=self.user).posts_count, 2)
@@ -82,3 +82,34 @@ class PaginatorTests(TestCase):
             len(response.context['page_obj']),
             TEST_POSTS_AMOUNT - TEST_POST_ON_ONE_PAGE
         )
+
+    def test_next_cursor_returns_remaining_records(self):
+        """Курсор следующей страницы отдает оставшиеся посты"""
+        response = self.guest_client.get(reverse('posts:index'))
+        next_cursor = response.context['page_obj'].next_cursor
+        response = self.guest_client.get(
+            reverse('posts:index'), {'cursor': next_cursor})
+        page_obj = response.context['page_obj']
+        self.assertEqual(
+            len(page_obj), TEST_POSTS_AMOUNT - TEST_POST_ON_ONE_PAGE)
+        self.assertEqual(page_obj.number, 2)
+        self.assertFalse(page_obj.has_next())
+
+    def test_previous_cursor_returns_first_page(self):
+        """Курсор предыдущей страницы возвращает первую страницу"""
+        response = self.guest_client.get(reverse('posts:index'), {'page': 2})
+        previous_cursor = response.context['page_obj'].previous_cursor
+        response = self.guest_client.get(
+            reverse('posts:index'), {'cursor': previous_cursor})
+        first_page = self.guest_client.get(reverse('posts:index'))
+        self.assertEqual(
+            list(response.context['page_obj']),
+            list(first_page.context['page_obj']))
+
+    def test_broken_cursor_falls_back_to_first_page(self):
+        """Испорченный курсор открывает первую страницу"""
+        response = self.guest_client.get(
+            reverse('posts:index'), {'cursor': 'broken'})
+        self.assertEqual(response.context['page_obj'].number, 1)
+        self.assertEqual(
+            len(response.context['page_obj']), TEST_POST_ON_ONE_PAGE)
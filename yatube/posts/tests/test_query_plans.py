@@ -0,0 +1,65 @@
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..models import Comment, Follow, Group, Post, User
+
+TEST_POSTS_AMOUNT = 15
+
+
+class QueryPlanTests(TestCase):
+    """Запросы страниц читают записи по индексу, без сортировки."""
+
+    @classmethod
+    def setUpClass(cls) -> None:
+        super().setUpClass()
+        cls.user = User.objects.create(username='darth')
+        cls.author = User.objects.create(username='luke')
+        cls.group = Group.objects.create(title='Test group', slug='test_slug')
+        Follow.objects.create(user=cls.user, author=cls.author)
+        for i in range(TEST_POSTS_AMOUNT):
+            Post.objects.create(
+                author=cls.author, text=f'Test text {i}', group=cls.group)
+        cls.post = Post.objects.first()
+        Comment.objects.create(
+            post=cls.post, author=cls.user, text='Test comment')
+
+    def setUp(self) -> None:
+        self.client = Client()
+        self.client.force_login(self.user)
+
+    def assert_plans_use_indexes(self, url, params=None):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200)
+        with connection.cursor() as cursor:
+            for query in context.captured_queries:
+                if not query['sql'].startswith('SELECT'):
+                    continue
+                cursor.execute(f'EXPLAIN QUERY PLAN {query["sql"]}')
+                plan = '\n'.join(row[-1] for row in cursor.fetchall())
+                with self.subTest(url=url, sql=query['sql']):
+                    self.assertNotIn('TEMP B-TREE', plan)
+                    for line in plan.splitlines():
+                        if line.startswith('SCAN posts_'):
+                            self.assertIn('USING', line)
+        return response
+
+    def test_feed_pages_use_indexes(self):
+        """Ленты читаются по составным индексам"""
+        urls = (
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': self.group.slug}),
+            reverse('posts:profile', kwargs={'username': self.author}),
+            reverse('posts:follow_index'),
+        )
+        for url in urls:
+            response = self.assert_plans_use_indexes(url)
+            self.assert_plans_use_indexes(
+                url, {'cursor': response.context['page_obj'].next_cursor})
+
+    def test_post_detail_uses_indexes(self):
+        """Страница поста и комментарии читаются по индексам"""
+        self.assert_plans_use_indexes(
+            reverse('posts:post_detail', kwargs={'post_id': self.post.id}))
@@ -0,0 +1,114 @@
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from .. import search
+from ..models import Comment, Post, User
+
+
+class SearchTests(TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        super().setUpClass()
+        cls.user = User.objects.create(username='darth')
+        cls.best = Post.objects.create(
+            author=cls.user, text='Звезда смерти')
+        cls.weak = Post.objects.create(
+            author=cls.user,
+            text='Длинный рассказ о флоте, где однажды мелькает звезда '
+                 'среди множества других слов про корабли и пилотов')
+        cls.commented = Post.objects.create(
+            author=cls.user, text='Запись без ключевого слова')
+        cls.comment = Comment.objects.create(
+            post=cls.commented, author=cls.user, text='Тут звезда')
+        cls.other = Post.objects.create(author=cls.user, text='Другое')
+
+    def found(self, query, **kwargs):
+        return [post.pk for post in search.search_page(query, **kwargs)]
+
+    def test_ranked_results_include_comments(self):
+        """Лучшее совпадение первым, комментарий находит свою запись"""
+        found = self.found('звезда')
+        self.assertEqual(found[0], self.best.pk)
+        self.assertEqual(
+            set(found), {self.best.pk, self.weak.pk, self.commented.pk})
+
+    def test_case_and_prefix(self):
+        """Регистр не важен, последнее слово ищется по префиксу"""
+        self.assertEqual(self.found('ЗВЕЗДА СМЕР'), [self.best.pk])
+
+    def test_index_follows_changes(self):
+        """Триггеры обновляют индекс при правке и удалении"""
+        self.best.text = 'Новая надежда'
+        self.best.save()
+        self.assertNotIn(self.best.pk, self.found('смерти'))
+        self.assertEqual(self.found('надежда'), [self.best.pk])
+        self.comment.delete()
+        self.assertNotIn(self.commented.pk, self.found('звезда'))
+
+    def test_keyset_pages(self):
+        """Курсор проходит все результаты без повторов"""
+        first = search.search_page('звезда', per_page=2)
+        self.assertTrue(first.has_next())
+        second = search.search_page(
+            'звезда', cursor=first.next_cursor, per_page=2)
+        self.assertFalse(second.has_next())
+        self.assertEqual(second.number, 2)
+        found = [post.pk for post in list(first) + list(second)]
+        self.assertEqual(found, self.found('звезда'))
+
+    @override_settings(SEARCH_MAX_CANDIDATES=1)
+    def test_candidates_window(self):
+        """Ранжируются только новейшие совпадения каждого вида"""
+        self.assertEqual(
+            set(self.found('звезда')), {self.weak.pk, self.commented.pk})
+
+    @override_settings(SEARCH_MAX_CANDIDATES=2)
+    def test_comments_do_not_crowd_out_posts(self):
+        """Частые новые комментарии не вытесняют записи из окна"""
+        for _ in range(3):
+            Comment.objects.create(
+                post=self.other, author=self.user, text='Звезда')
+        self.assertEqual(
+            set(self.found('звезда')),
+            {self.best.pk, self.weak.pk, self.other.pk})
+
+    def test_tied_scores_are_paged_without_repeats(self):
+        """Записи с одинаковым score листаются без повторов и пропусков"""
+        twins = [Post.objects.create(author=self.user, text='Близнецы')
+                 for _ in range(3)]
+        found, cursor = [], None
+        while True:
+            page = search.search_page('близнецы', cursor=cursor, per_page=1)
+            found += [post.pk for post in page]
+            if not page.has_next():
+                break
+            cursor = page.next_cursor
+        self.assertEqual(sorted(found), [post.pk for post in twins])
+
+    def test_operators_are_escaped(self):
+        """Операторы FTS5 во вводе не ломают запрос"""
+        self.assertEqual(self.found('AND "OR ( NEAR'), [])
+        self.assertEqual(self.found('***'), [])
+
+    def test_filter_for_admin(self):
+        """Фильтр бэкенда работает для записей и комментариев"""
+        backend = search.get_backend()
+        self.assertEqual(
+            set(backend.filter(Post.objects.all(), 'звезда')),
+            {self.best, self.weak})
+        self.assertEqual(
+            list(backend.filter(Comment.objects.all(), 'звезда')),
+            [self.comment])
+
+    @override_settings(SEARCH_BACKEND='posts.search.LikeBackend')
+    def test_like_backend(self):
+        """Запасной бэкенд ищет через LIKE (в SQLite с учетом регистра)"""
+        self.assertEqual(
+            set(self.found('звезда')), {self.weak.pk, self.commented.pk})
+
+    def test_search_view(self):
+        """Страница поиска выводит найденные записи"""
+        response = Client().get(reverse('posts:search'), {'q': 'смерти'})
+        self.assertEqual(
+            list(response.context['page_obj']), [self.best])
+        self.assertContains(response, 'Звезда смерти')
@@ -0,0 +1,193 @@
+import shutil
+import tempfile
+from unittest import mock
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db.models.query import QuerySet
+from django.test import (
+    Client, TestCase, TransactionTestCase, override_settings)
+from django.urls import reverse
+from PIL import Image
+
+from core import metrics, taskqueue
+
+from .. import blobs, thumbnails
+from ..models import ImageBlob, Post, ThumbnailJob, User
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ThumbnailsTests(TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        super().setUpClass()
+        cls.user = User.objects.create(username='darth')
+
+    @classmethod
+    def tearDownClass(cls) -> None:
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+
+    def create_post(self, name='small.gif'):
+        return Post.objects.create(
+            author=self.user,
+            text='Test text',
+            image=SimpleUploadedFile(name, SMALL_GIF, 'image/gif'))
+
+    def test_saving_image_enqueues_job(self):
+        """Запись с картинкой ставит задание, а страница выводит заглушку"""
+        post = self.create_post()
+        job = ThumbnailJob.objects.get(post=post)
+        self.assertEqual(job.source, post.image.name)
+        self.assertFalse(post.thumbnails_ready)
+        response = Client().get(reverse('posts:index'))
+        self.assertNotContains(response, '<img class="card-img')
+        self.assertContains(response, 'padding-top: 52.08%')
+
+    def test_process_renders_all_sizes(self):
+        """Обработка очереди нарезает миниатюры и выводит их на страницах"""
+        post = self.create_post()
+        count = ('yatube_thumbnail_render_duration_seconds_count', ())
+        rendered = metrics.registry.snapshot().get(count, 0)
+        self.assertEqual(thumbnails.process(workers=0), 1)
+        self.assertEqual(metrics.registry.snapshot()[count], rendered + 1)
+        post.refresh_from_db()
+        self.assertTrue(post.thumbnails_ready)
+        self.assertFalse(ThumbnailJob.objects.exists())
+        for name, config in settings.POST_THUMBNAILS.items():
+            for width in config['widths']:
+                for fmt in thumbnails.formats():
+                    target = thumbnails.path(post.image.name, name, width, fmt)
+                    with default_storage.open(target) as file:
+                        image = Image.open(file)
+                        self.assertEqual(image.format, fmt)
+                        self.assertEqual(image.width, width)
+        response = Client().get(reverse('posts:index'))
+        picture = thumbnails.picture(post.image.name, 'card')
+        self.assertContains(response, picture['srcset'])
+        self.assertContains(response, 'loading="lazy"')
+
+    def test_task_worker_renders_job(self):
+        """Воркер фоновых задач нарезает миниатюры новой картинки"""
+        post = self.create_post()
+        self.assertEqual(taskqueue.process(), (1, 0))
+        post.refresh_from_db()
+        self.assertTrue(post.thumbnails_ready)
+        self.assertFalse(ThumbnailJob.objects.exists())
+
+    def test_unsupported_formats_are_skipped(self):
+        """Форматы, которые не умеет сохранять Pillow, не выводятся"""
+        with override_settings(
+                POST_THUMBNAIL_FORMATS=('NOPE', 'JPEG')):
+            self.assertEqual(thumbnails.formats(), ['JPEG'])
+            picture = thumbnails.picture('posts/small.gif', 'card')
+        self.assertEqual(picture['sources'], [])
+        self.assertIn('card-960.jpg 960w', picture['srcset'])
+
+    def test_edit_without_new_image_keeps_thumbnails(self):
+        """Правка текста не сбрасывает готовые миниатюры"""
+        post = self.create_post()
+        thumbnails.process(workers=0)
+        post.refresh_from_db()
+        post.text = 'Edited text'
+        post.save()
+        post.refresh_from_db()
+        self.assertTrue(post.thumbnails_ready)
+        self.assertFalse(ThumbnailJob.objects.exists())
+
+    def test_replaced_image_is_not_marked_ready(self):
+        """Задание для замененной картинки не отмечает новую готовой"""
+        post = self.create_post()
+        job = thumbnails.claim(1)[0]
+        post.image = SimpleUploadedFile(
+            'other.gif', SMALL_GIF + b'\x00', 'image/gif')
+        post.save()
+        self.assertFalse(thumbnails.complete(job))
+        post.refresh_from_db()
+        self.assertFalse(post.thumbnails_ready)
+        self.assertEqual(
+            ThumbnailJob.objects.get(post=post).source, post.image.name)
+
+    def test_failed_job_is_retried(self):
+        """Упавшее задание возвращается в очередь с текстом ошибки"""
+        post = Post.objects.create(
+            author=self.user, text='Test text', image='posts/missing.gif')
+        self.assertEqual(thumbnails.process(workers=0), 0)
+        job = ThumbnailJob.objects.get(post=post)
+        self.assertIsNone(job.started)
+        self.assertEqual(job.attempts, 1)
+        self.assertTrue(job.error)
+
+    def test_duplicate_image_reuses_thumbnails(self):
+        """Повторная загрузка той же картинки берет готовые миниатюры"""
+        first = self.create_post()
+        thumbnails.process(workers=0)
+        second = self.create_post('copy.gif')
+        self.assertEqual(second.image.name, first.image.name)
+        self.assertTrue(second.thumbnails_ready)
+        self.assertFalse(ThumbnailJob.objects.exists())
+        self.assertEqual(ImageBlob.objects.get().refcount, 2)
+
+    def test_concurrent_first_upload(self):
+        """Одновременная первая загрузка того же файла не дает ошибку"""
+        # Строку уже вставил другой запрос, но первый UPDATE её не видел.
+        ImageBlob.objects.create(name='posts/race.gif', refcount=1)
+        update = QuerySet.update
+        missed = []
+
+        def update_after_competitor(queryset, **kwargs):
+            if not missed:
+                missed.append(queryset)
+                return 0
+            return update(queryset, **kwargs)
+
+        with mock.patch.object(
+                QuerySet, 'update', autospec=True,
+                side_effect=update_after_competitor):
+            self.assertFalse(blobs.acquire('posts/race.gif'))
+        self.assertEqual(ImageBlob.objects.get().refcount, 2)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ImageBlobDeletionTests(TransactionTestCase):
+    @classmethod
+    def tearDownClass(cls) -> None:
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.user = User.objects.create(username='darth')
+
+    def create_post(self):
+        return Post.objects.create(
+            author=self.user,
+            text='Test text',
+            image=SimpleUploadedFile('small.gif', SMALL_GIF, 'image/gif'))
+
+    def test_file_is_deleted_with_last_reference(self):
+        """Файл удаляется только вместе с последней ссылкой на него"""
+        first, second = self.create_post(), self.create_post()
+        thumbnails.process(workers=0)
+        name = first.image.name
+        first.delete()
+        self.assertTrue(default_storage.exists(name))
+        second.delete()
+        self.assertFalse(default_storage.exists(name))
+        self.assertFalse(default_storage.exists(
+            thumbnails.path(name, 'card', 960, 'JPEG')))
+        self.assertFalse(ImageBlob.objects.exists())
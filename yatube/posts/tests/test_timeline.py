@@ -0,0 +1,142 @@
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from core import taskqueue
+
+from .. import timeline
+from ..models import Follow, Post, TimelineEntry, User
+
+
+class TimelineTests(TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        super().setUpClass()
+        cls.reader = User.objects.create(username='reader')
+        cls.author = User.objects.create(username='author')
+
+    def setUp(self) -> None:
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.reader)
+
+    def test_new_post_is_fanned_out_to_followers(self):
+        """Новая запись попадает в ленту подписчика"""
+        Follow.objects.create(user=self.reader, author=self.author)
+        post = Post.objects.create(author=self.author, text='Fan out')
+        self.assertTrue(
+            TimelineEntry.objects.filter(user=self.reader, post=post).exists())
+        response = self.client.get(reverse('posts:follow_index'))
+        self.assertIn(post, response.context['page_obj'])
+
+    @override_settings(TIMELINE_INLINE_FANOUT=0)
+    def test_large_fan_out_is_queued(self):
+        """Раскладка для многих подписчиков уходит в фоновую задачу"""
+        Follow.objects.create(user=self.reader, author=self.author)
+        post = Post.objects.create(author=self.author, text='Queued')
+        self.assertFalse(TimelineEntry.objects.filter(post=post).exists())
+        self.assertEqual(taskqueue.process(), (1, 0))
+        self.assertTrue(
+            TimelineEntry.objects.filter(user=self.reader, post=post).exists())
+
+    def test_follow_backfills_and_unfollow_clears(self):
+        """Подписка заполняет ленту, отписка её очищает"""
+        post = Post.objects.create(author=self.author, text='Earlier post')
+        Follow.objects.create(user=self.reader, author=self.author)
+        self.assertIn(post, timeline.feed(self.reader))
+        Follow.objects.filter(user=self.reader, author=self.author).delete()
+        self.assertFalse(
+            TimelineEntry.objects.filter(user=self.reader).exists())
+
+    @override_settings(TIMELINE_DEPTH=3, TIMELINE_TRIM_SLACK=0)
+    def test_timeline_is_trimmed_to_depth(self):
+        """Лента обрезается до TIMELINE_DEPTH записей"""
+        Follow.objects.create(user=self.reader, author=self.author)
+        for i in range(5):
+            Post.objects.create(author=self.author, text=f'Post {i}')
+        self.assertEqual(
+            TimelineEntry.objects.filter(user=self.reader).count(), 3)
+
+    @override_settings(TIMELINE_CELEBRITY_FOLLOWERS=1)
+    def test_celebrity_posts_are_merged_at_read_time(self):
+        """Записи знаменитостей не раскладываются, а читаются напрямую"""
+        Follow.objects.create(user=self.reader, author=self.author)
+        post = Post.objects.create(author=self.author, text='Celebrity post')
+        self.assertFalse(TimelineEntry.objects.filter(post=post).exists())
+        self.assertIn(post, timeline.feed(self.reader))
+
+    @override_settings(TIMELINE_CELEBRITY_FOLLOWERS=2)
+    def test_demoted_celebrity_posts_stay_in_feed(self):
+        """Записи бывшей знаменитости остаются в ленте и раскладываются"""
+        other = User.objects.create(username='other')
+        Follow.objects.create(user=self.reader, author=self.author)
+        Follow.objects.create(user=other, author=self.author)
+        post = Post.objects.create(author=self.author, text='Celebrity post')
+        self.assertFalse(TimelineEntry.objects.filter(post=post).exists())
+        Follow.objects.filter(user=other).delete()
+        self.assertNotIn(self.author.pk, timeline.celebrity_ids())
+        self.assertIn(post, timeline.feed(self.reader))
+        self.assertTrue(
+            TimelineEntry.objects.filter(user=self.reader, post=post).exists())
+        self.assertEqual(timeline.demoted_ids(), set())
+
+    @override_settings(TIMELINE_CELEBRITY_FOLLOWERS=2)
+    def test_demotion_survives_expired_celebrity_cache(self):
+        """Понижение не зависит от истекшего кеша знаменитостей"""
+        other = User.objects.create(username='other')
+        Follow.objects.create(user=self.reader, author=self.author)
+        Follow.objects.create(user=other, author=self.author)
+        post = Post.objects.create(author=self.author, text='Celebrity post')
+        self.assertFalse(TimelineEntry.objects.filter(post=post).exists())
+        cache.clear()
+        Follow.objects.filter(user=other).delete()
+        self.assertIn(post, timeline.feed(self.reader))
+        self.assertTrue(
+            TimelineEntry.objects.filter(user=self.reader, post=post).exists())
+
+    @override_settings(TIMELINE_CELEBRITY_FOLLOWERS=2)
+    def test_demotion_after_several_follows_deleted_at_once(self):
+        """Понижение срабатывает, когда разом удалено несколько подписок"""
+        for name in ('other', 'third'):
+            Follow.objects.create(
+                user=User.objects.create(username=name), author=self.author)
+        Follow.objects.create(user=self.reader, author=self.author)
+        post = Post.objects.create(author=self.author, text='Celebrity post')
+        self.assertFalse(TimelineEntry.objects.filter(post=post).exists())
+        cache.clear()
+        Follow.objects.exclude(user=self.reader).delete()
+        self.assertEqual(timeline.celebrity_ids(), set())
+        self.assertTrue(
+            TimelineEntry.objects.filter(user=self.reader, post=post).exists())
+
+    @override_settings(
+        TIMELINE_CELEBRITY_FOLLOWERS=2, TIMELINE_INLINE_FANOUT=0)
+    def test_demotion_is_merged_until_queued_backfill(self):
+        """Пока раскладка в очереди, записи подмешиваются при чтении"""
+        other = User.objects.create(username='other')
+        Follow.objects.create(user=self.reader, author=self.author)
+        Follow.objects.create(user=other, author=self.author)
+        post = Post.objects.create(author=self.author, text='Celebrity post')
+        Follow.objects.filter(user=other).delete()
+        self.assertFalse(TimelineEntry.objects.filter(post=post).exists())
+        # Кеш другого воркера ничего не знает о понижении.
+        cache.clear()
+        self.assertIn(post, timeline.feed(self.reader))
+        self.assertEqual(timeline.demoted_ids(), {self.author.pk})
+        self.assertEqual(taskqueue.process(), (1, 0))
+        self.assertTrue(
+            TimelineEntry.objects.filter(user=self.reader, post=post).exists())
+        self.assertIn(post, timeline.feed(self.reader))
+        self.assertEqual(timeline.demoted_ids(), set())
+
+    def test_build_timelines_command(self):
+        """Команда build_timelines восстанавливает ленты"""
+        Follow.objects.create(user=self.reader, author=self.author)
+        post = Post.objects.create(author=self.author, text='Rebuilt')
+        TimelineEntry.objects.all().delete()
+        call_command('build_timelines', stdout=StringIO())
+        self.assertTrue(
+            TimelineEntry.objects.filter(user=self.reader, post=post).exists())
@@ -6,6 +6,8 @@ from django.urls import reverse
 from django import forms
 from django.conf import settings
 from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 
 from posts.models import Comment, Follow, Group, Post, User
 
@@ -262,3 +264,47 @@ class PostPagesTests(TestCase):
         response = self.authorized_client.get(reverse('posts:follow_index'))
         self.assertEqual(response.context['page_obj'][0], post)
         self.assertNotIn(self.post, response.context['page_obj'])
+
+
+class PostDetailQueriesTests(TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        super().setUpClass()
+        cls.user = User.objects.create(username='darth')
+        cls.group = Group.objects.create(title='Test group', slug='test_slug')
+        cls.post = Post.objects.create(
+            author=cls.user, text='Test text', group=cls.group)
+
+    def add_comments(self, amount):
+        authors = [
+            User.objects.create(
+                username=f'commentator_{User.objects.count()}')
+            for _ in range(amount)
+        ]
+        Comment.objects.bulk_create(
+            Comment(post=self.post, author=author, text='Test comment')
+            for author in authors)
+
+    def test_post_detail_query_count_does_not_grow(self):
+        """Число запросов post_detail не зависит от числа комментариев"""
+        url = reverse('posts:post_detail', kwargs={'post_id': self.post.id})
+        self.add_comments(1)
+        with CaptureQueriesContext(connection) as few:
+            self.client.get(url)
+        self.add_comments(settings.COMMENTS_ON_PAGE * 2)
+        with CaptureQueriesContext(connection) as many:
+            self.client.get(url)
+        self.assertEqual(len(few), len(many))
+
+    def test_comments_are_paginated_by_cursor(self):
+        """Комментарии отдаются порциями через курсор"""
+        self.add_comments(settings.COMMENTS_ON_PAGE + 1)
+        response = self.client.get(
+            reverse('posts:post_detail', kwargs={'post_id': self.post.id}))
+        comments = response.context['comments']
+        self.assertEqual(len(comments), settings.COMMENTS_ON_PAGE)
+        response = self.client.get(
+            reverse('posts:post_comments', kwargs={'post_id': self.post.id}),
+            {'cursor': comments.next_cursor})
+        self.assertTemplateUsed(response, 'posts/includes/comments.html')
+        self.assertEqual(len(response.context['comments']), 1)
@@ -0,0 +1,283 @@
+"""Предварительная нарезка миниатюр картинок записей.
+
+Сохранение записи с новой картинкой ставит задание в очередь
+(``ThumbnailJob``) в той же транзакции. Команда ``thumbnails`` забирает
+задания и в пуле процессов нарезает для каждого размера из
+``settings.POST_THUMBNAILS`` несколько ширин во всех форматах из
+``settings.POST_THUMBNAIL_FORMATS``. Шаблоны выводят ``<picture>`` с
+``srcset``, а пока миниатюры не готовы — заглушку, поэтому страница
+никогда не ждет обработки картинки.
+"""
+import hashlib
+import io
+import logging
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import timedelta
+
+import django
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connections, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+from PIL import Image, ImageOps
+
+from core import metrics, taskqueue
+
+from . import caching
+from .models import ImageBlob, Post, ThumbnailJob
+
+try:
+    # Регистрирует в Pillow кодек AVIF, если модуль установлен.
+    import pillow_avif  # noqa: F401
+except ImportError:
+    pass
+
+logger = logging.getLogger(__name__)
+
+EXTENSIONS = {'AVIF': 'avif', 'WEBP': 'webp', 'JPEG': 'jpg'}
+MIME_TYPES = {'AVIF': 'image/avif', 'WEBP': 'image/webp', 'JPEG': 'image/jpeg'}
+
+
+def variant(name):
+    """Возвращает описание размера миниатюры из настроек."""
+    return settings.POST_THUMBNAILS[name]
+
+
+def ratio(name):
+    """Отношение высоты миниатюры к ширине в процентах для заглушки."""
+    width, height = variant(name)['size']
+    return round(height / width * 100, 2)
+
+
+def formats():
+    """Форматы из настроек, которые умеет сохранять Pillow.
+
+    JPEG нужен как запасной вариант для ``<img>``, поэтому он есть всегда.
+    """
+    Image.init()
+    available = [
+        fmt for fmt in settings.POST_THUMBNAIL_FORMATS
+        if fmt != 'JPEG' and fmt in Image.SAVE]
+    return available + ['JPEG']
+
+
+def directory(source):
+    """Каталог миниатюр картинки в хранилище."""
+    digest = hashlib.sha1(str(source).encode()).hexdigest()
+    return f'thumbnails/{digest[:2]}/{digest[2:16]}'
+
+
+def path(source, name, width, fmt):
+    """Путь миниатюры в хранилище, вычисляемый без обращений к нему."""
+    return f'{directory(source)}/{name}-{width}.{EXTENSIONS[fmt]}'
+
+
+def delete(source):
+    """Удаляет все миниатюры картинки."""
+    folder = directory(source)
+    if not default_storage.exists(folder):
+        return
+    for filename in default_storage.listdir(folder)[1]:
+        default_storage.delete(f'{folder}/{filename}')
+
+
+def _height(name, width):
+    size_width, size_height = variant(name)['size']
+    return round(width * size_height / size_width)
+
+
+def picture(source, name):
+    """Данные для ``<picture>``: источники по форматам и запасной ``<img>``."""
+    config = variant(name)
+    widths = sorted(config['widths'])
+    srcsets = {
+        fmt: ', '.join(
+            f'{default_storage.url(path(source, name, width, fmt))} {width}w'
+            for width in widths)
+        for fmt in formats()}
+    fallback = srcsets.pop('JPEG')
+    width, height = config['size']
+    return {
+        'sources': [
+            {'type': MIME_TYPES[fmt], 'srcset': srcset}
+            for fmt, srcset in srcsets.items()],
+        'src': default_storage.url(path(source, name, widths[-1], 'JPEG')),
+        'srcset': fallback,
+        'sizes': config['sizes'],
+        'width': width,
+        'height': height,
+    }
+
+
+def _save(image, target, fmt):
+    buffer = io.BytesIO()
+    options = {'quality': settings.POST_THUMBNAIL_QUALITY.get(fmt, 80)}
+    if fmt == 'JPEG':
+        options.update(optimize=True, progressive=True)
+    image.save(buffer, fmt, **options)
+    # Имя должно совпасть с вычисленным, иначе хранилище добавит суффикс.
+    if default_storage.exists(target):
+        default_storage.delete(target)
+    default_storage.save(target, ContentFile(buffer.getvalue()))
+
+
+def render(source):
+    """Нарезает все размеры, ширины и форматы миниатюр картинки.
+
+    Картинка декодируется один раз; для JPEG Pillow сразу уменьшает ее при
+    декодировании до ближайшего масштаба не меньше самого большого размера.
+    """
+    if not default_storage.exists(source):
+        raise FileNotFoundError(source)
+    largest = max(
+        (config['size'] for config in settings.POST_THUMBNAILS.values()),
+        key=lambda size: size[0] * size[1])
+    with default_storage.open(source) as file:
+        image = Image.open(file)
+        image.draft('RGB', largest)
+        image = ImageOps.exif_transpose(image).convert('RGB')
+    for name, config in settings.POST_THUMBNAILS.items():
+        crop = ImageOps.fit(image, config['size'], Image.LANCZOS)
+        for width in sorted(config['widths'], reverse=True):
+            if width != config['size'][0]:
+                crop = crop.resize(
+                    (width, _height(name, width)), Image.LANCZOS)
+            for fmt in formats():
+                _save(crop, path(source, name, width, fmt), fmt)
+    return source
+
+
+def enqueue(post, created=False):
+    """Ставит нарезку миниатюр записи в очередь.
+
+    Задание подхватит воркер фоновых задач, а команда ``thumbnails``
+    доделает те, что остались в очереди.
+    """
+    if created:
+        ThumbnailJob.objects.create(post=post, source=post.image.name)
+    else:
+        ThumbnailJob.objects.update_or_create(
+            post=post,
+            defaults={'source': post.image.name, 'started': None,
+                      'attempts': 0, 'error': ''})
+    taskqueue.enqueue('posts.tasks.render_thumbnails', [post.pk])
+
+
+def claim(limit, post_id=None):
+    """Забирает свободные задания, в том числе брошенные упавшим воркером."""
+    now = timezone.now()
+    stale = now - timedelta(seconds=settings.THUMBNAIL_JOB_TIMEOUT)
+    jobs = []
+    candidates = ThumbnailJob.objects.filter(
+        Q(started__isnull=True) | Q(started__lt=stale),
+        attempts__lt=settings.THUMBNAIL_MAX_ATTEMPTS)
+    if post_id is not None:
+        candidates = candidates.filter(post_id=post_id)
+    for job in candidates[:limit]:
+        taken = ThumbnailJob.objects.filter(
+            pk=job.pk, started=job.started).update(
+                started=now, attempts=F('attempts') + 1)
+        if taken:
+            jobs.append(job)
+    return jobs
+
+
+def complete(job):
+    """Отмечает миниатюры готовыми, если картинка не сменилась."""
+    with transaction.atomic():
+        deleted, _ = ThumbnailJob.objects.filter(
+            pk=job.pk, source=job.source).delete()
+        if not deleted:
+            return False
+        Post.objects.filter(
+            pk=job.post_id, image=job.source).update(thumbnails_ready=True)
+        ImageBlob.objects.filter(name=job.source).update(
+            thumbnails_ready=True)
+    post = Post.objects.filter(pk=job.post_id).first()
+    if post is not None:
+        caching.bump(*caching.page_scopes(post))
+    return True
+
+
+def fail(job, error):
+    """Возвращает задание в очередь до исчерпания попыток."""
+    logger.warning('Не удалось нарезать миниатюры %s: %s', job.source, error)
+    ThumbnailJob.objects.filter(pk=job.pk, source=job.source).update(
+        started=None, error=str(error))
+
+
+def _init_worker():
+    django.setup()
+
+
+def _timed_render(source):
+    """Нарезает миниатюры и возвращает затраченное время в секундах."""
+    start = time.perf_counter()
+    render(source)
+    return time.perf_counter() - start
+
+
+def _render_in_pool(sources, workers):
+    results = {}
+    # Дочерние процессы открывают собственные соединения с базой.
+    connections.close_all()
+    with ProcessPoolExecutor(workers, initializer=_init_worker) as pool:
+        futures = {
+            source: pool.submit(_timed_render, source) for source in sources}
+        for source, future in futures.items():
+            results[source] = future.exception() or future.result()
+    return results
+
+
+def _render_all(sources, workers):
+    """Нарезает миниатюры и возвращает время или ошибку по картинке.
+
+    Время нарезки записывается в метрики текущего процесса.
+    """
+    if workers:
+        results = _render_in_pool(sources, workers)
+    else:
+        results = {}
+        for source in sources:
+            try:
+                results[source] = _timed_render(source)
+            except Exception as error:
+                results[source] = error
+    for result in results.values():
+        if not isinstance(result, Exception):
+            metrics.THUMBNAIL_DURATION.observe(result)
+    metrics.registry.flush()
+    return results
+
+
+def process(workers=None, limit=100):
+    """Обрабатывает одну порцию заданий и возвращает число готовых.
+
+    При ``workers=0`` миниатюры нарезаются в текущем процессе.
+    """
+    if workers is None:
+        workers = settings.THUMBNAIL_WORKERS
+    return process_jobs(claim(limit), workers)
+
+
+def process_jobs(jobs, workers=0):
+    """Нарезает миниатюры по забранным заданиям."""
+    if not jobs:
+        return 0
+    sources = {job.source for job in jobs}
+    # Миниатюры одинаковых картинок уже нарезаны по другому заданию.
+    ready = set(ImageBlob.objects.filter(
+        name__in=sources, thumbnails_ready=True).values_list(
+            'name', flat=True))
+    results = _render_all(sources - ready, workers)
+    done = 0
+    for job in jobs:
+        result = results.get(job.source)
+        if isinstance(result, Exception):
+            fail(job, result)
+        elif complete(job):
+            done += 1
+    return done
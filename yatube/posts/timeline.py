@@ -0,0 +1,221 @@
+"""Материализованная лента подписок (fan-out on write).
+
+При публикации записи её копия-ссылка раскладывается в ленты всех
+подписчиков автора, поэтому страница ``/follow/`` читает одну таблицу
+по индексу ``(user, -pub_date)``. Авторы с очень большим числом
+подписчиков («знаменитости», ``CelebrityAuthor``) не раскладываются: их
+записи подмешиваются в ленту при чтении. Когда знаменитость теряет
+подписчиков и опускается ниже порога, её последние записи раскладываются
+по лентам, а пока раскладка не закончилась, они по-прежнему
+подмешиваются при чтении.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, F, OuterRef, Q, Subquery
+
+from core import taskqueue
+
+from .models import (
+    CelebrityAuthor, DemotedAuthor, Follow, Post, TimelineEntry, User)
+
+CELEBRITY_CACHE_KEY = 'timeline:celebrities'
+
+
+def celebrity_ids():
+    """Возвращает id авторов, записи которых не раскладываются по лентам."""
+    ids = cache.get(CELEBRITY_CACHE_KEY)
+    if ids is None:
+        ids = set(CelebrityAuthor.objects.values_list('author', flat=True))
+        cache.set(
+            CELEBRITY_CACHE_KEY, ids, settings.TIMELINE_CELEBRITY_CACHE_TTL)
+    return ids
+
+
+def reset_celebrities():
+    """Сбрасывает закешированный список знаменитостей."""
+    cache.delete(CELEBRITY_CACHE_KEY)
+
+
+def sync_celebrities():
+    """Сверяет знаменитостей с числом подписчиков после массовых вставок.
+
+    Авторы, опустившиеся ниже порога, понижаются как при отписке.
+    """
+    threshold = settings.TIMELINE_CELEBRITY_FOLLOWERS
+    followers = Follow.objects.values('author').annotate(
+        followers=Count('id'))
+    CelebrityAuthor.objects.bulk_create(
+        [
+            CelebrityAuthor(author_id=author_id)
+            for author_id in followers.filter(
+                followers__gte=threshold).values_list('author', flat=True)
+        ],
+        batch_size=settings.TIMELINE_BATCH_SIZE,
+        ignore_conflicts=True
+    )
+    reset_celebrities()
+    above = followers.filter(followers__gte=threshold).values('author')
+    for author_id in CelebrityAuthor.objects.exclude(
+            author__in=above).values_list('author', flat=True):
+        check_demotion(author_id)
+
+
+def demoted_ids():
+    """Бывшие знаменитости, чьи записи еще раскладываются по лентам."""
+    return set(DemotedAuthor.objects.values_list('author', flat=True))
+
+
+def trim(user_ids, slack=0):
+    """Обрезает ленты пользователей до TIMELINE_DEPTH записей.
+
+    Обрезаются только ленты, выросшие больше чем на slack записей сверх
+    глубины, поэтому при раскладке записи удаление амортизируется.
+    """
+    depth = settings.TIMELINE_DEPTH
+    entries = TimelineEntry.objects.filter(
+        user=OuterRef('pk')).order_by('-pub_date').values('pk')
+    overflowing = User.objects.filter(pk__in=user_ids).annotate(
+        overflow=Subquery(entries[depth + slack:depth + slack + 1])
+    ).filter(overflow__isnull=False).values_list('pk', flat=True)
+    for user_id in overflowing:
+        boundary = TimelineEntry.objects.filter(
+            user_id=user_id).order_by('-pub_date').values('pub_date')
+        TimelineEntry.objects.filter(
+            user_id=user_id,
+            pub_date__lt=Subquery(boundary[depth - 1:depth])
+        ).delete()
+
+
+def fan_out(post, inline=False):
+    """Раскладывает новую запись в ленты подписчиков автора.
+
+    Если подписчиков больше ``TIMELINE_INLINE_FANOUT``, раскладка
+    уходит в фоновую задачу, чтобы не задерживать публикацию.
+    """
+    if post.author_id in celebrity_ids():
+        return
+    follower_ids = list(Follow.objects.filter(
+        author_id=post.author_id).values_list('user', flat=True))
+    if not follower_ids:
+        return
+    if not inline and len(follower_ids) > settings.TIMELINE_INLINE_FANOUT:
+        taskqueue.enqueue('posts.tasks.fan_out_post', [post.pk])
+        return
+    TimelineEntry.objects.bulk_create(
+        [
+            TimelineEntry(
+                user_id=user_id,
+                post=post,
+                author_id=post.author_id,
+                pub_date=post.pub_date)
+            for user_id in follower_ids
+        ],
+        batch_size=settings.TIMELINE_BATCH_SIZE,
+        ignore_conflicts=True
+    )
+    trim(follower_ids, settings.TIMELINE_TRIM_SLACK)
+
+
+def backfill(user, author_ids=None):
+    """Заполняет ленту пользователя последними записями его подписок."""
+    if author_ids is None:
+        author_ids = Follow.objects.filter(
+            user=user).values_list('author', flat=True)
+    author_ids = set(author_ids) - celebrity_ids()
+    if not author_ids:
+        return
+    posts = Post.objects.filter(author_id__in=author_ids).values_list(
+        'id', 'author_id', 'pub_date')[:settings.TIMELINE_DEPTH]
+    TimelineEntry.objects.bulk_create(
+        [
+            TimelineEntry(
+                user=user,
+                post_id=post_id,
+                author_id=author_id,
+                pub_date=pub_date)
+            for post_id, author_id, pub_date in posts
+        ],
+        batch_size=settings.TIMELINE_BATCH_SIZE,
+        ignore_conflicts=True
+    )
+    trim([user.pk])
+
+
+def check_promotion(author_id):
+    """Отмечает автора знаменитостью, если он достиг порога подписчиков."""
+    followers = Follow.objects.filter(author_id=author_id).count()
+    if followers < settings.TIMELINE_CELEBRITY_FOLLOWERS:
+        return
+    _, created = CelebrityAuthor.objects.get_or_create(author_id=author_id)
+    if created:
+        reset_celebrities()
+
+
+def check_demotion(author_id):
+    """Раскладывает записи автора, если он перестал быть знаменитостью.
+
+    Отметка знаменитости хранится в базе, поэтому решение не зависит ни
+    от кеша, ни от того, сколько подписок удалено разом. Раскладку
+    запускает только тот, кто удалил отметку.
+    """
+    followers = Follow.objects.filter(author_id=author_id).count()
+    if followers >= settings.TIMELINE_CELEBRITY_FOLLOWERS:
+        return
+    deleted, _ = CelebrityAuthor.objects.filter(author_id=author_id).delete()
+    if not deleted:
+        return
+    # Отметка в базе, а не в кеше: её видят все процессы, и её не
+    # вытеснит кеш, пока раскладка ждет в очереди.
+    DemotedAuthor.objects.get_or_create(author_id=author_id)
+    reset_celebrities()
+    if followers > settings.TIMELINE_INLINE_FANOUT:
+        taskqueue.enqueue('posts.tasks.demote_author', [author_id])
+    else:
+        demote(author_id)
+
+
+def demote(author_id):
+    """Раскладывает последние записи бывшей знаменитости по лентам."""
+    posts = list(Post.objects.filter(author_id=author_id).values_list(
+        'id', 'pub_date')[:settings.TIMELINE_DEPTH])
+    follower_ids = list(Follow.objects.filter(
+        author_id=author_id).values_list('user', flat=True))
+    step = max(1, settings.TIMELINE_BATCH_SIZE // max(1, len(posts)))
+    for start in range(0, len(follower_ids), step):
+        chunk = follower_ids[start:start + step]
+        TimelineEntry.objects.bulk_create(
+            [
+                TimelineEntry(
+                    user_id=user_id,
+                    post_id=post_id,
+                    author_id=author_id,
+                    pub_date=pub_date)
+                for user_id in chunk
+                for post_id, pub_date in posts
+            ],
+            batch_size=settings.TIMELINE_BATCH_SIZE,
+            ignore_conflicts=True
+        )
+        trim(chunk)
+    DemotedAuthor.objects.filter(author_id=author_id).delete()
+
+
+def remove_author(user, author):
+    """Убирает записи автора из ленты пользователя после отписки."""
+    TimelineEntry.objects.filter(user=user, author=author).delete()
+
+
+def feed(user):
+    """Возвращает queryset записей ленты подписок пользователя."""
+    merged = (Q(author__timeline_demotion__isnull=False)
+              | Q(author__timeline_celebrity__isnull=False))
+    followed_celebrities = list(Follow.objects.filter(
+        merged, user=user).values_list('author', flat=True))
+    if not followed_celebrities:
+        return Post.objects.filter(timeline_entries__user=user).annotate(
+            feed_date=F('timeline_entries__pub_date'),
+            feed_post=F('timeline_entries__post')
+        ).order_by('-feed_date', '-feed_post')
+    entries = TimelineEntry.objects.filter(user=user).values('post')
+    return Post.objects.filter(
+        Q(pk__in=entries) | Q(author__in=followed_celebrities))
@@ -1,72 +1,127 @@
 from django.conf import settings
 from django.contrib.auth.decorators import login_required
-from django.core.paginator import Paginator
+from django.db import transaction
 from django.shortcuts import get_object_or_404, render, redirect
 
+from core.paginators import KeysetPaginator
+from core.query_budget import query_budget
+
+from . import caching, counters, search, timeline
 from .forms import PostForm, CommentForm
 from .models import Follow, Group, Post, User
 
 
 def paginator_for_all(post_list, request):
-    """Паджинатор разбивает на страницы."""
-    paginator = Paginator(post_list, settings.POSTS_ON_PAGE)
-    page_number = request.GET.get('page')
-    return paginator.get_page(page_number)
+    """Паджинатор разбивает на страницы по курсору (pub_date, id)."""
+    paginator = KeysetPaginator(post_list, settings.POSTS_ON_PAGE)
+    page_obj = paginator.get_page(
+        request.GET.get('page'), request.GET.get('cursor'))
+    caching.annotate_versions(page_obj)
+    return page_obj
 
 
+@query_budget(4)
 def index(request):
     """Возвращает главную страницу."""
     post_list = Post.objects.select_related('author', 'group').all()
-    page_obj = paginator_for_all(post_list, request)
     context = {
-        'page_obj': page_obj
+        'page_obj': paginator_for_all(post_list, request),
+        'cache_version': caching.version(caching.INDEX),
+        'cache_timeout': caching.timeout(),
     }
     return render(request, 'posts/index.html', context)
 
 
+@query_budget(5)
+def search_posts(request):
+    """Возвращает записи, найденные по тексту записей и комментариев."""
+    query = request.GET.get('q', '').strip()
+    page_obj = search.search_page(query, request.GET.get('cursor'))
+    context = {
+        'query': query,
+        'page_obj': page_obj,
+        'cache_timeout': caching.timeout(),
+    }
+    return render(request, 'posts/search.html', context)
+
+
+@query_budget(5)
 def group_posts(request, slug):
     """Возвращает все посты из выбранной группы."""
     group = get_object_or_404(Group, slug=slug)
-    post_list = group.group_posts.select_related('group').all()
-    page_obj = paginator_for_all(post_list, request)
+    post_list = group.group_posts.select_related('author', 'group').all()
     context = {
         'group': group,
-        'page_obj': page_obj,
+        'page_obj': paginator_for_all(post_list, request),
+        'cache_timeout': caching.timeout(),
     }
     return render(request, 'posts/group_list.html', context)
 
 
+@query_budget(7)
 def profile(request, username):
     """Возвращает посты выбранного пользователя."""
     author = get_object_or_404(User, username=username)
-    post_list = author.posts.select_related('author').all()
+    post_list = author.posts.select_related('author', 'group').all()
     page_obj = paginator_for_all(post_list, request)
     user = request.user
     following = (
         request.user.is_authenticated
         and Follow.objects.filter(user=user, author=author).exists())
+    author_counters = counters.for_user(author)
     context = {
         'author': author,
         'page_obj': page_obj,
-        'following': following
+        'following': following,
+        'posts_count': author_counters.posts_count,
+        'counters': author_counters,
+        'cache_timeout': caching.timeout(),
     }
     return render(request, 'posts/profile.html', context)
 
 
+def comments_page(post, request):
+    """Возвращает страницу комментариев поста по курсору."""
+    paginator = KeysetPaginator(
+        post.comments.select_related('author'),
+        settings.COMMENTS_ON_PAGE,
+        key='created')
+    return paginator.get_page(
+        request.GET.get('page'), request.GET.get('cursor'))
+
+
+@query_budget(5)
 def post_detail(request, post_id):
     """Возвращает детальную информацию о посте."""
-    post = get_object_or_404(Post, id=post_id)
-    comments = post.comments.select_related('post').all()
+    post = get_object_or_404(
+        Post.objects.select_related('author__counters', 'group'), id=post_id)
+    caching.annotate_versions([post])
+    comments = comments_page(post, request)
     form = CommentForm()
     context = {
         'post': post,
+        'author_counters': counters.for_user(post.author),
         'form': form,
         'comments': comments,
+        'cache_timeout': caching.timeout(),
     }
     return render(request, 'posts/post_detail.html', context)
 
 
+@query_budget(4)
+def post_comments(request, post_id):
+    """Возвращает следующую порцию комментариев поста."""
+    post = get_object_or_404(Post.objects.only('id'), id=post_id)
+    context = {
+        'post': post,
+        'comments': comments_page(post, request),
+    }
+    return render(request, 'posts/includes/comments.html', context)
+
+
+@query_budget(9)
 @login_required
+@transaction.atomic
 def post_create(request):
     """Возвращает форму для создания поста."""
     form = PostForm(request.POST or None, files=request.FILES or None)
@@ -81,7 +136,9 @@ def post_create(request):
     return render(request, 'posts/create.html', context)
 
 
+@query_budget(9)
 @login_required
+@transaction.atomic
 def post_edit(request, post_id):
     """Возвращает форму для редактирования поста."""
     post = get_object_or_404(Post, id=post_id)
@@ -103,7 +160,9 @@ def post_edit(request, post_id):
     return render(request, 'posts/create.html', context)
 
 
+@query_budget(8)
 @login_required
+@transaction.atomic
 def add_comment(request, post_id):
     """Возвращает форму для создания комментария."""
     form = CommentForm(request.POST or None)
@@ -116,20 +175,23 @@ def add_comment(request, post_id):
     return redirect('posts:post_detail', post_id=post_id)
 
 
+@query_budget(5)
 @login_required
 def follow_index(request):
     """Возвращает посты пользователей, на которыз подписан юзер."""
-    post_list = Post.objects.filter(
-        author__following__user=request.user).select_related(
-            'author', 'group').all()
+    post_list = timeline.feed(request.user).select_related(
+        'author', 'group')
     page_obj = paginator_for_all(post_list, request)
     context = {
-        'page_obj': page_obj
+        'page_obj': page_obj,
+        'cache_timeout': caching.timeout(),
     }
     return render(request, 'posts/follow.html', context)
 
 
+@query_budget(12)
 @login_required
+@transaction.atomic
 def profile_follow(request, username):
     """Подписывает пользователя на выбранного автора."""
     user = request.user
@@ -140,7 +202,9 @@ def profile_follow(request, username):
     return redirect('posts:profile', author.username)
 
 
+@query_budget(12)
 @login_required
+@transaction.atomic
 def profile_unfollow(request, username):
     """Отписывает пользователя от выбранного автора."""
     user = request.user
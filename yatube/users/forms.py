@@ -1,5 +1,8 @@
 from django.contrib.auth import get_user_model
-from django.contrib.auth.forms import UserCreationForm
+from django.contrib.auth.forms import PasswordResetForm, UserCreationForm
+from django.template.loader import render_to_string
+
+from core.tasks import send_email
 
 User = get_user_model()
 
@@ -8,3 +11,18 @@ class CreactionForm(UserCreationForm):
     class Meta(UserCreationForm.Meta):
         model = User
         fields = ('first_name', 'last_name', 'username', 'email')
+
+
+class QueuedPasswordResetForm(PasswordResetForm):
+    """Отправляет письмо для сброса пароля фоновой задачей."""
+
+    def send_mail(self, subject_template_name, email_template_name,
+                  context, from_email, to_email,
+                  html_email_template_name=None):
+        subject = ''.join(
+            render_to_string(subject_template_name, context).splitlines())
+        body = render_to_string(email_template_name, context)
+        html = None
+        if html_email_template_name is not None:
+            html = render_to_string(html_email_template_name, context)
+        send_email.delay(subject, body, from_email, [to_email], html)
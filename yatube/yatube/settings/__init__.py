@@ -0,0 +1,23 @@
+"""Настройки проекта.
+
+Профиль выбирается переменной окружения ``DJANGO_ENV`` (ее можно задать
+и в ``.env``): ``dev`` — по умолчанию, с ``DEBUG`` и debug_toolbar;
+``prod`` — для боевого сервера. Общая часть лежит в ``base``.
+"""
+import os
+
+from django.core.exceptions import ImproperlyConfigured
+from dotenv import load_dotenv
+
+load_dotenv()
+
+PROFILE = os.getenv('DJANGO_ENV', 'dev')
+
+if PROFILE == 'dev':
+    from .dev import *  # noqa: F401,F403
+elif PROFILE == 'prod':
+    from .prod import *  # noqa: F401,F403
+else:
+    raise ImproperlyConfigured(
+        f'Неизвестный профиль настроек DJANGO_ENV={PROFILE}: '
+        f'ожидается dev или prod')
@@ -0,0 +1,225 @@
+"""Общие настройки всех профилей."""
+import os
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(
+    os.path.abspath(__file__))))
+
+SECRET_KEY = os.getenv('SECRET_KEY')
+
+DEBUG = False
+
+ALLOWED_HOSTS = [
+    'localhost',
+    '127.0.0.1',
+    '[::1]',
+    'testserver',
+    'www.iamlily.pythonanywhere.com',
+    'iamlily.pythonanywhere.com',
+]
+
+
+INSTALLED_APPS = [
+    'about.apps.AboutConfig',
+    'core.apps.CoreConfig',
+    'users.apps.UsersConfig',
+    'posts.apps.PostsConfig',
+    'django.contrib.admin',
+    'django.contrib.auth',
+    'django.contrib.contenttypes',
+    'django.contrib.sessions',
+    'django.contrib.messages',
+    'django.contrib.staticfiles',
+    'sorl.thumbnail',
+]
+
+MIDDLEWARE = [
+    'core.middleware.SlowRequestMiddleware',
+    'core.middleware.MetricsMiddleware',
+    'django.middleware.security.SecurityMiddleware',
+    'core.middleware.QueryBudgetMiddleware',
+    'django.contrib.sessions.middleware.SessionMiddleware',
+    'django.middleware.common.CommonMiddleware',
+    'django.middleware.csrf.CsrfViewMiddleware',
+    'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'django.contrib.messages.middleware.MessageMiddleware',
+    'django.middleware.clickjacking.XFrameOptionsMiddleware',
+]
+
+ROOT_URLCONF = 'yatube.urls'
+
+TEMPLATES_DIR = os.path.join(BASE_DIR, 'templates')
+TEMPLATES = [
+    {
+        'BACKEND': 'core.metrics.TimedDjangoTemplates',
+        'DIRS': [TEMPLATES_DIR],
+        'APP_DIRS': True,
+        'OPTIONS': {
+            'context_processors': [
+                'django.template.context_processors.debug',
+                'django.template.context_processors.request',
+                'django.contrib.auth.context_processors.auth',
+                'django.contrib.messages.context_processors.messages',
+                'core.context_processors.year.year',
+            ],
+        },
+    },
+]
+
+WSGI_APPLICATION = 'yatube.wsgi.application'
+ASGI_APPLICATION = 'yatube.asgi.application'
+# Потоки, в которых ASGI-приложение выполняет запросы (core.asgi).
+ASGI_THREADS = 8
+
+
+DATABASES = {
+    'default': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+    }
+}
+
+
+AUTH_PASSWORD_VALIDATORS = [
+    {
+        'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
+    },
+    {
+        'NAME': 'django.contrib.auth.password_validation.MinimumLengthValidator',
+    },
+    {
+        'NAME': 'django.contrib.auth.password_validation.CommonPasswordValidator',
+    },
+    {
+        'NAME': 'django.contrib.auth.password_validation.NumericPasswordValidator',
+    },
+]
+
+
+LANGUAGE_CODE = 'ru'
+
+TIME_ZONE = 'UTC'
+
+USE_I18N = True
+
+USE_L10N = True
+
+USE_TZ = True
+
+
+STATIC_URL = '/static/'
+STATICFILES_DIRS = [os.path.join(BASE_DIR, 'static')]
+
+MEDIA_URL = '/media/'
+MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
+
+LOGIN_URL = 'users:login'
+LOGIN_REDIRECT_URL = 'posts:index'
+
+
+EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
+EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
+
+POSTS_ON_PAGE = 10
+COMMENTS_ON_PAGE = 20
+# Наибольший размер страницы JSON API в параметре limit.
+API_MAX_PAGE_SIZE = 100
+PAGINATION_MAX_OFFSET_PAGE = 50
+# Сколько строк выгрузки читать из базы за один раз.
+EXPORT_CHUNK_SIZE = 2000
+
+FRAGMENT_CACHE_TIMEOUT = 60 * 60 * 6
+# Время жизни фрагментов, если кеш default свой у каждого процесса.
+FRAGMENT_CACHE_LOCAL_TIMEOUT = 20
+
+TIMELINE_DEPTH = 800
+TIMELINE_TRIM_SLACK = 200
+TIMELINE_CELEBRITY_FOLLOWERS = 10000
+TIMELINE_CELEBRITY_CACHE_TTL = 300
+TIMELINE_BATCH_SIZE = 500
+# Запись автора с большим числом подписчиков раскладывается фоновой задачей.
+TIMELINE_INLINE_FANOUT = 1000
+
+# LocMemCache свой у каждого процесса; боевой профиль использует общий
+# кеш, иначе поколения фрагментов не доходят до других воркеров.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    # {% cache %} хранит фрагменты в default и считает попадания.
+    'template_fragments': {
+        'BACKEND': 'core.metrics.FragmentCache',
+        'LOCATION': 'default',
+    },
+}
+
+CSRF_FAILURE_VIEW = 'core.views.csrf_failure'
+
+QUERY_BUDGETS = {}
+QUERY_BUDGET_RAISE = False
+
+FILE_UPLOAD_HANDLERS = [
+    'core.uploads.ImageUploadHandler',
+    'django.core.files.uploadhandler.MemoryFileUploadHandler',
+    'django.core.files.uploadhandler.TemporaryFileUploadHandler',
+]
+IMAGE_UPLOAD_MAX_BYTES = 25 * 1024 * 1024
+IMAGE_UPLOAD_MAX_PIXELS = 50 * 10 ** 6
+# Оригиналы с большей стороной длиннее этого уменьшаются; None — не менять.
+IMAGE_UPLOAD_DOWNSCALE = 4096
+
+# Файл с дополнительными запрещенными словами, по слову в строке.
+CENSOR_WORDS_FILE = None
+# Как часто пересобирать шаблон цензуры, если кеш свой у каждого процесса.
+CENSOR_LOCAL_TTL = 60
+
+SEARCH_BACKEND = 'posts.search.Fts5Backend'
+SEARCH_MAX_CANDIDATES = 5000
+
+POST_THUMBNAILS = {
+    'card': {
+        'size': (960, 500),
+        'widths': (320, 640, 960),
+        'sizes': '(min-width: 992px) 960px, 100vw',
+    },
+    'detail': {
+        'size': (960, 339),
+        'widths': (320, 640, 960),
+        'sizes': '(min-width: 768px) 75vw, 100vw',
+    },
+}
+# Форматы по убыванию предпочтения; неподдерживаемые Pillow пропускаются.
+POST_THUMBNAIL_FORMATS = ('AVIF', 'WEBP', 'JPEG')
+POST_THUMBNAIL_QUALITY = {'AVIF': 50, 'WEBP': 75, 'JPEG': 80}
+THUMBNAIL_WORKERS = 2
+THUMBNAIL_JOB_TIMEOUT = 5 * 60
+THUMBNAIL_MAX_ATTEMPTS = 3
+
+# Фоновые задачи (core.taskqueue); True — выполнять после фиксации
+# транзакции в том же процессе, без воркера.
+TASKS_ALWAYS_EAGER = False
+TASK_WORKERS = 4
+TASK_MAX_ATTEMPTS = 5
+# Пауза перед первым повтором, дальше она удваивается.
+TASK_RETRY_DELAY = 10
+TASK_VISIBILITY_TIMEOUT = 10 * 60
+
+# Каталог, через который процессы складывают метрики для /metrics;
+# без него страница показывает метрики только своего процесса.
+METRICS_DIR = os.getenv('METRICS_DIR')
+METRICS_FLUSH_INTERVAL = 1
+# Кому /metrics отдает данные: адреса из списка или запросы с
+# заголовком ``Authorization: Bearer <METRICS_TOKEN>``.
+METRICS_ALLOWED_IPS = os.getenv(
+    'METRICS_ALLOWED_IPS', '127.0.0.1,::1').split(',')
+METRICS_TOKEN = os.getenv('METRICS_TOKEN')
+
+# Журнал медленных запросов (core.slowlog); None отключает его.
+SLOW_REQUEST_THRESHOLD = 0.5
+SLOW_QUERY_THRESHOLD = 0.05
+# Доля запросов, у которых записываются SQL-запросы.
+SLOW_LOG_SAMPLE_RATE = 0.1
+SLOW_LOG_MAX_QUERIES = 20
+SLOW_LOG_SIZE = 100
+SLOW_LOG_CACHE = 'default'
+# Сохранять значения параметров SQL; в них бывают пароли и личные данные.
+SLOW_LOG_PARAMS = False
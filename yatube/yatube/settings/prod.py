@@ -0,0 +1,60 @@
+"""Профиль боевого сервера.
+
+Без debug_toolbar, с кешем скомпилированных шаблонов, постоянными
+подключениями к базе, общим для всех процессов файловым кешем,
+статикой с хешем в имени (перед запуском нужен ``collectstatic``) и
+сжатием ответов.
+"""
+import os
+
+from .base import *  # noqa: F401,F403
+from .base import (
+    ALLOWED_HOSTS, BASE_DIR, CACHES, DATABASES, MIDDLEWARE, TEMPLATES)
+
+DEBUG = False
+
+if os.getenv('ALLOWED_HOSTS'):
+    ALLOWED_HOSTS = os.getenv('ALLOWED_HOSTS').split(',')
+
+MIDDLEWARE = list(MIDDLEWARE)
+MIDDLEWARE.insert(
+    MIDDLEWARE.index('django.middleware.security.SecurityMiddleware') + 1,
+    'django.middleware.gzip.GZipMiddleware')
+
+# Шаблоны компилируются один раз на процесс.
+TEMPLATES = [{
+    **TEMPLATES[0],
+    'APP_DIRS': False,
+    'OPTIONS': {
+        **TEMPLATES[0]['OPTIONS'],
+        'loaders': [
+            ('django.template.loaders.cached.Loader', [
+                'django.template.loaders.filesystem.Loader',
+                'django.template.loaders.app_directories.Loader',
+            ]),
+        ],
+    },
+}]
+
+DATABASES = {
+    **DATABASES,
+    'default': {
+        **DATABASES['default'],
+        'CONN_MAX_AGE': int(os.getenv('CONN_MAX_AGE', 60)),
+    },
+}
+
+STATIC_ROOT = os.getenv('STATIC_ROOT', os.path.join(BASE_DIR, 'staticfiles'))
+STATICFILES_STORAGE = 'core.storage.ManifestStaticStorage'
+
+# Общий кеш: поколения фрагментов, журнал медленных запросов и список
+# знаменитостей видны всем воркерам, runworker и командам.
+CACHES = {
+    **CACHES,
+    'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.getenv(
+            'CACHE_LOCATION', os.path.join(BASE_DIR, 'cache')),
+        'OPTIONS': {'MAX_ENTRIES': 100000},
+    },
+}